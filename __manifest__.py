@@ -13,7 +13,7 @@
     "category": "Uncategorized",
     "version": "0.1",
     # any module necessary for this one to work correctly
-    "depends": ["hotel_management_odoo", "base", "web", "website"],
+    "depends": ["hotel_management_odoo", "base", "web", "website", "point_of_sale"],
     "assets": {
         "web.assets_backend": [
             "hotel_management_extension/static/src/styles/room_list.css",
@@ -72,6 +72,9 @@
         "views/hotel_ui_menu.xml",  # menu + action UI juste pour le test
         "views/room_planning_menu.xml",
         "views/hotel_metric_views.xml",
+        "views/hotel_room_type_capacity_views.xml",
+        "views/hotel_stay_night_views.xml",
+        "views/hotel_metric_backfill_views.xml",
         "views/reception_standalone_app_template.xml",
         "views/views.xml",
         "views/templates.xml",
@@ -80,6 +83,7 @@
         "views/menu_labels.xml",
         "views/hide_menus.xml",
         "data/hotel_metric_cron.xml",
+        "data/hotel_capacity_cron.xml",
         "data/ir_sequence_data.xml",
     ],
     "demo": [
@@ -13,3 +13,9 @@ STAY_STATES = {
     "COMPLETED": "completed",
     "CANCELLED": "cancelled",
 }
+
+# États occupant une chambre (pris en compte par le moteur de disponibilité)
+ACTIVE_STAY_STATES = [STAY_STATES["PENDING"], STAY_STATES["ONGOING"]]
+
+# Buffer de nettoyage (heures) appliqué de part et d'autre d'un séjour
+CLEANING_BUFFER_HOURS = 0.5
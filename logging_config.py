@@ -1,25 +1,5 @@
-import logging
-import os
+from .utils.logger_utils import setup_logger
 
-#LOG_DIR = "/opt/odoo-sandbox/log/"   # à adapter, par exemple "/var/log/odoo" /opt/odoo-sandbox/odoo-sandbox.log
-LOG_DIR = "." 
-LOG_FILE = os.path.join(LOG_DIR, "eclc_pricing.log")
-
-# Création du répertoire si inexistant (optionnel)
-os.makedirs(LOG_DIR, exist_ok=True)
-
-# Récupération d’un logger spécifique
-eclc_logger = logging.getLogger("hotel.eclc")
-eclc_logger.setLevel(logging.DEBUG)
-
-# Création d’un FileHandler dédié
-fh = logging.FileHandler(LOG_FILE)
-fh.setLevel(logging.DEBUG)
-
-# Format des logs
-formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
-fh.setFormatter(formatter)
-
-# Éviter d’ajouter plusieurs handlers si déjà configuré
-if not eclc_logger.handlers:
-    eclc_logger.addHandler(fh)
+# Répertoire configurable : variable HOTEL_LOG_DIR ou option hotel_log_dir
+# du fichier de configuration Odoo (cf. utils/logger_utils.py)
+eclc_logger = setup_logger("hotel.eclc", "eclc_pricing.log")
@@ -16,6 +16,7 @@ from . import hotel_pos_menu
 from . import hotel_pos_menu_line
 from . import product_template_extension
 from . import hotel_booking_stays
+from . import hotel_pricing_config_mixin
 from . import hotel_season
 from . import hotel_pricing_rule
 from . import hotel_pricing_service
@@ -25,5 +26,12 @@ from . import account_move_extension
 from . import hotel_availability_engine  # ou le nom exact du fichier
 from . import room_availability_check
 from . import hotel_metric
+from . import hotel_metric_dirty_day
+from . import hotel_metric_backfill
+from . import pos_order_extension
+from . import hotel_stay_night
+from . import hotel_room_type_capacity
+from . import ir_config_parameter
+from . import hotel_perf_stat
 
 
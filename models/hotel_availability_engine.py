@@ -1,43 +1,154 @@
+from datetime import timedelta
+
 from odoo import models, api
-import random
+from odoo.tools import SQL
+from ..constants.booking_stays_state import ACTIVE_STAY_STATES, CLEANING_BUFFER_HOURS
 from ..utils.logger_utils import setup_logger
+from ..utils.lru_cache import BoundedLRU
+from ..utils.trace_events import trace_event
 
 early_late_logger = setup_logger("hotel.early_late", "early_late.log")
 
+# Vérifications d'extension par chambre, par processus. Les clés portent la
+# génération de disponibilité du type de la chambre (cf. hotel.room.type).
+_ROOM_CHECK_CACHE = BoundedLRU(maxsize=1024, ttl=60)
+
 
-class HotelAvailabilityEngineSim(models.AbstractModel):
+class HotelAvailabilityEngine(models.AbstractModel):
     _name = "hotel.availability.engine"
-    _description = "Moteur de disponibilité (Simulation)"
+    _description = "Moteur de disponibilité EC/LC (extension de séjour)"
 
     @api.model
-    def check_availability(self, room_type_id, start, end):
+    def check_availability(self, room_type_id, start, end, room_id=None,
+                           exclude_stay_id=None, buffer_hours=CLEANING_BUFFER_HOURS):
         """
-        Simulation d'un moteur de disponibilité.
-        Retourne dispo ou pas avec règles simples/random.
+        Répond à la question du flux EC/LC : « ce séjour peut-il occuper
+        [start, end) ? ».
+
+        - Avec ``room_id`` : une seule recherche indexée (occupancy_period) sur
+          les séjours actifs de cette chambre, hors ``exclude_stay_id`` (le
+          séjour que l'on étend).
+        - Sans chambre attribuée : délégation au moteur par type
+          (hotel.room.availability.engine).
+
+        :return: dict {status: available|unavailable, message, room_id}
         """
-        early_late_logger.info("[AVAIL] Check availability start=%s end=%s room_type=%s",
-                               start, end, room_type_id)
+        early_late_logger.info(
+            "[AVAIL] Check availability start=%s end=%s room_type=%s room=%s exclude=%s",
+            start, end, room_type_id, room_id, exclude_stay_id,
+        )
 
         if not room_type_id or not start or not end:
             msg = "⚠️ Données manquantes (room_type_id, start, end)."
             early_late_logger.warning("[AVAIL] %s", msg)
-            return {"status": "unavailable", "message": msg}
-
-        duration_hours = (end - start).total_seconds() / 3600.0
-        early_late_logger.debug("[AVAIL] Duration=%.2f hours", duration_hours)
-
-        if duration_hours < 24:
-            msg = f"✅ Chambre dispo pour {duration_hours:.1f}h."
-            early_late_logger.info("[AVAIL] %s", msg)
-            return {"status": "available", "message": msg}
-
-        # Random simulation
-        choice = random.choice([True, False])
-        if choice:
-            msg = "✅ Chambre disponible (simulation random)."
-            early_late_logger.info("[AVAIL] %s", msg)
-            return {"status": "available", "message": msg}
-        else:
-            msg = "❌ Chambre indisponible (simulation random)."
-            early_late_logger.info("[AVAIL] %s", msg)
-            return {"status": "unavailable", "message": msg}
+            return {"status": "unavailable", "message": msg, "room_id": room_id}
+
+        if end <= start:
+            msg = "⚠️ Période invalide (fin avant début)."
+            early_late_logger.warning("[AVAIL] %s", msg)
+            return {"status": "unavailable", "message": msg, "room_id": room_id}
+
+        if not room_id:
+            return self._check_room_type(room_type_id, start, end, exclude_stay_id, buffer_hours)
+
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+        with trace_event(
+            "availability.room_check", "availability", self.env.cr,
+            stay_id=exclude_stay_id, room_type_id=room_type_id, room_id=room_id,
+        ) as span:
+            cache_key = self._room_check_cache_key(room_id, start, end, exclude_stay_id, buffer_hours)
+            if cache_key:
+                cached = _ROOM_CHECK_CACHE.get(cache_key)
+                if cached is not None:
+                    early_late_logger.debug("[AVAIL] Résultat en cache %s", cached)
+                    span.set(decision=cached["status"], cache="hit")
+                    return dict(cached)
+
+            result = self._check_room(room_id, start, end, exclude_stay_id, buffer_hours)
+            if cache_key:
+                _ROOM_CHECK_CACHE.put(cache_key, dict(result))
+            span.set(decision=result["status"], cache="miss" if cache_key else "bypass")
+            return result
+
+    @api.model
+    def get_cache_stats(self):
+        """Compteurs du cache des vérifications par chambre du processus."""
+        return _ROOM_CHECK_CACHE.stats()
+
+    # ==================== MÉTHODES PRIVÉES ====================
+
+    def _check_room(self, room_id, start, end, exclude_stay_id, buffer_hours):
+        """Premier séjour actif de la chambre qui chevauche la période (buffer compris)."""
+        Stay = self.env["hotel.booking.stay"]
+        Stay.flush_model(["room_id", "state", "actual_checkin_date", "actual_checkout_date"])
+        overlap = self.env["hotel.room.availability.engine"]._stay_overlap_sql(
+            "s", start, end,
+            timedelta(hours=buffer_hours) if buffer_hours else timedelta(0)
+        )
+        self.env.cr.execute(SQL(
+            """
+            SELECT s.id, s.actual_checkin_date, s.actual_checkout_date
+              FROM hotel_booking_stay s
+             WHERE s.room_id = %(room_id)s
+               AND s.state IN %(states)s
+               AND s.id != %(exclude_id)s
+               AND %(overlap)s
+             ORDER BY s.actual_checkin_date
+             LIMIT 1
+            """,
+            room_id=room_id,
+            states=tuple(ACTIVE_STAY_STATES),
+            exclude_id=exclude_stay_id or 0,
+            overlap=overlap,
+        ))
+        conflict = self.env.cr.fetchone()
+
+        if not conflict:
+            msg = "✅ Chambre disponible sur la période demandée."
+            early_late_logger.info("[AVAIL] %s room=%s", msg, room_id)
+            return {"status": "available", "message": msg, "room_id": room_id}
+
+        conflict_id, conflict_in, conflict_out = conflict
+        msg = "❌ Chambre occupée du %s au %s (séjour %s)." % (
+            conflict_in.strftime("%d/%m/%Y %H:%M"),
+            conflict_out.strftime("%d/%m/%Y %H:%M"),
+            conflict_id,
+        )
+        early_late_logger.info("[AVAIL] %s room=%s", msg, room_id)
+        return {
+            "status": "unavailable",
+            "message": msg,
+            "room_id": room_id,
+            "conflict_stay_id": conflict_id,
+        }
+
+    def _check_room_type(self, room_type_id, start, end, exclude_stay_id, buffer_hours):
+        """Aucune chambre attribuée : une chambre du type est-elle libre ?"""
+        result = self.env["hotel.room.availability.engine"].check_availability(
+            room_type_id=room_type_id,
+            checkin_date=start,
+            checkout_date=end,
+            exclude_stay_id=exclude_stay_id,
+            buffer_hours=buffer_hours,
+        )
+        status = "available" if result.get("status") == "available" else "unavailable"
+        msg = ("✅ " if status == "available" else "❌ ") + (result.get("message") or "")
+        early_late_logger.info("[AVAIL] %s", msg)
+        return {"status": status, "message": msg, "room_id": result.get("room_id")}
+
+    def _room_check_cache_key(self, room_id, start, end, exclude_stay_id, buffer_hours):
+        room_type = self.env["hotel.room"].browse(room_id).room_type_id
+        if not room_type:
+            return None
+        engine = self.env["hotel.room.availability.engine"]
+        if engine._has_pending_availability_change(room_type.id):
+            return None
+        return (
+            self.env.cr.dbname,
+            room_id,
+            start,
+            end,
+            exclude_stay_id or None,
+            float(buffer_hours or 0.0),
+            room_type.availability_generation,
+        )
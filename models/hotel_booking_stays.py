@@ -7,21 +7,56 @@ _logger = logging.getLogger(__name__)
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
 from datetime import datetime, timedelta, time
-from ..constants.booking_stays_state import STAY_STATES
+import psycopg2
+from psycopg2.errors import ExclusionViolation
+from odoo.tools import SQL
+from odoo.tools.sql import column_exists
+from ..constants.booking_stays_state import (
+    ACTIVE_STAY_STATES,
+    CLEANING_BUFFER_HOURS,
+    STAY_STATES,
+)
 from ..logging_config import eclc_logger as _logger
 from ..logging_booking import booking_logger as _logger_booking
+from ..utils.lazy_log import LazyJson
 from ..utils.logger_utils import setup_logger
+from ..utils.occupancy_grid import StayFootprint
+from ..utils.perf import instrument
 
 early_late_logger = setup_logger("hotel.early_late", "early_late.log")
 # === LOGGER PERSONNALISÉ POUR LES SÉJOURS ===
 hotel_stay_logger = setup_logger(
     name="hotel.booking.stay",
     log_file="stay.log",
-    #log_dir="/opt/odoo-sandbox/log/" 
-    log_dir="." 
-     
 )
 
+# Contrainte d'exclusion posée par init() sur la colonne occupancy_period
+OCCUPANCY_EXCLUSION_CONSTRAINT = "hotel_booking_stay_room_period_excl"
+# Colonnes lues par la contrainte (occupancy_period est générée des dates effectives)
+OCCUPANCY_FIELDS = ["room_id", "state", "actual_checkin_date", "actual_checkout_date"]
+
+# Champs lus par hotel.metric et le registre hotel.stay.night (directement ou
+# via le prix de la chambre) : leur modification rend les jours du séjour à
+# recalculer et ses nuitées à régénérer. Complétés à l'exécution par les
+# dépendances des champs calculés stockés (cf. _metric_trigger_fields).
+METRIC_STAY_FIELDS = {
+    "planned_checkin_date",
+    "planned_checkout_date",
+    "room_id",
+    "room_type_id",
+    "reservation_type_id",
+    "room_price_total",
+    "occupant_ids",
+    "early_checkin_requested",
+    "late_checkout_requested",
+    "early_pricing_mode",
+    "late_pricing_mode",
+    "requested_checkin_datetime",
+    "requested_checkout_datetime",
+    "active",
+}
+
+
 def float_to_time(float_hour):
     hours = int(float_hour)
     minutes = int(round((float_hour - hours) * 60))
@@ -31,6 +66,8 @@ def float_to_time(float_hour):
 class HotelBookingStayS(models.Model):
     _name = "hotel.booking.stay"
     _description = "Séjour individuel de chaque reservation (booking)"
+    # Champs déclenchant le recalcul des métriques (cf. _metric_trigger_fields)
+    _metric_trigger_fields_cache = None
     # _rec_name = 'room_id' -> ici à faire de recherche et comprendre son utilité
     product_id = fields.Many2one(
         "product.product",
@@ -301,14 +338,21 @@ class HotelBookingStayS(models.Model):
         currency_field="currency_id",
     )
 
+    pricing_breakdown = fields.Json(
+        string="Détail tarifaire",
+        readonly=True,
+        copy=False,
+        help="Résultat structuré du service tarifaire (base, ajustements, "
+        "suppléments, remises, total), stocké en JSONB.",
+    )
     pricing_adjustments = fields.Text(
         string="Ajustements appliqués",
-        readonly=True,
+        compute="_compute_pricing_breakdown_text",
         help="Stocke en JSON les détails des ajustements (supplément extra guest, etc.)",
     )
     pricing_supplements = fields.Text(
         string="Supplements (JSON)",
-        readonly=True,
+        compute="_compute_pricing_breakdown_text",
         help="Suppléments appliqués (early/late fees, extras...) en JSON.",
     )
 
@@ -342,7 +386,7 @@ class HotelBookingStayS(models.Model):
     )
     financial_summary_details = fields.Text(
         string="Résumé financier (JSON)",
-        readonly=True,
+        compute="_compute_pricing_breakdown_text",
         help="Détails financiers du séjour (base, ajustements, suppléments, remises, taxes, total)",
     )
 
@@ -375,6 +419,79 @@ class HotelBookingStayS(models.Model):
         readonly=False,
     )
     
+    def init(self):
+        """
+        Occupation en base : colonne tsrange générée à partir des dates effectives
+        élargies du buffer de nettoyage, avec une contrainte d'exclusion GiST qui
+        interdit à deux séjours actifs d'une même chambre de se chevaucher, même
+        lorsque deux réceptionnistes enregistrent en même temps.
+        """
+        cr = self.env.cr
+        buffer_interval = "%d minutes" % round(CLEANING_BUFFER_HOURS * 60)
+
+        # Reprise des résumés tarifaires de l'ancienne colonne texte
+        # (financial_summary_details, désormais calculé depuis pricing_breakdown)
+        if column_exists(cr, "hotel_booking_stay", "financial_summary_details"):
+            cr.execute(
+                """
+                UPDATE hotel_booking_stay
+                   SET pricing_breakdown = COALESCE(
+                           pricing_breakdown, financial_summary_details::jsonb),
+                       financial_summary_details = NULL
+                 WHERE financial_summary_details IS NOT NULL
+                """
+            )
+
+        cr.execute(SQL(
+            """
+            ALTER TABLE hotel_booking_stay
+            ADD COLUMN IF NOT EXISTS occupancy_period tsrange
+            GENERATED ALWAYS AS (
+                CASE WHEN actual_checkin_date IS NOT NULL
+                      AND actual_checkout_date > actual_checkin_date
+                     THEN tsrange(actual_checkin_date - %(buffer)s::interval,
+                                  actual_checkout_date + %(buffer)s::interval, '[)')
+                END
+            ) STORED
+            """,
+            buffer=buffer_interval,
+        ))
+
+        cr.execute(
+            "SELECT 1 FROM pg_constraint WHERE conname = %s",
+            [OCCUPANCY_EXCLUSION_CONSTRAINT],
+        )
+        if cr.fetchone():
+            return
+        try:
+            with cr.savepoint():
+                cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+                cr.execute(SQL(
+                    """
+                    ALTER TABLE hotel_booking_stay
+                    ADD CONSTRAINT %(name)s
+                    EXCLUDE USING gist (room_id WITH =, occupancy_period WITH &&)
+                    WHERE (state IN %(states)s)
+                    """,
+                    name=SQL.identifier(OCCUPANCY_EXCLUSION_CONSTRAINT),
+                    states=tuple(ACTIVE_STAY_STATES),
+                ))
+        except psycopg2.Error as e:
+            # btree_gist absent ou chevauchements déjà en base : garder au moins
+            # un index GiST pour les recherches, la contrainte sera posée à la
+            # prochaine mise à jour du module une fois les données corrigées.
+            _logger.warning(
+                "[STAY/INIT] Contrainte d'exclusion non posée : %s", e
+            )
+            cr.execute(SQL(
+                """
+                CREATE INDEX IF NOT EXISTS hotel_booking_stay_occupancy_period_gist
+                    ON hotel_booking_stay USING gist (occupancy_period)
+                 WHERE state IN %(states)s
+                """,
+                states=tuple(ACTIVE_STAY_STATES),
+            ))
+
     @api.model
     def create(self, vals):
         """Quand un séjour est créé :
@@ -500,7 +617,7 @@ class HotelBookingStayS(models.Model):
         _logger.info(
             "[CHECKOUT] stay=%s | summary_before_report=%s",
             self.id,
-            self.financial_summary_details,
+            self.pricing_breakdown,
         )
 
         # Étape 2 : Générer la facture PDF
@@ -670,7 +787,7 @@ class HotelBookingStayS(models.Model):
         Méthode utilitaire pour vérifier la disponibilité et retourner un warning.
         VERSION AMÉLIORÉE : Meilleure gestion des erreurs et messages plus clairs.
         """
-        buffer_hours = 0.5
+        buffer_hours = CLEANING_BUFFER_HOURS
 
         try:
             # --- Validation des prérequis ---
@@ -857,6 +974,15 @@ class HotelBookingStayS(models.Model):
                 )
                 continue
 
+            # Déjà vérifié par la pré-validation de create (même lot, même transaction)
+            validated = self.env.context.get("hotel_availability_validated")
+            if validated and rec._availability_signature() in validated:
+                _logger_booking.debug(
+                    "[CONSTRAINT] Disponibilité déjà validée avant insertion | stay %s",
+                    rec.id,
+                )
+                continue
+
             _logger_booking.info(
                 "🔒 Vérification contrainte disponibilité | type=%s | in=%s | out=%s",
                 rec.room_type_id.name,
@@ -866,16 +992,22 @@ class HotelBookingStayS(models.Model):
 
             try:
                 availability_engine = self.env["hotel.room.availability.engine"]
-                availability_result = availability_engine.check_availability(
-                    room_type_id=rec.room_type_id.id,
-                    checkin_date=rec.planned_checkin_date,
-                    checkout_date=rec.planned_checkout_date,
-                    exclude_stay_id=rec.id if rec.id else None,
-                    buffer_hours=0.5,
-                    reservation_type_id=(
-                        rec.reservation_type_id.id if rec.reservation_type_id else None
-                    ),
-                )
+                if rec.room_id:
+                    # Chambre imposée : c'est elle qui doit être libre, pas le type
+                    availability_result = availability_engine.check_availability_batch([
+                        rec._availability_request()
+                    ])[0]
+                else:
+                    availability_result = availability_engine.check_availability(
+                        room_type_id=rec.room_type_id.id,
+                        checkin_date=rec.planned_checkin_date,
+                        checkout_date=rec.planned_checkout_date,
+                        exclude_stay_id=rec.id if rec.id else None,
+                        buffer_hours=CLEANING_BUFFER_HOURS,
+                        reservation_type_id=(
+                            rec.reservation_type_id.id if rec.reservation_type_id else None
+                        ),
+                    )
 
                 status = availability_result.get("status")
                 _logger_booking.info(
@@ -1011,7 +1143,7 @@ class HotelBookingStayS(models.Model):
                 rec.late_checkout_price = 0.0
                 rec.room_price_total = 0.0
                 rec.pricing_rule_id = False
-                rec.pricing_adjustments = False
+                rec.pricing_breakdown = False
                 rec.pricing_price_base = 0.0
                 continue
 
@@ -1218,10 +1350,14 @@ class HotelBookingStayS(models.Model):
         )
 
         # --- Étape 3 : Disponibilité ---
+        # Extension dans la chambre du séjour (recherche indexée sur cette seule
+        # chambre) ; le séjour lui-même est exclu des conflits.
         result_avail = engine_avail.check_availability(
             room_type_id=rec.room_type_id.id,
             start=proposed_in,
             end=proposed_out,
+            room_id=rec.room_id.id or None,
+            exclude_stay_id=rec._origin.id or None,
         )
         early_late_logger.info("[EVAL][AVAIL] %s", result_avail)
 
@@ -1250,6 +1386,26 @@ class HotelBookingStayS(models.Model):
     ###############################################
     # Gestion des tarifications
     ###############################################
+    @api.depends("pricing_breakdown")
+    def _compute_pricing_breakdown_text(self):
+        """Vues texte (lecture seule) du détail tarifaire structuré."""
+        for rec in self:
+            breakdown = rec.pricing_breakdown
+            if not breakdown:
+                rec.pricing_adjustments = False
+                rec.pricing_supplements = False
+                rec.financial_summary_details = False
+                continue
+            rec.pricing_adjustments = json.dumps(
+                breakdown.get("adjustments", []), ensure_ascii=False, indent=2
+            )
+            rec.pricing_supplements = json.dumps(
+                breakdown.get("supplements", []), ensure_ascii=False, indent=2
+            )
+            rec.financial_summary_details = json.dumps(
+                breakdown, ensure_ascii=False, indent=2, default=str
+            )
+
     @api.depends(
         "room_type_id",
         "reservation_type_id",
@@ -1263,11 +1419,16 @@ class HotelBookingStayS(models.Model):
         "requested_checkin_datetime",
         "requested_checkout_datetime",
     )
+    @instrument()
     def _compute_room_price_total(self):
         """
         Calcule le prix de la  chambre en appelant le service tarifaire.
         Gère les suppléments Early Check-in / Late Check-out en parallèle.
+
+        Les séjours sont tarifés en un seul appel (compute_price_batch) : la
+        règle n'est résolue qu'une fois par (type, réservation, saison).
         """
+        pending = []  # (rec, ctx, inputs du service)
         for rec in self:
             # Reset par défaut
             rec.room_price_total = 0.0
@@ -1275,9 +1436,8 @@ class HotelBookingStayS(models.Model):
             rec.pricing_unit = False
             rec.pricing_unit_price = 0.0
             rec.pricing_quantity = 0.0
-            rec.pricing_adjustments = False
+            rec.pricing_breakdown = False
             rec.pricing_price_base = 0.0
-            rec.pricing_supplements = False
             rec.early_checkin_fee = 0.0
             rec.late_checkout_fee = 0.0
 
@@ -1288,16 +1448,14 @@ class HotelBookingStayS(models.Model):
                 "reservation_type_id": (
                     rec.reservation_type_id.id if rec.reservation_type_id else None
                 ),
-                "planned_checkin_date": rec.planned_checkin_date
-                and rec.planned_checkin_date.isoformat(),
-                "planned_checkout_date": rec.planned_checkout_date
-                and rec.planned_checkout_date.isoformat(),
+                "planned_checkin_date": rec.planned_checkin_date,
+                "planned_checkout_date": rec.planned_checkout_date,
                 "nb_persons": len(rec.occupant_ids) or 1,
                 "user_tz": self.env.user.tz,
             }
 
             _logger_booking.info(
-                "📌 [STAY/INIT] Début calcul prix chambre | ctx=%s", ctx
+                "📌 [STAY/INIT] Début calcul prix chambre | ctx=%s", LazyJson(ctx)
             )
 
             if not (
@@ -1309,8 +1467,7 @@ class HotelBookingStayS(models.Model):
                 _logger_booking.debug(
                     "[PRICING][SKIP] Inputs incomplets pour stay=%s | ctx=%s",
                     rec.id or "new",
-                    json.dumps(ctx, ensure_ascii=False),
-                    ctx,
+                    LazyJson(ctx),
                 )
                 continue
 
@@ -1334,33 +1491,53 @@ class HotelBookingStayS(models.Model):
                 "[PRICING][INPUT] stay=%s | modes=%s | requested_map=%s",
                 rec.id or "new",
                 pricing_modes,
-                {
-                    k: (v.isoformat() if hasattr(v, "isoformat") else v)
-                    for k, v in requested_map.items()
-                },
+                LazyJson(requested_map),
             )
 
-            # =========================================================
-            # 2) Appel au moteur tarifaire
-            # =========================================================
-            try:
-                _logger_booking.info(
-                    "➡️ [STAY/CALL] Appel moteur tarifaire pour stay=%s", rec.id
-                )
-                result = self.env["hotel.pricing.service"].compute_price(
-                    room_type_id=rec.room_type_id.id,
-                    reservation_type_id=rec.reservation_type_id.id,
-                    planned_checkin_date=rec.planned_checkin_date,
-                    planned_checkout_date=rec.planned_checkout_date,
-                    nb_persons=len(rec.occupant_ids) or 1,
-                    pricing_mode=pricing_modes,
-                    requested_datetime=requested_map,
+            pending.append(
+                (
+                    rec,
+                    ctx,
+                    {
+                        "room_type_id": rec.room_type_id.id,
+                        "reservation_type_id": rec.reservation_type_id.id,
+                        "planned_checkin_date": rec.planned_checkin_date,
+                        "planned_checkout_date": rec.planned_checkout_date,
+                        "nb_persons": len(rec.occupant_ids) or 1,
+                        "pricing_mode": pricing_modes,
+                        "requested_datetime": requested_map,
+                        "ctx": ctx,
+                    },
                 )
+            )
+
+        if not pending:
+            return
 
+        # =========================================================
+        # 2) Appel au moteur tarifaire (un seul lot)
+        # =========================================================
+        _logger_booking.info(
+            "➡️ [STAY/CALL] Appel moteur tarifaire pour %s séjour(s)", len(pending)
+        )
+        try:
+            results = self.env["hotel.pricing.service"].compute_price_batch(
+                [inputs for _rec, _ctx, inputs in pending]
+            )
+        except Exception as e:
+            _logger.exception(
+                "[PRICING][EXC] Erreur compute_price_batch pour stays=%s | err=%s",
+                [rec.id for rec, _ctx, _inputs in pending],
+                e,
+            )
+            return
+
+        for (rec, ctx, _inputs), result in zip(pending, results):
+            try:
                 _logger_booking.info(
                     "[PRICING][RAW] stay=%s | result=%s",
                     rec.id or "new",
-                    json.dumps(result, ensure_ascii=False, indent=2, default=str),
+                    LazyJson(result, indent=2),
                 )
 
                 if not isinstance(result, dict):
@@ -1371,6 +1548,9 @@ class HotelBookingStayS(models.Model):
                     )
                     continue
 
+                if result.get("error"):
+                    raise ValidationError(result["error"])
+
                 # =========================================================
                 # 3) Affecter les résultats
                 # =========================================================
@@ -1381,12 +1561,7 @@ class HotelBookingStayS(models.Model):
                 rec.pricing_unit = base_data.get("unit") or False
                 rec.pricing_unit_price = float(base_data.get("unit_price", 0.0))
                 rec.pricing_quantity = float(base_data.get("quantity", 0.0))
-                rec.pricing_adjustments = json.dumps(
-                    result.get("adjustments", []), ensure_ascii=False, indent=2
-                )
-                rec.pricing_supplements = json.dumps(
-                    result.get("supplements", []), ensure_ascii=False, indent=2
-                )
+                rec.pricing_breakdown = result
 
                 # Extraire les suppléments Early/Late
                 for sup in result.get("supplements", []):
@@ -1407,29 +1582,14 @@ class HotelBookingStayS(models.Model):
                             sup,
                         )
 
-                rec.financial_summary_details = json.dumps(
-                    result, ensure_ascii=False, indent=2, default=str
-                )
-
-                _logger.info(
-                    "[CHECK FINANCIAL] stay=%s | financial_summary_details=%s",
-                    rec.id,
-                    rec.financial_summary_details,
-                )
                 early_late_logger.info(
-                    "[PRICING][OK] stay=%s | base=%s | total=%s | rule_id=%s | adjustments=%s | supplements=%s,| summary=%s",
+                    "[PRICING][OK] stay=%s | base=%s | total=%s | rule_id=%s | adjustments=%s | supplements=%s",
                     rec.id,
                     rec.pricing_price_base,
                     rec.room_price_total,
                     rec.pricing_rule_id,
-                    rec.pricing_unit,
-                    rec.pricing_unit_price,
-                    rec.pricing_quantity,
-                    rec.pricing_adjustments,
-                    rec.pricing_supplements,
-                    rec.financial_summary_details,
-                    rec.early_checkin_fee,
-                    rec.late_checkout_fee,
+                    result.get("adjustments"),
+                    result.get("supplements"),
                 )
                 _logger_booking.info(
                     "✅ [STAY/OK] stay=%s | base=%s | total=%s | rule_id=%s | unit=%s | qty=%s",
@@ -1445,13 +1605,13 @@ class HotelBookingStayS(models.Model):
                 _logger.exception(
                     "[PRICING][EXC] Erreur compute_price pour stay=%s | ctx=%s | err=%s",
                     rec.id,
-                    json.dumps(ctx, ensure_ascii=False),
+                    LazyJson(ctx),
                     e,
                 )
                 _logger_booking.exception(
                     "🔥 [STAY/EXC] Erreur compute_price pour stay=%s | ctx=%s | err=%s",
                     rec.id,
-                    ctx,
+                    LazyJson(ctx),
                     e,
                 )
 
@@ -1695,11 +1855,10 @@ class HotelBookingStayS(models.Model):
         Retourne un tableau exploitable pour l'impression (facture, récapitulatif, etc.)
         """
         self.ensure_one()
-        if not self.financial_summary_details:
+        summary = self.pricing_breakdown
+        if not summary:
             return []
 
-        summary = json.loads(self.financial_summary_details)
-
         lines = []
 
         # Prix de base
@@ -1748,9 +1907,9 @@ class HotelBookingStayS(models.Model):
         )
 
         _logger.info(
-            "[REPORT] stay=%s | financial_summary_details=%s",
+            "[REPORT] stay=%s | pricing_breakdown=%s",
             self.id,
-            self.financial_summary_details,
+            summary,
         )
 
         return lines
@@ -1791,7 +1950,7 @@ class HotelBookingStayS(models.Model):
                 checkin_date=rec.planned_checkin_date,
                 checkout_date=rec.planned_checkout_date,
                 exclude_stay_id=rec.id if rec.id else None,
-                buffer_hours=0.5,
+                buffer_hours=CLEANING_BUFFER_HOURS,
                 reservation_type_id=(
                     rec.reservation_type_id.id if rec.reservation_type_id else None
                 ),
@@ -1802,23 +1961,113 @@ class HotelBookingStayS(models.Model):
                     result.get("message", "Aucune chambre disponible")
                 )
 
+    def _availability_signature(self):
+        """
+        Clé d'une vérification de disponibilité (type, période, type de
+        réservation, chambre). La chambre en fait partie : une vérification
+        par type ne valide pas une chambre imposée.
+        """
+        self.ensure_one()
+        return (
+            self.room_type_id.id,
+            self.planned_checkin_date,
+            self.planned_checkout_date,
+            self.reservation_type_id.id or None,
+            self.room_id.id or None,
+        )
+
+    def _availability_request(self):
+        """Demande au format de check_availability_batch (chambre imposée comprise)."""
+        self.ensure_one()
+        return {
+            "room_type_id": self.room_type_id.id,
+            "checkin_date": self.planned_checkin_date,
+            "checkout_date": self.planned_checkout_date,
+            "buffer_hours": CLEANING_BUFFER_HOURS,
+            "reservation_type_id": self.reservation_type_id.id or None,
+            "room_id": self.room_id.id or None,
+            "exclude_stay_id": self.id or None,
+        }
+
     @api.model
-    def create(self, vals):
-        """S'assurer que actual = planned par défaut + validation disponibilité"""
-        if not vals.get("actual_checkin_date") and vals.get("planned_checkin_date"):
-            vals["actual_checkin_date"] = vals["planned_checkin_date"]
-        if not vals.get("actual_checkout_date") and vals.get("planned_checkout_date"):
-            vals["actual_checkout_date"] = vals["planned_checkout_date"]
+    def _prevalidate_availability(self, vals_list):
+        """
+        Vérifie en un seul appel moteur, AVANT insertion, la disponibilité de
+        tous les séjours à créer (entre eux et contre la base). Une chambre
+        fournie dans les vals est vérifiée elle-même ; sinon une chambre libre
+        du type est attribuée dans les vals.
+
+        :return: frozenset des signatures validées, transmises par contexte à la
+                 contrainte _check_room_availability pour qu'elle ne relance pas
+                 le moteur
+        """
+        pending = []
+        for vals in vals_list:
+            rec = self.new(vals)
+            if not rec.planned_checkin_date or not rec.planned_checkout_date:
+                rec._compute_dates_logic(rec)
+            if (
+                not rec.room_type_id
+                or not rec.planned_checkin_date
+                or not rec.planned_checkout_date
+            ):
+                continue
+            pending.append((vals, rec))
 
-        record = super().create(vals)
-        try:
-            record._validate_availability_before_save()
-        except ValidationError as e:
-            # Si validation échoue, supprimer l'enregistrement créé
-            record.unlink()
-            raise e
+        if not pending:
+            return frozenset()
 
-        return record
+        results = self.env["hotel.room.availability.engine"].check_availability_batch([
+            rec._availability_request() for _vals, rec in pending
+        ])
+
+        validated = set()
+        for (vals, rec), result in zip(pending, results):
+            status = result.get("status")
+            _logger_booking.info(
+                "[CREATE] Pré-validation disponibilité | type=%s | status=%s | room=%s",
+                rec.room_type_id.name,
+                status,
+                result.get("room_name", "N/A"),
+            )
+            if status == "unavailable":
+                raise ValidationError(
+                    result.get("message", "Aucune chambre disponible pour ces dates.")
+                )
+            if status == "error":
+                raise ValidationError(
+                    _("Erreur technique : %s") % result.get("message")
+                )
+            if not vals.get("room_id") and result.get("room_id"):
+                vals["room_id"] = result["room_id"]
+                rec.room_id = result["room_id"]
+            validated.add(rec._availability_signature())
+        return frozenset(validated)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        S'assurer que actual = planned par défaut + validation disponibilité.
+        La disponibilité est vérifiée une seule fois pour tout le lot, avant
+        insertion : aucun enregistrement créé puis supprimé en cas de refus.
+        """
+        for vals in vals_list:
+            if not vals.get("actual_checkin_date") and vals.get("planned_checkin_date"):
+                vals["actual_checkin_date"] = vals["planned_checkin_date"]
+            if not vals.get("actual_checkout_date") and vals.get("planned_checkout_date"):
+                vals["actual_checkout_date"] = vals["planned_checkout_date"]
+
+        validated = self._prevalidate_availability(vals_list)
+        records = self._check_occupancy_conflict(
+            lambda: super(
+                HotelBookingStayS,
+                self.with_context(hotel_availability_validated=validated),
+            ).create(vals_list)
+        ).with_env(self.env)
+        records._notify_availability_change([], records._availability_footprints())
+        self.env["hotel.metric.dirty.day"]._mark_dirty(records._metric_days())
+        self.env["hotel.stay.night"]._mark_stays(records.ids)
+        return records
 
     def write(self, vals):
         """Si les dates prévues changent, on ajuste les actuals (sauf si déjà modifiées par EC/LC)"""
@@ -1827,7 +2076,133 @@ class HotelBookingStayS(models.Model):
                 vals.setdefault("actual_checkin_date", vals["planned_checkin_date"])
             if "planned_checkout_date" in vals and not rec.request_type:
                 vals.setdefault("actual_checkout_date", vals["planned_checkout_date"])
-        return super().write(vals)
+        before = self._availability_footprints()
+        metric_days = (
+            self._metric_days() if self._metric_trigger_fields().intersection(vals) else None
+        )
+        if set(OCCUPANCY_FIELDS).intersection(vals):
+            res = self._check_occupancy_conflict(lambda: super(HotelBookingStayS, self).write(vals))
+        else:
+            res = super().write(vals)
+        self._notify_availability_change(before, self._availability_footprints())
+        if metric_days is not None:
+            self.env["hotel.metric.dirty.day"]._mark_dirty(metric_days | self._metric_days())
+            self.env["hotel.stay.night"]._mark_stays(self.ids)
+        return res
+
+    def unlink(self):
+        before = self._availability_footprints()
+        metric_days = self._metric_days()
+        res = super().unlink()
+        self._notify_availability_change(before, [])
+        self.env["hotel.metric.dirty.day"]._mark_dirty(metric_days)
+        return res
+
+    def _check_occupancy_conflict(self, operation):
+        """
+        Exécute ``operation`` (create/write) et pousse aussitôt l'occupation en
+        base, dans un savepoint : un chevauchement refusé par la contrainte
+        d'exclusion (séjour concurrent validé entre-temps) remonte comme une
+        ValidationError lisible au lieu d'une erreur PostgreSQL brute, et le
+        curseur reste utilisable.
+        """
+        try:
+            with self.env.cr.savepoint(flush=False):
+                result = operation()
+                self.flush_model(OCCUPANCY_FIELDS)
+        except ExclusionViolation as e:
+            if e.diag.constraint_name != OCCUPANCY_EXCLUSION_CONSTRAINT:
+                raise
+            _logger.warning("[STAY/OCCUPANCY] Chevauchement refusé par la base : %s", e)
+            raise ValidationError(_(
+                "Chambre déjà occupée sur cette période (nettoyage compris) : un autre "
+                "séjour vient d'y être enregistré. Choisissez une autre chambre ou "
+                "d'autres dates."
+            )) from e
+        return result
+
+    @api.model
+    def _metric_trigger_fields(self):
+        """
+        METRIC_STAY_FIELDS complété, de proche en proche, par les dépendances
+        des champs calculés stockés qui en font partie (prix, modes EC/LC) :
+        un recalcul ne passe pas par write(), c'est l'écriture de ses
+        dépendances qu'il faut intercepter.
+        """
+        cls = type(self)
+        if cls._metric_trigger_fields_cache is None:
+            triggers = set(METRIC_STAY_FIELDS)
+            todo = list(triggers)
+            while todo:
+                field = self._fields.get(todo.pop())
+                if not field or not (field.compute and field.store):
+                    continue
+                for path in self.pool.field_depends[field]:
+                    name = path.split(".")[0]
+                    if name not in triggers:
+                        triggers.add(name)
+                        todo.append(name)
+            cls._metric_trigger_fields_cache = frozenset(triggers)
+        return cls._metric_trigger_fields_cache
+
+    def _metric_days(self):
+        """Jours de métriques couverts par les séjours (arrivée -> départ prévus inclus)."""
+        days = set()
+        for rec in self:
+            if not rec.planned_checkin_date or not rec.planned_checkout_date:
+                continue
+            day = rec.planned_checkin_date.date()
+            last_day = rec.planned_checkout_date.date()
+            while day <= last_day:
+                days.add(day)
+                day += timedelta(days=1)
+        return days
+
+    # ==================== SUIVI DES CHANGEMENTS DE DISPONIBILITÉ ====================
+
+    def _availability_footprints(self):
+        """Empreintes actuelles (chambre, période, état actif) des séjours."""
+        return [
+            StayFootprint(
+                stay_id=rec.id,
+                room_type_id=rec.room_type_id.id or rec.room_id.room_type_id.id,
+                room_id=rec.room_id.id,
+                checkin=rec.actual_checkin_date,
+                checkout=rec.actual_checkout_date,
+                active=bool(
+                    rec.state in ACTIVE_STAY_STATES
+                    and rec.room_id
+                    and rec.actual_checkin_date
+                    and rec.actual_checkout_date
+                ),
+            )
+            for rec in self
+        ]
+
+    def _notify_availability_change(self, before, after):
+        """Ne transmet au dispatcher que les empreintes réellement modifiées."""
+        after_by_id = {fp.stay_id: fp for fp in after}
+        before_by_id = {fp.stay_id: fp for fp in before}
+        removed = [fp for fp in before if after_by_id.get(fp.stay_id) != fp]
+        added = [fp for fp in after if before_by_id.get(fp.stay_id) != fp]
+        if removed or added:
+            self._on_availability_changed(removed, added)
+
+    def _on_availability_changed(self, removed, added):
+        """
+        Point d'entrée unique après création/modification/suppression de séjours
+        touchant la disponibilité.
+
+        :param removed: empreintes (StayFootprint) avant changement
+        :param added: empreintes (StayFootprint) après changement
+        """
+        room_type_ids = {fp.room_type_id for fp in removed + added if fp.room_type_id}
+        if not room_type_ids:
+            return
+        self.env["hotel.room.type"].browse(room_type_ids)._bump_availability_generation()
+
+        # Capacité journalière : seuls les jours touchés sont recalculés, après commit
+        self.env["hotel.room.type.capacity"]._refresh_for_footprints(removed + added)
 
     @api.depends(
         "requested_checkin_datetime",
@@ -1,6 +1,7 @@
 from ..logging_config import eclc_logger as _logger
 from odoo import models, api
 from datetime import datetime
+from ..utils.trace_events import trace_event
 
 
 class HotelECLCEngine(models.AbstractModel):
@@ -19,7 +20,22 @@ class HotelECLCEngine(models.AbstractModel):
         :param room_type_id: ID du type de chambre concerné
         :return: dict avec résultat + pricing_mode
         """
-        
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+        with trace_event(
+            "eclc.evaluate", "eclc", self.env.cr, room_type_id=room_type_id,
+            request_type=request_type,
+        ) as span:
+            result = self._evaluate_request(
+                request_type, requested_datetime, planned_datetime, room_type_id
+            )
+            span.set(
+                decision=result["status"],
+                pricing_mode=result["pricing_mode"],
+                difference_hours=result["difference_hours"],
+            )
+            return result
+
+    def _evaluate_request(self, request_type, requested_datetime, planned_datetime, room_type_id):
         _logger.info("🔎 [ECLC] Évaluation de la demande")
         _logger.info(
             "➡️  Type: %s | Demande: %s | Prévu: %s | RoomType ID: %s",
@@ -1,7 +1,11 @@
 from odoo import api, fields, models
+from odoo.tools import SQL
+from collections import Counter, defaultdict
 from datetime import date, timedelta, datetime
 import logging
 
+from ..utils.perf import instrument
+
 _logger = logging.getLogger(__name__)
 
 class HotelMetric(models.Model):
@@ -51,9 +55,121 @@ class HotelMetric(models.Model):
         daily = total / nights
         return {start + timedelta(days=i): daily for i in range(nights)}
 
+    #  Agrégats SQL des séjours et du POS
+
+    def _stay_metrics_for_date(self, stays_query, target_date):
+        """
+        Comptages de chambres et revenus du jour, en une requête sur les
+        séjours de ``stays_query`` (Query du domaine de sélection).
+
+        Mêmes règles que _split_revenue_by_day et la classification historique :
+        - arrivée et départ le même jour : Day Use, tout le montant ce jour-là ;
+        - sinon montant / nombre de nuits, pour chaque nuit [arrivée, départ) ;
+        - Nuitée si la durée est comprise dans [24h, 48h), Long séjour sinon
+          (y compris moins de 24h à cheval sur deux dates).
+        """
+        Stay = self.env["hotel.booking.stay"]
+        Stay.flush_model([
+            "room_id", "reservation_type_id", "room_price_total",
+            "planned_checkin_date", "planned_checkout_date",
+        ])
+        self.env["hotel.reservation.type"].flush_model(["code"])
+
+        alias = stays_query.table
+        self.env.cr.execute(SQL(
+            """
+            WITH stays AS (%(stays)s),
+            days AS (
+                SELECT s.room_id,
+                       rt.code,
+                       s.checkin::date AS day_in,
+                       s.checkout::date AS day_out,
+                       s.checkout - s.checkin AS duration,
+                       COALESCE(s.total, 0)::float8 AS total
+                  FROM stays s
+                  LEFT JOIN hotel_reservation_type rt ON rt.id = s.reservation_type_id
+            ),
+            amounts AS (
+                SELECT d.*,
+                       CASE
+                           WHEN d.day_in = d.day_out THEN
+                               CASE WHEN d.day_in = %(day)s THEN d.total ELSE 0 END
+                           WHEN d.day_out > d.day_in
+                                AND %(day)s >= d.day_in AND %(day)s < d.day_out THEN
+                               d.total / (d.day_out - d.day_in)
+                           ELSE 0
+                       END AS amount_today,
+                       CASE
+                           WHEN d.day_in = d.day_out THEN 'short'
+                           WHEN d.duration >= interval '1 day'
+                                AND d.duration < interval '2 days' THEN 'night'
+                           ELSE 'long'
+                       END AS category
+                  FROM days d
+            )
+            SELECT COUNT(*),
+                   COUNT(DISTINCT room_id),
+                   COUNT(DISTINCT room_id) FILTER (WHERE code = 'flexible'),
+                   COUNT(DISTINCT room_id) FILTER (WHERE code = 'classic'),
+                   COALESCE(SUM(amount_today), 0),
+                   COALESCE(SUM(amount_today) FILTER (WHERE category = 'short'), 0),
+                   COALESCE(SUM(amount_today) FILTER (WHERE category = 'night'), 0),
+                   COALESCE(SUM(amount_today) FILTER (WHERE category = 'long'), 0)
+              FROM amounts
+            """,
+            stays=stays_query.select(
+                SQL.identifier(alias, "room_id"),
+                SQL.identifier(alias, "reservation_type_id"),
+                SQL("%s AS checkin", SQL.identifier(alias, "planned_checkin_date")),
+                SQL("%s AS checkout", SQL.identifier(alias, "planned_checkout_date")),
+                SQL("%s AS total", SQL.identifier(alias, "room_price_total")),
+            ),
+            day=target_date,
+        ))
+        (stays_count, rooms_occupied, rooms_short_stay, rooms_night_use,
+         revenue_total, revenue_short_stay, revenue_night_use,
+         revenue_long_stay) = self.env.cr.fetchone()
+        return {
+            "stays_count": stays_count,
+            "rooms_occupied": rooms_occupied,
+            "rooms_short_stay": rooms_short_stay,
+            "rooms_night_use": rooms_night_use,
+            "revenue_total": revenue_total,
+            "revenue_short_stay": revenue_short_stay,
+            "revenue_night_use": revenue_night_use,
+            "revenue_long_stay": revenue_long_stay,
+        }
+
+    def _pos_metrics_for_period(self, start, end):
+        """
+        (nombre de commandes, revenu, top 5 des produits) des commandes POS
+        payées de la période, agrégés en base.
+        """
+        order_domain = [
+            ("date_order", ">=", start),
+            ("date_order", "<=", end),
+            ("state", "in", ["paid", "done", "invoiced"]),
+        ]
+        [(pos_orders_count, pos_revenue_total)] = self.env["pos.order"]._read_group(
+            order_domain, [], ["__count", "amount_total:sum"]
+        )
+
+        top_products = self.env["pos.order.line"]._read_group(
+            [("order_id", "any", order_domain)],
+            ["product_id"],
+            ["qty:sum"],
+            order="qty:sum desc",
+            limit=5,
+        )
+        top_products_str = "\n".join(
+            f"{product.display_name}: {qty}" for product, qty in top_products
+        )
+        return pos_orders_count, pos_revenue_total or 0.0, top_products_str
+
     #  Calcul principal des métriques
  
     @api.model
+    @instrument()
     def _compute_metrics_for_date(self, target_date):
         """Calcule les métriques pour une date donnée à partir des séjours."""
         
@@ -68,56 +184,26 @@ class HotelMetric(models.Model):
         start = datetime.combine(target_date, datetime.min.time())
         end = datetime.combine(target_date, datetime.max.time())
 
-        stays = Stay.search([
+        stays_query = Stay._search([
             ("planned_checkin_date", "<=", end),
             ("planned_checkout_date", ">=", start),
             #("state", "in", ["ongoing"]),
         ])
-        
-        _logger.info(f"➡️ Séjours trouvés ({len(stays)}): {[s.id for s in stays]}")
-
 
-        # ---- Comptages ----
-        rooms_occupied = len(stays.mapped("room_id"))
-        short_stays = stays.filtered(lambda s: s.reservation_type_id.code == "flexible")
-        night_stays = stays.filtered(lambda s: s.reservation_type_id.code == "classic")
-
-        rooms_short_stay = len(short_stays.mapped("room_id"))
-        rooms_night_use = len(night_stays.mapped("room_id"))
-        
+        # ---- Comptages et revenus répartis : une seule requête ----
+        stay_metrics = self._stay_metrics_for_date(stays_query, target_date)
+        rooms_occupied = stay_metrics["rooms_occupied"]
+        rooms_short_stay = stay_metrics["rooms_short_stay"]
+        rooms_night_use = stay_metrics["rooms_night_use"]
+        revenue_total = stay_metrics["revenue_total"]
+        revenue_short_stay = stay_metrics["revenue_short_stay"]
+        revenue_night_use = stay_metrics["revenue_night_use"]
+        revenue_long_stay = stay_metrics["revenue_long_stay"]
+
+        _logger.info(f"➡️ Séjours trouvés : {stay_metrics['stays_count']}")
         _logger.info(f"➡️ Chambres occupées : {rooms_occupied}")
-        _logger.info(f"➡️ Séjours Day Use : {len(short_stays)}")
-        _logger.info(f"➡️ Séjours Nuitée : {len(night_stays)}")
-
-
-        # ---- Calcul des revenus répartis ----
-        revenue_total = 0.0
-        revenue_short_stay = 0.0
-        revenue_night_use = 0.0
-        revenue_long_stay = 0.0
-
-        for stay in stays:
-            day_revenues = self._split_revenue_by_day(stay)
-            amount_today = day_revenues.get(target_date, 0.0)
-            revenue_total += amount_today
-
-            # Classification du revenu selon le type
-            if stay.planned_checkin_date.date() == stay.planned_checkout_date.date():
-                # Day Use
-                revenue_short_stay += amount_today
-            elif (stay.planned_checkout_date - stay.planned_checkin_date).days == 1:
-                # Nuitée classique
-                revenue_night_use += amount_today
-            else:
-                # Long stay (2+ nuits)
-                revenue_long_stay += amount_today
-
-            #  Log pour vérification
-            _logger.info(f"[METRIC] {stay.id} | {stay.reservation_type_id.code} | "
-                         f"Montant total={stay.room_price_total} | {target_date} => {amount_today}")
-            
-            _logger.info(f"   🏨 {stay.id} | type={stay.reservation_type_id.code} | total={stay.room_price_total} | "
-                     f"reparti sur {len(day_revenues)} jours | montant du jour={amount_today}")
+        _logger.info(f"➡️ Chambres Day Use : {rooms_short_stay}")
+        _logger.info(f"➡️ Chambres Nuitée : {rooms_night_use}")
 
         # ---- Calcul des ratios ----
         occupancy_rate = (rooms_occupied / rooms_total * 100) if rooms_total else 0
@@ -131,41 +217,12 @@ class HotelMetric(models.Model):
       
         #  MÉTRIQUES RESTAURATION (POS)
         
-        PosOrder = self.env["pos.order"]
-        PosLine = self.env["pos.order.line"]
-        StockQuant = self.env["stock.quant"]
-
-        # Récupération des commandes POS du jour
-        pos_orders = PosOrder.search([
-            ("date_order", ">=", start),
-            ("date_order", "<=", end),
-            ("state", "in", ["paid", "done", "invoiced"]),
-        ])
-
-        pos_orders_count = len(pos_orders)
-        pos_revenue_total = sum(pos_orders.mapped("amount_total"))
+        pos_orders_count, pos_revenue_total, top_products_str = self._pos_metrics_for_period(
+            start, end
+        )
 
         _logger.info("🍽️ [POS] Commandes trouvées : %s", pos_orders_count)
-        for order in pos_orders:
-            _logger.info("   🧾 POS Order %s | Total=%.2f | État=%s | Date=%s",
-                         order.name, order.amount_total, order.state, order.date_order)
-
         _logger.info("💰 [POS] Revenu total du jour : %.2f", pos_revenue_total)
-
-        # Lignes POS pour classement des produits
-        pos_lines = PosLine.search([("order_id", "in", pos_orders.ids)])
-        _logger.info("🍔 [POS] Lignes totales : %s", len(pos_lines))
-
-        product_sales = {}
-        for line in pos_lines:
-            name = line.product_id.display_name
-            qty = line.qty
-            product_sales[name] = product_sales.get(name, 0) + qty
-            _logger.debug("   ➕ %s vendu %s fois", name, qty)
-
-        top_products = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)
-        top_products_str = "\n".join([f"{name}: {qty}" for name, qty in top_products[:5]])
-
         _logger.info("🏆 [POS] Top produits du jour :\n%s", top_products_str)
 
 
@@ -199,6 +256,224 @@ class HotelMetric(models.Model):
         return metric
 
  
+    #  Calcul sur une période : un seul chargement, balayage jour par jour
+
+    def _stay_metrics_for_range(self, stays_query, start, end):
+        """
+        Comptages et revenus de chaque jour de [start, end], mêmes règles que
+        _stay_metrics_for_date. Les séjours sont lus une seule fois, puis
+        convertis en événements (entrée / sortie de chambre, début / fin de
+        montant par nuit) balayés jour par jour avec des totaux courants.
+
+        :return: {date: dict au format de _stay_metrics_for_date}
+        """
+        Stay = self.env["hotel.booking.stay"]
+        Stay.flush_model([
+            "room_id", "reservation_type_id", "room_price_total",
+            "planned_checkin_date", "planned_checkout_date",
+        ])
+        self.env["hotel.reservation.type"].flush_model(["code"])
+
+        alias = stays_query.table
+        self.env.cr.execute(SQL(
+            """
+            SELECT s.room_id, rt.code, s.checkin, s.checkout,
+                   COALESCE(s.total, 0)::float8
+              FROM (%(stays)s) s
+              LEFT JOIN hotel_reservation_type rt ON rt.id = s.reservation_type_id
+            """,
+            stays=stays_query.select(
+                SQL.identifier(alias, "room_id"),
+                SQL.identifier(alias, "reservation_type_id"),
+                SQL("%s AS checkin", SQL.identifier(alias, "planned_checkin_date")),
+                SQL("%s AS checkout", SQL.identifier(alias, "planned_checkout_date")),
+                SQL("%s AS total", SQL.identifier(alias, "room_price_total")),
+            ),
+        ))
+
+        one_day = timedelta(days=1)
+        arrivals = defaultdict(list)      # jour -> [(chambre, code)] présents à partir de ce jour
+        departures = defaultdict(list)    # jour -> [(chambre, code)] absents à partir de ce jour
+        rate_delta = defaultdict(lambda: defaultdict(float))  # jour -> {catégorie: Δ montant/nuit}
+        day_use = defaultdict(lambda: defaultdict(float))     # jour -> {catégorie: montant du jour}
+
+        for room_id, code, checkin, checkout, total in self.env.cr.fetchall():
+            day_in, day_out = checkin.date(), checkout.date()
+            first, last = max(day_in, start), min(day_out, end)
+            if first > last:
+                continue
+            arrivals[first].append((room_id, code))
+            departures[last + one_day].append((room_id, code))
+
+            if day_in == day_out:
+                day_use[day_in]["short"] += total
+                continue
+            duration = checkout - checkin
+            category = "night" if timedelta(days=1) <= duration < timedelta(days=2) else "long"
+            if day_out > day_in:
+                rate = total / (day_out - day_in).days
+                rate_delta[max(day_in, start)][category] += rate
+                rate_delta[min(day_out - one_day, end) + one_day][category] -= rate
+
+        rooms = Counter()
+        rooms_by_code = {"flexible": Counter(), "classic": Counter()}
+        running = defaultdict(float)
+        active_stays = 0
+        result = {}
+
+        day = start
+        while day <= end:
+            for room_id, code in departures.pop(day, ()):
+                active_stays -= 1
+                for counter in (rooms, rooms_by_code.get(code)):
+                    if counter is not None and room_id:
+                        counter[room_id] -= 1
+                        if not counter[room_id]:
+                            del counter[room_id]
+            for room_id, code in arrivals.pop(day, ()):
+                active_stays += 1
+                for counter in (rooms, rooms_by_code.get(code)):
+                    if counter is not None and room_id:
+                        counter[room_id] += 1
+            for category, delta in rate_delta.pop(day, {}).items():
+                running[category] += delta
+
+            # Arrondi : les ajouts / retraits successifs ne laissent pas de résidu
+            revenue = {
+                category: round(running[category] + day_use[day][category], 6)
+                for category in ("short", "night", "long")
+            }
+            result[day] = {
+                "stays_count": active_stays,
+                "rooms_occupied": len(rooms),
+                "rooms_short_stay": len(rooms_by_code["flexible"]),
+                "rooms_night_use": len(rooms_by_code["classic"]),
+                "revenue_total": round(sum(revenue.values()), 6),
+                "revenue_short_stay": revenue["short"],
+                "revenue_night_use": revenue["night"],
+                "revenue_long_stay": revenue["long"],
+            }
+            day += one_day
+        return result
+
+    def _pos_metrics_for_range(self, start, end):
+        """
+        {date: (nombre de commandes, revenu, top 5 des produits)} des
+        commandes POS payées de [start, end], en deux requêtes groupées par jour.
+        """
+        order_domain = [
+            ("date_order", ">=", datetime.combine(start, datetime.min.time())),
+            ("date_order", "<=", datetime.combine(end, datetime.max.time())),
+            ("state", "in", ["paid", "done", "invoiced"]),
+        ]
+        self.env["pos.order"].flush_model(["date_order", "state", "amount_total"])
+        self.env["pos.order.line"].flush_model(["order_id", "product_id", "qty"])
+        orders_query = self.env["pos.order"]._search(order_domain)
+        alias = orders_query.table
+        orders_sql = orders_query.select(
+            SQL.identifier(alias, "id"),
+            SQL("%s::date AS day", SQL.identifier(alias, "date_order")),
+            SQL("%s AS amount_total", SQL.identifier(alias, "amount_total")),
+        )
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT o.day, COUNT(*), COALESCE(SUM(o.amount_total), 0)::float8
+              FROM (%s) o
+             GROUP BY o.day
+            """,
+            orders_sql,
+        ))
+        totals = {day: (count, amount) for day, count, amount in self.env.cr.fetchall()}
+
+        self.env.cr.execute(SQL(
+            """
+            WITH qty AS (
+                SELECT o.day, l.product_id, SUM(l.qty)::float8 AS qty
+                  FROM (%s) o
+                  JOIN pos_order_line l ON l.order_id = o.id
+                 GROUP BY o.day, l.product_id
+            ),
+            ranked AS (
+                SELECT qty.*,
+                       row_number() OVER (PARTITION BY day ORDER BY qty DESC, product_id) AS rank
+                  FROM qty
+            )
+            SELECT day, product_id, qty FROM ranked WHERE rank <= 5 ORDER BY day, rank
+            """,
+            orders_sql,
+        ))
+        top_rows = self.env.cr.fetchall()
+        products = self.env["product.product"].browse({row[1] for row in top_rows})
+        names = {product.id: product.display_name for product in products}
+        top_products = defaultdict(list)
+        for day, product_id, qty in top_rows:
+            top_products[day].append(f"{names.get(product_id)}: {qty}")
+
+        return {
+            day: (count, amount, "\n".join(top_products.get(day, [])))
+            for day, (count, amount) in totals.items()
+        }
+
+    @api.model
+    @instrument()
+    def _compute_metrics_for_range(self, start, end):
+        """
+        Calcule et enregistre les métriques de chaque jour de [start, end] :
+        chambres, séjours et commandes POS sont chargés une seule fois pour
+        toute la période, puis toutes les lignes sont créées / mises à jour
+        en lot. Mêmes règles que _compute_metrics_for_date, jour par jour.
+        """
+        start = fields.Date.to_date(start)
+        end = fields.Date.to_date(end)
+        if end < start:
+            return self.browse()
+        _logger.info("🧮 [METRIC] Calcul des métriques du %s au %s", start, end)
+
+        rooms_total = self.env["hotel.room"].search_count([("active", "=", True)])
+        stays_query = self.env["hotel.booking.stay"]._search([
+            ("planned_checkin_date", "<=", datetime.combine(end, datetime.max.time())),
+            ("planned_checkout_date", ">=", datetime.combine(start, datetime.min.time())),
+        ])
+        stay_metrics = self._stay_metrics_for_range(stays_query, start, end)
+        pos_metrics = self._pos_metrics_for_range(start, end)
+
+        vals_by_day = {}
+        for day, metrics in stay_metrics.items():
+            pos_orders_count, pos_revenue_total, top_products_str = pos_metrics.get(day, (0, 0.0, ""))
+            vals_by_day[day] = {
+                "rooms_total": rooms_total,
+                "rooms_occupied": metrics["rooms_occupied"],
+                "rooms_short_stay": metrics["rooms_short_stay"],
+                "rooms_night_use": metrics["rooms_night_use"],
+                "occupancy_rate": (metrics["rooms_occupied"] / rooms_total * 100) if rooms_total else 0,
+                "short_stay_rate": (metrics["rooms_short_stay"] / rooms_total * 100) if rooms_total else 0,
+                "night_use_rate": (metrics["rooms_night_use"] / rooms_total * 100) if rooms_total else 0,
+                "revenue_total": metrics["revenue_total"],
+                "revenue_short_stay": metrics["revenue_short_stay"],
+                "revenue_night_use": metrics["revenue_night_use"],
+                "revenue_long_stay": metrics["revenue_long_stay"],
+                "revpar": metrics["revenue_total"] / rooms_total if rooms_total else 0,
+                "pos_orders_count": pos_orders_count,
+                "pos_revenue_total": pos_revenue_total,
+                "pos_top_products": top_products_str,
+            }
+
+        # ---- Création / mise à jour en lot ----
+        existing = {}
+        for metric in self.search([("date", ">=", start), ("date", "<=", end)]):
+            existing.setdefault(metric.date, metric)
+        for day, metric in existing.items():
+            metric.write(vals_by_day[day])
+        created = self.create([
+            {**vals, "date": day} for day, vals in vals_by_day.items() if day not in existing
+        ])
+        _logger.info(
+            "✅ [METRIC] %s jour(s) : %s mis à jour, %s créé(s)",
+            len(vals_by_day), len(existing), len(created),
+        )
+        return self.browse([metric.id for metric in existing.values()]) | created
+
     #  Bouton ou Cron pour le calcul du jour
    
     def action_compute_today(self):
@@ -215,9 +490,7 @@ class HotelMetric(models.Model):
         today = fields.Date.today()
         start_date = today - timedelta(days=days - 1)
 
-        for i in range(days):
-            target_date = start_date + timedelta(days=i)
-            self._compute_metrics_for_date(target_date)
+        self._compute_metrics_for_range(start_date, today)
         return {
             "type": "ir.actions.client",
             "tag": "display_notification",
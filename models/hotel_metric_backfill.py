@@ -0,0 +1,359 @@
+from odoo import api, fields, models, _
+from odoo.exceptions import ValidationError
+from odoo.http import request
+from odoo.tools import SQL
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_DAYS = 31
+DEFAULT_WORKERS = 4
+# Chaque worker ouvre son propre curseur : borne pour ne pas épuiser le pool
+MAX_WORKERS = 8
+
+CHUNK_STATES = [
+    ("pending", "À traiter"),
+    ("done", "Terminée"),
+    ("failed", "En échec"),
+]
+
+
+class HotelMetricBackfill(models.Model):
+    """
+    Recalcul historique des métriques sur une longue période.
+
+    La période est découpée en tranches de ``chunk_days`` jours, traitées en
+    parallèle par ``workers`` threads : chaque worker prend une tranche à
+    traiter (verrou SKIP LOCKED), la calcule dans son propre curseur puis
+    valide. Une interruption ne perd que les tranches en cours ; relancer le
+    recalcul reprend aux tranches non terminées.
+
+    Appelé par RPC, le recalcul est confié à la tâche de fond ; depuis un
+    shell Odoo, on peut en attendre la fin ::
+
+        env["hotel.metric.backfill"].backfill("2024-01-01", "2025-12-31", wait=True)
+
+    En mode test, les tranches sont traitées à la suite dans le curseur
+    courant, sans thread (le curseur de test est partagé).
+    """
+
+    _name = "hotel.metric.backfill"
+    _description = "Recalcul historique des métriques"
+    _order = "id desc"
+
+    name = fields.Char(string="Période", compute="_compute_name")
+    date_from = fields.Date(string="Du", required=True)
+    date_to = fields.Date(string="Au", required=True)
+    chunk_days = fields.Integer(string="Jours par tranche", default=DEFAULT_CHUNK_DAYS)
+    workers = fields.Integer(string="Workers parallèles", default=DEFAULT_WORKERS)
+    chunk_ids = fields.One2many(
+        "hotel.metric.backfill.chunk", "job_id", string="Tranches", readonly=True
+    )
+
+    chunks_total = fields.Integer(string="Tranches", compute="_compute_progress")
+    chunks_done = fields.Integer(string="Tranches terminées", compute="_compute_progress")
+    chunks_failed = fields.Integer(string="Tranches en échec", compute="_compute_progress")
+    progress = fields.Float(string="Progression (%)", compute="_compute_progress")
+    state = fields.Selection(
+        [("pending", "En cours"), ("done", "Terminé"), ("failed", "En échec")],
+        string="État",
+        compute="_compute_progress",
+    )
+
+    @api.depends("date_from", "date_to")
+    def _compute_name(self):
+        for rec in self:
+            rec.name = "%s → %s" % (rec.date_from or "", rec.date_to or "")
+
+    @api.depends("chunk_ids.state")
+    def _compute_progress(self):
+        counts = {
+            (job.id, state): count
+            for job, state, count in self.env["hotel.metric.backfill.chunk"]._read_group(
+                [("job_id", "in", self.ids)], ["job_id", "state"], ["__count"]
+            )
+        }
+        for rec in self:
+            done = counts.get((rec.id, "done"), 0)
+            failed = counts.get((rec.id, "failed"), 0)
+            pending = counts.get((rec.id, "pending"), 0)
+            total = done + failed + pending
+            rec.chunks_total = total
+            rec.chunks_done = done
+            rec.chunks_failed = failed
+            rec.progress = (done / total * 100) if total else 0.0
+            rec.state = "pending" if pending else ("failed" if failed else "done")
+
+    @api.constrains("date_from", "date_to", "chunk_days", "workers")
+    def _check_parameters(self):
+        for rec in self:
+            if rec.date_to < rec.date_from:
+                raise ValidationError(_("La date de fin doit suivre la date de début."))
+            if rec.chunk_days < 1 or rec.workers < 1:
+                raise ValidationError(
+                    _("Le nombre de jours par tranche et de workers doit être positif.")
+                )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        jobs = super().create(vals_list)
+        chunk_vals = []
+        for job in jobs:
+            day = job.date_from
+            while day <= job.date_to:
+                last_day = min(day + timedelta(days=job.chunk_days - 1), job.date_to)
+                chunk_vals.append({"job_id": job.id, "date_from": day, "date_to": last_day})
+                day = last_day + timedelta(days=1)
+        self.env["hotel.metric.backfill.chunk"].create(chunk_vals)
+        return jobs
+
+    # ==================== COMMANDES ====================
+
+    @api.model
+    def backfill(self, date_from, date_to, chunk_days=DEFAULT_CHUNK_DAYS,
+                 workers=DEFAULT_WORKERS, wait=False):
+        """
+        Recalcule les métriques de [date_from, date_to].
+
+        Par défaut, et toujours depuis une requête HTTP, le job est créé puis
+        confié à la tâche de fond : le worker HTTP n'est pas bloqué.
+        ``wait=True`` (shell) traite les tranches et attend la fin ; le job est
+        alors validé avant le lancement des workers (qui ne voient que les
+        données validées) et, en cas d'interruption, ``run()`` le reprend.
+
+        :return: dict {success, message, data: progression (cf. get_progress)}
+        """
+        vals = {
+            "date_from": fields.Date.to_date(date_from),
+            "date_to": fields.Date.to_date(date_to),
+            "chunk_days": chunk_days,
+            "workers": workers,
+        }
+        if not wait or request:
+            job = self.create(vals)
+            self._trigger_run()
+            result = job.get_progress()
+            result["message"] = _("Recalcul lancé en tâche de fond : %s") % result["message"]
+            return result
+        if self.env.registry.in_test_mode():
+            return self._run_job(self.create(vals).id, workers)
+        with self.env.registry.cursor() as cr:
+            job_id = self.with_env(self.env(cr=cr)).create(vals).id
+        return self._run_job(job_id, workers)
+
+    def run(self, workers=None):
+        """
+        Traite (ou reprend) les tranches non terminées du job, échecs compris.
+        Depuis une requête HTTP, le traitement est confié à la tâche de fond.
+        """
+        self.ensure_one()
+        if request:
+            self._reset_failed_chunks()
+            self._trigger_run()
+            return self.get_progress()
+        return self._run_job(self.id, workers or self.workers, retry_failed=True)
+
+    def action_run(self):
+        """Bouton : reprend les tranches non terminées en tâche de fond."""
+        self._reset_failed_chunks()
+        self._trigger_run()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Recalcul lancé"),
+                "message": _("Les tranches restantes sont traitées en tâche de fond."),
+                "sticky": False,
+            },
+        }
+
+    def _reset_failed_chunks(self):
+        self.chunk_ids.filtered(lambda c: c.state == "failed").write(
+            {"state": "pending", "error": False}
+        )
+
+    @api.model
+    def _trigger_run(self):
+        self.env.ref("hotel_management_extension.ir_cron_run_hotel_metric_backfill")._trigger()
+
+    @api.model
+    def _cron_run_backfills(self):
+        """Tâche de fond : traite les jobs ayant encore des tranches à traiter."""
+        for job in self.search([("chunk_ids.state", "=", "pending")], order="id"):
+            self._run_job(job.id, job.workers)
+
+    # ==================== EXÉCUTION PARALLÈLE ====================
+
+    @api.model
+    def _run_job(self, job_id, workers, retry_failed=False):
+        """
+        Lance les workers sur le job et attend qu'ils aient vidé la file des
+        tranches. Tout passe par des curseurs neufs : le curseur appelant ne
+        verrait pas les validations des workers.
+
+        En mode test, le curseur de test est partagé entre threads : les
+        tranches sont alors traitées à la suite, dans le curseur courant.
+        """
+        registry = self.env.registry
+        if registry.in_test_mode():
+            return self._run_job_serial(job_id, retry_failed)
+        uid, context = self.env.uid, dict(self.env.context)
+        if retry_failed:
+            with registry.cursor() as cr:
+                cr.execute(SQL(
+                    """
+                    UPDATE hotel_metric_backfill_chunk
+                       SET state = 'pending', error = NULL
+                     WHERE job_id = %s AND state = 'failed'
+                    """,
+                    job_id,
+                ))
+        with registry.cursor() as cr:
+            cr.execute(SQL(
+                "SELECT count(*) FROM hotel_metric_backfill_chunk WHERE job_id = %s AND state = 'pending'",
+                job_id,
+            ))
+            pending = cr.fetchone()[0]
+
+        workers = max(1, min(workers or DEFAULT_WORKERS, MAX_WORKERS, pending or 1))
+        start = time.perf_counter()
+        _logger.info(
+            "[METRIC/BACKFILL] Job %s : %d tranche(s) à traiter, %d worker(s)",
+            job_id, pending, workers,
+        )
+        if pending:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hotel-backfill") as pool:
+                futures = [
+                    pool.submit(_backfill_worker, registry, job_id, uid, context)
+                    for _i in range(workers)
+                ]
+                for future in futures:
+                    future.result()
+
+        with registry.cursor() as cr:
+            result = self.with_env(self.env(cr=cr)).browse(job_id).get_progress()
+        _logger.info(
+            "[METRIC/BACKFILL] Job %s terminé en %.1fs : %s",
+            job_id, time.perf_counter() - start, result["message"],
+        )
+        return result
+
+    @api.model
+    def _run_job_serial(self, job_id, retry_failed=False):
+        """Traitement sans thread ni nouveau curseur (mode test)."""
+        job = self.browse(job_id)
+        if retry_failed:
+            job._reset_failed_chunks()
+        Chunk = self.env["hotel.metric.backfill.chunk"]
+        # _process_next sélectionne en SQL : l'état des tranches doit être en base
+        Chunk.flush_model(["state"])
+        while Chunk._process_next(job_id) is not None:
+            Chunk.flush_model(["state"])
+        job.invalidate_recordset()
+        return job.get_progress()
+
+    # ==================== LECTURE ====================
+
+    def get_progress(self):
+        """
+        :return: dict {success, message, data: {'job_id', 'state', 'chunks_total',
+                 'chunks_done', 'chunks_failed', 'progress', 'errors'}}
+        """
+        self.ensure_one()
+        errors = [
+            {"date_from": chunk.date_from, "date_to": chunk.date_to, "error": chunk.error}
+            for chunk in self.chunk_ids
+            if chunk.state == "failed"
+        ]
+        return {
+            "success": self.state != "failed",
+            "message": _("%s/%s tranche(s) terminée(s), %s en échec") % (
+                self.chunks_done, self.chunks_total, self.chunks_failed
+            ),
+            "data": {
+                "job_id": self.id,
+                "state": self.state,
+                "chunks_total": self.chunks_total,
+                "chunks_done": self.chunks_done,
+                "chunks_failed": self.chunks_failed,
+                "progress": self.progress,
+                "errors": errors,
+            },
+        }
+
+
+class HotelMetricBackfillChunk(models.Model):
+    _name = "hotel.metric.backfill.chunk"
+    _description = "Tranche de recalcul des métriques"
+    _order = "date_from"
+
+    job_id = fields.Many2one(
+        "hotel.metric.backfill", required=True, index=True, ondelete="cascade"
+    )
+    date_from = fields.Date(string="Du", required=True)
+    date_to = fields.Date(string="Au", required=True)
+    state = fields.Selection(CHUNK_STATES, string="État", default="pending", required=True)
+    duration = fields.Float(string="Durée (s)", readonly=True)
+    error = fields.Text(string="Erreur", readonly=True)
+
+    @api.model
+    def _process_next(self, job_id):
+        """
+        Prend la prochaine tranche libre du job (verrouillée jusqu'à la
+        validation du curseur du worker) et la calcule.
+
+        :return: état final de la tranche, None s'il n'y a plus rien à traiter
+        """
+        self.env.cr.execute(SQL(
+            """
+            SELECT id FROM hotel_metric_backfill_chunk
+             WHERE job_id = %s AND state = 'pending'
+             ORDER BY date_from
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+            """,
+            job_id,
+        ))
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        chunk = self.browse(row[0])
+        start = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                chunk._compute_days()
+            chunk.write({"state": "done", "duration": time.perf_counter() - start})
+        except Exception as e:
+            _logger.exception(
+                "[METRIC/BACKFILL] Tranche %s → %s en échec", chunk.date_from, chunk.date_to
+            )
+            chunk.write({
+                "state": "failed",
+                "duration": time.perf_counter() - start,
+                "error": str(e),
+            })
+        _logger.info(
+            "[METRIC/BACKFILL] Job %s : tranche %s → %s %s en %.1fs",
+            job_id, chunk.date_from, chunk.date_to, chunk.state, chunk.duration,
+        )
+        return chunk.state
+
+    def _compute_days(self):
+        self.env["hotel.metric"]._compute_metrics_for_range(self.date_from, self.date_to)
+
+
+def _backfill_worker(registry, job_id, uid, context):
+    """Boucle d'un worker : une transaction validée par tranche."""
+    threading.current_thread().dbname = registry.db_name
+    processed = 0
+    while True:
+        with registry.cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            state = env["hotel.metric.backfill.chunk"]._process_next(job_id)
+        if state is None:
+            return processed
+        processed += 1
@@ -0,0 +1,113 @@
+from odoo import api, fields, models
+from odoo.tools import SQL
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Nombre maximal de jours recalculés par passage de la tâche incrémentale
+DIRTY_DAYS_BATCH = 31
+
+
+class HotelMetricDirtyDay(models.Model):
+    """
+    File des jours de métriques à recalculer (mode incrémental).
+
+    Les modifications de séjours et de commandes POS y ajoutent les jours
+    qu'elles touchent, une seule insertion par transaction (pré-commit).
+    La file est en ajout seul, sans contrainte d'unicité : aucune
+    transaction de réservation n'attend une autre pour marquer un jour, et
+    une ligne validée après le début d'un passage de la tâche n'est pas
+    supprimée par celui-ci (elle sera traitée au passage suivant).
+    """
+
+    _name = "hotel.metric.dirty.day"
+    _description = "Jour de métriques à recalculer"
+    _order = "date, id"
+
+    date = fields.Date(string="Jour", required=True, index=True)
+
+    @api.model
+    def _mark_dirty(self, days):
+        """Ajoute des jours à recalculer, insérés en une fois au pré-commit."""
+        days = {day for day in days if day}
+        if not days:
+            return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.setdefault("hotel.metric.dirty_days", set())
+        if not pending:
+            precommit.add(self._flush_dirty_days)
+        pending.update(days)
+
+    @api.model
+    def _flush_dirty_days(self):
+        days = self.env.cr.precommit.data.pop("hotel.metric.dirty_days", set())
+        if not days:
+            return
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO hotel_metric_dirty_day
+                   (date, create_uid, create_date, write_uid, write_date)
+            SELECT day, %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM unnest(%(days)s::date[]) AS day
+            """,
+            uid=self.env.uid,
+            days=sorted(days),
+        ))
+
+    @api.model
+    def _cron_process_dirty_days(self, limit=DIRTY_DAYS_BATCH):
+        """
+        Tâche fréquente : recalcule les ``limit`` jours les plus anciens de la
+        file, puis retire les lignes traitées. Seules les lignes de ces jours
+        sont verrouillées ; la tâche est relancée s'il reste des jours.
+        """
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT date FROM hotel_metric_dirty_day ORDER BY date LIMIT %s",
+            limit + 1,
+        ))
+        days = [row[0] for row in self.env.cr.fetchall()]
+        has_more = len(days) > limit
+        days = days[:limit]
+        if not days:
+            return 0
+
+        # Jours dont toutes les lignes sont prises par un autre passage : ignorés
+        self.env.cr.execute(SQL(
+            """
+            SELECT id, date
+              FROM hotel_metric_dirty_day
+             WHERE date = ANY(%s)
+               FOR UPDATE SKIP LOCKED
+            """,
+            days,
+        ))
+        ids_by_day = {}
+        for row_id, day in self.env.cr.fetchall():
+            ids_by_day.setdefault(day, []).append(row_id)
+        if not ids_by_day:
+            return 0
+
+        days = sorted(ids_by_day)
+        Metric = self.env["hotel.metric"]
+        # Jours consécutifs : une seule passe par plage
+        range_start = previous = days[0]
+        for day in days[1:] + [None]:
+            if day is not None and day == previous + timedelta(days=1):
+                previous = day
+                continue
+            Metric._compute_metrics_for_range(range_start, previous)
+            range_start = previous = day
+
+        self.env.cr.execute(SQL(
+            "DELETE FROM hotel_metric_dirty_day WHERE id = ANY(%s)",
+            [row_id for day in days for row_id in ids_by_day[day]],
+        ))
+        _logger.info(
+            "[METRIC/INCR] %s jour(s) recalculé(s) : %s", len(days), days
+        )
+        if has_more:
+            self.env.ref(
+                "hotel_management_extension.ir_cron_process_hotel_metric_dirty_days"
+            )._trigger()
+        return len(days)
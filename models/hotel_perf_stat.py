@@ -0,0 +1,39 @@
+from odoo import _, api, models
+
+from ..utils.perf import PERF
+
+
+class HotelPerfStat(models.AbstractModel):
+    """
+    Agrégats glissants des points d'entrée instrumentés (utils/perf.py) :
+    durée, requêtes SQL, temps SQL et enregistrements traités par appel.
+    Les mesures sont propres au processus (worker) qui répond à l'appel.
+    """
+
+    _name = "hotel.perf.stat"
+    _description = "Statistiques de performance des moteurs hôteliers"
+
+    @api.model
+    def get_stats(self):
+        """
+        Utilisable via RPC / API externe.
+        :return: dict {success, message, data: [agrégats par point d'entrée]}
+        """
+        if not self.env.user.has_group("base.group_system"):
+            return {
+                "success": False,
+                "message": _("Accès réservé aux administrateurs."),
+                "data": [],
+            }
+        return {
+            "success": True,
+            "message": _("Statistiques de performance du processus."),
+            "data": PERF.snapshot(),
+        }
+
+    @api.model
+    def reset_stats(self):
+        if not self.env.user.has_group("base.group_system"):
+            return {"success": False, "message": _("Accès réservé aux administrateurs.")}
+        PERF.reset()
+        return {"success": True, "message": _("Statistiques réinitialisées.")}
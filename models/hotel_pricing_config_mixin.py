@@ -0,0 +1,28 @@
+from odoo import api, models
+
+
+class HotelPricingConfigMixin(models.AbstractModel):
+    """
+    Modèles de configuration tarifaire (saisons, règles, lignes) : toute
+    création/modification/suppression invalide la table tarifaire compilée
+    de hotel.pricing.service.
+    """
+
+    _name = "hotel.pricing.config.mixin"
+    _description = "Configuration tarifaire (invalidation de la table compilée)"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env["hotel.pricing.service"]._invalidate_pricing_table()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env["hotel.pricing.service"]._invalidate_pricing_table()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env["hotel.pricing.service"]._invalidate_pricing_table()
+        return res
@@ -4,6 +4,7 @@ from odoo.exceptions import ValidationError
 
 class HotelPricingRule(models.Model):
     _name = "hotel.pricing.rule"
+    _inherit = ["hotel.pricing.config.mixin"]
     _description = "Hotel Pricing Rule"
     _order = "room_type_id, reservation_type_id, season_id"
 
@@ -75,6 +76,7 @@ class HotelPricingRule(models.Model):
 
 class HotelPricingRuleLine(models.Model):
     _name = "hotel.pricing.rule.line"
+    _inherit = ["hotel.pricing.config.mixin"]
     _description = "Hotel Pricing Rule Line"
     _order = "min_duration"
 
@@ -1,15 +1,234 @@
 from ..logging_config import eclc_logger as _logger
+import copy
+import logging
+import uuid
 from datetime import timedelta
-from odoo import api, models, fields
+from odoo import _, api, models, fields
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import ormcache
 from ..logging_booking import booking_logger as _logger_booking
+from ..utils.lazy_log import LazyJson
+from ..utils.lru_cache import BoundedLRU
+from ..utils.perf import instrument
+from ..utils.trace_events import trace_event
+from ..utils.pricing_table import (
+    CompiledLine,
+    CompiledRule,
+    CompiledSeason,
+    PricingTable,
+)
+
+
+# Tarification nuit par nuit selon la saison de chaque nuit (désactivée par défaut :
+# la saison de la date d'arrivée s'applique alors à tout le séjour)
+PER_NIGHT_SEASONS_PARAM = "hotel_management_extension.pricing_per_night_seasons"
+
+# Estampille de la configuration tarifaire, renouvelée à chaque invalidation
+# de la table compilée (valeur unique : un rollback ne peut pas la réutiliser)
+PRICING_VERSION_PARAM = "hotel_management_extension.pricing_version"
+
+# Étendue maximale (en jours) d'une matrice de prix
+PRICE_MATRIX_MAX_DAYS = 366
+
+# Devis compute_price mémorisés par processus. Les clés portent la base,
+# l'estampille tarifaire, la société et sa devise.
+_QUOTE_CACHE = BoundedLRU(maxsize=1024)
 
 
 class HotelPricingService(models.AbstractModel):
     _name = "hotel.pricing.service"
     _description = "Service central pour le calcul des prix hôteliers"
 
+    def _register_hook(self):
+        """
+        Niveaux des loggers et échantillonnage des traces depuis les
+        paramètres système.
+        """
+        super()._register_hook()
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+
+    # =========================================================
+    # TABLE TARIFAIRE COMPILÉE
+    # =========================================================
+    @ormcache()
+    def _get_pricing_table(self):
+        """
+        Compile saisons, règles et lignes actives en structures Python pures.
+        Mise en cache par base (registre) ; reconstruite à la demande après
+        toute modification de la configuration tarifaire.
+        """
+        Season = self.env["hotel.season"].sudo().with_context(active_test=True)
+        Rule = self.env["hotel.pricing.rule"].sudo().with_context(active_test=True)
+
+        seasons = [
+            CompiledSeason(s.id, s.date_start, s.date_end, s.priority)
+            for s in Season.search([])
+        ]
+        rules = []
+        for rule in Rule.search([]):
+            lines = tuple(
+                CompiledLine(l.id, l.min_duration, l.max_duration, l.price)
+                for l in rule.line_ids.sorted(lambda l: (l.min_duration, l.id))
+            )
+            room_type = rule.room_type_id
+            rules.append(
+                CompiledRule(
+                    id=rule.id,
+                    room_type_id=room_type.id,
+                    reservation_type_id=rule.reservation_type_id.id,
+                    season_id=rule.season_id.id,
+                    unit=rule.unit,
+                    price=rule.price,
+                    currency=rule.currency_id.name if rule.currency_id else None,
+                    capacity=getattr(room_type, "capacity", None),
+                    early_checkin_fee=getattr(room_type, "early_checkin_fee", 5000.0),
+                    late_checkout_fee=getattr(room_type, "late_checkout_fee", 5000.0),
+                    extra_night_amount=getattr(room_type, "extra_night_amount", 20000.0),
+                    lines=lines,
+                    line_mins=tuple(l.min_duration for l in lines),
+                )
+            )
+        _logger.info(
+            "[PRICING/TABLE] Table compilée | saisons=%s | règles=%s",
+            len(seasons),
+            len(rules),
+        )
+        return PricingTable(seasons, rules)
+
+    def _per_night_seasons_enabled(self):
+        param = self.env["ir.config_parameter"].sudo().get_param(PER_NIGHT_SEASONS_PARAM)
+        return (param or "").lower() in ("1", "true", "yes")
+
+    def _price_nights_by_season(
+        self, table, rule, room_type_id, reservation_type_id, first_night, nb_nights
+    ):
+        """
+        Découpe les nuits du séjour en segments de saison (index des saisons)
+        et tarife chaque segment avec sa propre règle nuitée. Un segment sans
+        règle nuitée applicable garde la règle de la date d'arrivée.
+
+        :return: liste de dicts {date_from, nights, season_ids, rule_id, unit_price, amount}
+        """
+        segments = []
+        for segment_start, nights, season_ids in table.season_index.split_nights(
+            first_night, nb_nights
+        ):
+            segment_rule = table.find_rule(room_type_id, reservation_type_id, season_ids)
+            if not segment_rule or segment_rule.unit != "night":
+                segment_rule = rule
+            unit_price = segment_rule.price or 0.0
+            segments.append(
+                {
+                    "date_from": segment_start.isoformat(),
+                    "nights": nights,
+                    "season_ids": list(season_ids),
+                    "rule_id": segment_rule.id,
+                    "unit_price": unit_price,
+                    "amount": unit_price * nights,
+                }
+            )
+        return segments
+
     @api.model
+    def _invalidate_pricing_table(self):
+        """
+        Invalide la table compilée (tous les workers, via le registre) et
+        renouvelle l'estampille tarifaire, ce qui périme les devis mémorisés.
+        """
+        self.env["ir.config_parameter"].sudo().set_param(
+            PRICING_VERSION_PARAM, uuid.uuid4().hex
+        )
+        self.env.registry.clear_cache()
+
+    def _pricing_version(self):
+        return (
+            self.env["ir.config_parameter"].sudo().get_param(PRICING_VERSION_PARAM)
+            or "0"
+        )
+
+    def _quote_cache_key(
+        self,
+        room_type_id,
+        reservation_type_id,
+        planned_checkin_date,
+        planned_checkout_date,
+        nb_persons,
+        pricing_mode,
+        requested_datetime,
+    ):
+        """
+        Clé du devis : entrées normalisées + estampille tarifaire + société et
+        devise + mode de tarification par saison. None si non mémorisable.
+        """
+        company = self.env.company
+        key = (
+            self.env.cr.dbname,
+            self._pricing_version(),
+            company.id,
+            company.currency_id.id,
+            self._per_night_seasons_enabled(),
+            room_type_id,
+            reservation_type_id,
+            planned_checkin_date,
+            planned_checkout_date,
+            nb_persons,
+            tuple(dict.fromkeys(self._normalize_pricing_modes(pricing_mode))),
+            requested_datetime,
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @api.model
+    def get_quote_cache_stats(self):
+        """Compteurs du cache de devis du processus."""
+        return _QUOTE_CACHE.stats()
+
+    @api.model
+    def _normalize_requested_datetime(self, requested_datetime):
+        """SANITIZER : uniformiser requested_datetime (dict mode->dt, chaîne ou datetime)."""
+        try:
+            if isinstance(requested_datetime, dict):
+                # ex: {'early_fee': '2025-09-11T09:00:00'}
+                key = next(iter(requested_datetime))
+                requested_datetime = requested_datetime.get(key)
+
+            if isinstance(requested_datetime, str):
+                requested_datetime = fields.Datetime.from_string(requested_datetime)
+
+        except Exception as e:
+            _logger.error(
+                "[PRICING/SVC] Erreur parsing requested_datetime=%s | %s",
+                requested_datetime,
+                str(e),
+            )
+            requested_datetime = False
+        return requested_datetime
+
+    @api.model
+    def _normalize_pricing_modes(self, pricing_mode):
+        """Normaliser pricing_mode (str | list | dict | itérable) en liste de modes."""
+        if pricing_mode is None:
+            modes = []
+        elif isinstance(pricing_mode, list):
+            modes = pricing_mode
+        elif isinstance(pricing_mode, str):
+            modes = [pricing_mode]
+        elif isinstance(pricing_mode, dict):
+            # si on a un dict mode -> datetime, prendre les clés
+            modes = list(pricing_mode.keys())
+        else:
+            # fallback
+            try:
+                modes = list(pricing_mode)
+            except Exception:
+                modes = [str(pricing_mode)]
+        return modes
+
+    @api.model
+    @instrument()
     def compute_price(
         self,
         room_type_id,
@@ -39,103 +258,374 @@ class HotelPricingService(models.AbstractModel):
 
         Si pricing_mode est une liste, on itère dessus et on cumule les suppléments.
         """
-        # --- SANITIZER : uniformiser requested_datetime ---
-        try:
-            if isinstance(requested_datetime, dict):
-                # ex: {'early_fee': '2025-09-11T09:00:00'}
-                key = next(iter(requested_datetime))
-                requested_datetime = requested_datetime.get(key)
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+        with trace_event(
+            "pricing.quote",
+            "pricing",
+            self.env.cr,
+            room_type_id=room_type_id,
+            reservation_type_id=reservation_type_id,
+        ) as span:
+            requested_datetime = self._normalize_requested_datetime(requested_datetime)
+
+            quote_key = self._quote_cache_key(
+                room_type_id,
+                reservation_type_id,
+                planned_checkin_date,
+                planned_checkout_date,
+                nb_persons,
+                pricing_mode,
+                requested_datetime,
+            )
+            if quote_key:
+                cached = _QUOTE_CACHE.get(quote_key)
+                if cached is not None:
+                    _logger.debug("[PRICING/SVC] Devis en cache | key=%s", quote_key)
+                    span.set(decision=self._trace_decision(cached), cache="hit")
+                    return copy.deepcopy(cached)
+
+            # --- CONTEXTE DE DEBUG  LOG IN -> ---
+            # Valeurs brutes : sérialisées (LazyJson) seulement si le log est émis
+            ctx = {
+                "room_type_id": room_type_id,
+                "reservation_type_id": reservation_type_id,
+                "planned_checkin_date": planned_checkin_date,
+                "planned_checkout_date": planned_checkout_date,
+                "nb_persons": nb_persons,
+                "pricing_mode": pricing_mode,
+                "requested_datetime": requested_datetime,
+            }
 
-            if isinstance(requested_datetime, str):
-                requested_datetime = fields.Datetime.from_string(requested_datetime)
+            _logger.info("🔎 [PRICING] Début du calcul tarifaire")
+            _logger.info("➡️  Paramètres reçus: %s", LazyJson(ctx))
 
-        except Exception as e:
-            _logger.error(
-                "[PRICING/SVC] Erreur parsing requested_datetime=%s | %s",
-                requested_datetime,
-                str(e),
+            # =========================================================
+            # 1) SAISONS APPLICABLES
+            # =========================================================
+            table = self._get_pricing_table()
+            season_ids = table.seasons_for(planned_checkin_date.date())
+            _logger.info(
+                "📅 Saisons trouvées: %s | Date: %s", season_ids, planned_checkin_date.date()
             )
-            requested_datetime = False
 
-        # --- CONTEXTE DE DEBUG  LOG IN -> ---
-        ctx = {
-            "room_type_id": room_type_id,
-            "reservation_type_id": reservation_type_id,
-            "planned_checkin_date": planned_checkin_date
-            and planned_checkin_date.isoformat(),
-            "planned_checkout_date": planned_checkout_date
-            and planned_checkout_date.isoformat(),
-            "nb_persons": nb_persons,
-            "pricing_mode": pricing_mode,
-            "requested_datetime": requested_datetime and requested_datetime.isoformat(),
-        }
+            # =========================================================
+            # 2) RÈGLE TARIFAIRE APPLICABLE
+            # =========================================================
+            rule = table.find_rule(room_type_id, reservation_type_id, season_ids)
+            _logger.debug(
+                "[PRICING/SVC] Rule type=%s | resa=%s | saisons=%s | found=%s",
+                room_type_id,
+                reservation_type_id,
+                season_ids,
+                rule and rule.id,
+            )
 
-        # Normaliser requested_datetime pour le log
-        if isinstance(requested_datetime, dict):
-            ctx["requested_datetime"] = {
-                k: (v.isoformat() if hasattr(v, "isoformat") else v)
-                for k, v in requested_datetime.items()
-            }
-        elif requested_datetime and hasattr(requested_datetime, "isoformat"):
-            ctx["requested_datetime"] = requested_datetime.isoformat()
-        else:
-            ctx["requested_datetime"] = requested_datetime
+            if not rule:
+                _logger.warning("⚠️ Aucune règle tarifaire trouvée pour: %s", LazyJson(ctx))
+                result = self._empty_price_result()
+            else:
+                result = self._price_with_rule(
+                    table,
+                    rule,
+                    room_type_id,
+                    reservation_type_id,
+                    planned_checkin_date,
+                    planned_checkout_date,
+                    nb_persons=nb_persons,
+                    pricing_mode=pricing_mode,
+                    requested_datetime=requested_datetime,
+                    ctx=ctx,
+                )
 
-        _logger.info("🔎 [PRICING] Début du calcul tarifaire")
-        _logger.info("➡️  Paramètres reçus: %s", ctx)
+            if quote_key:
+                _QUOTE_CACHE.put(quote_key, copy.deepcopy(result))
+            span.set(
+                decision=self._trace_decision(result),
+                cache="miss" if quote_key else "bypass",
+                rule_id=(result.get("base") or {}).get("rule_id"),
+                total=result.get("total"),
+            )
+            return result
 
-        # --- VARIABLES INTERNES  init---
-        adjustments = []  # Contiendra les ajustements auto (extra guest, taxes, etc.)
-        supplements = []
-        price_base = 0.0  # Montant du prix de base (couche 1)
-        applied_rule_id = None  # ID de la règle tarifaire appliquée
+    @api.model
+    @instrument()
+    def compute_price_batch(self, inputs):
+        """
+        Calcule les prix de nombreux séjours en une passe.
+
+        Les entrées sont regroupées par (type de chambre, type de réservation,
+        saisons de la date d'arrivée) : la règle n'est résolue qu'une fois par
+        groupe sur la table compilée, et le paramètre de tarification par
+        saison n'est lu qu'une fois pour tout le lot. Le coût d'un recalcul de
+        masse suit ainsi le nombre de règles distinctes, pas le nombre de séjours.
+        Chaque entrée passe d'abord par le cache de devis, partagé avec
+        compute_price : seules les entrées absentes du cache sont tarifées.
+
+        :param inputs: liste de dicts reprenant les arguments de compute_price
+                       (room_type_id, reservation_type_id, planned_checkin_date,
+                       planned_checkout_date, nb_persons, pricing_mode,
+                       requested_datetime)
+        :return: liste de résultats dans l'ordre des entrées, au format de
+                 compute_price ; une entrée en erreur de validation porte la
+                 clé "error" avec le message et un total nul
+        """
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+        with trace_event("pricing.batch", "pricing", self.env.cr) as span:
+            table = self._get_pricing_table()
+            per_night_seasons = self._per_night_seasons_enabled()
+
+            results = [None] * len(inputs)
+            requested = {}
+            quote_keys = {}
+            groups = {}
+            for index, vals in enumerate(inputs):
+                requested[index] = self._normalize_requested_datetime(
+                    vals.get("requested_datetime")
+                )
+                quote_key = self._quote_cache_key(
+                    vals["room_type_id"],
+                    vals["reservation_type_id"],
+                    vals["planned_checkin_date"],
+                    vals["planned_checkout_date"],
+                    vals.get("nb_persons", 1),
+                    vals.get("pricing_mode"),
+                    requested[index],
+                )
+                if quote_key:
+                    cached = _QUOTE_CACHE.get(quote_key)
+                    if cached is not None:
+                        results[index] = copy.deepcopy(cached)
+                        continue
+                    quote_keys[index] = quote_key
+                season_ids = table.seasons_for(vals["planned_checkin_date"].date())
+                key = (vals["room_type_id"], vals["reservation_type_id"], season_ids)
+                groups.setdefault(key, []).append(index)
+
+            for (room_type_id, reservation_type_id, season_ids), indexes in groups.items():
+                rule = table.find_rule(room_type_id, reservation_type_id, season_ids)
+                _logger.debug(
+                    "[PRICING/BATCH] Groupe type=%s | resa=%s | saisons=%s | séjours=%s | rule=%s",
+                    room_type_id,
+                    reservation_type_id,
+                    season_ids,
+                    len(indexes),
+                    rule and rule.id,
+                )
+                for index in indexes:
+                    vals = inputs[index]
+                    if not rule:
+                        results[index] = self._empty_price_result()
+                    else:
+                        try:
+                            results[index] = self._price_with_rule(
+                                table,
+                                rule,
+                                room_type_id,
+                                reservation_type_id,
+                                vals["planned_checkin_date"],
+                                vals["planned_checkout_date"],
+                                nb_persons=vals.get("nb_persons", 1),
+                                pricing_mode=vals.get("pricing_mode"),
+                                requested_datetime=requested[index],
+                                ctx=vals.get("ctx"),
+                                per_night_seasons=per_night_seasons,
+                            )
+                        except (ValidationError, UserError) as e:
+                            result = self._empty_price_result()
+                            result["error"] = str(e)
+                            results[index] = result
+                            # Erreur de validation : non mémorisée
+                            continue
+                    if index in quote_keys:
+                        _QUOTE_CACHE.put(quote_keys[index], copy.deepcopy(results[index]))
+
+            hits = len(inputs) - sum(len(indexes) for indexes in groups.values())
+            _logger.info(
+                "[PRICING/BATCH] %s séjours tarifés | %s groupes de règles | %s en cache",
+                len(inputs),
+                len(groups),
+                hits,
+            )
+            span.set(decision="priced", inputs=len(inputs), groups=len(groups), cache_hits=hits)
+            return results
 
-        # =========================================================
-        # 1) SAISONS APPLICABLES
-        # =========================================================
-        season_domain = [
-            ("date_start", "<=", planned_checkin_date),
-            ("date_end", ">=", planned_checkin_date),
-        ]
-        seasons = self.env["hotel.season"].search(season_domain, order="priority desc")
-        _logger.info(
-            "📅 Saisons trouvées: %s | Domaine: %s", seasons.ids, season_domain
-        )
+    @api.model
+    def get_price_matrix(
+        self, date_from, date_to, room_type_ids=None, reservation_type_ids=None
+    ):
+        """
+        Matrice de prix pour la réception : types de chambre (lignes) x types
+        de réservation (colonnes) x dates d'arrivée [date_from, date_to].
+        Calculée sur la table tarifaire compilée, sans requête par cellule.
+        Utilisable via RPC / API externe.
 
-        # =========================================================
-        # 2) RÈGLE TARIFAIRE APPLICABLE
-        # =========================================================
-        rule_domain = [
-            ("room_type_id", "=", room_type_id),
-            ("reservation_type_id", "=", reservation_type_id),
-            ("active", "=", True),
-        ]
-        if seasons:
-            rule_domain.append(("season_id", "in", seasons.ids))
-        else:
-            rule_domain.append(("season_id", "=", False))
+        Prix d'une cellule pour une date d'arrivée : prix unitaire de la règle
+        applicable ce jour-là (nuitée, forfait créneau, ou première tranche
+        horaire), None si aucune règle.
 
-        rule = self.env["hotel.pricing.rule"].search(rule_domain, limit=1)
-        _logger.debug("[PRICING/SVC] Rule domain=%s | found=%s", rule_domain, rule.ids)
+        Sérialisation en colonnes (une entrée par combinaison tarifée) :
+        {
+            "dates": ["2025-01-01", ...],
+            "room_types": {"id": [...], "name": [...]},
+            "reservation_types": {"id": [...], "name": [...]},
+            "cells": {
+                "room_type": [index ligne, ...],
+                "reservation_type": [index colonne, ...],
+                "currency": [...],
+                "unit": [[unité par date], ...],
+                "rule_id": [[règle par date], ...],
+                "price": [[prix par date], ...],
+            },
+        }
+
+        :return: dict {success, message, data}
+        """
+        try:
+            date_from = fields.Date.to_date(date_from)
+            date_to = fields.Date.to_date(date_to)
+            if not date_from or not date_to or date_to < date_from:
+                raise ValidationError(_("Période invalide."))
+            nb_days = (date_to - date_from).days + 1
+            if nb_days > PRICE_MATRIX_MAX_DAYS:
+                raise ValidationError(
+                    _("Période trop longue (%s jours maximum).") % PRICE_MATRIX_MAX_DAYS
+                )
+
+            room_type_domain = [("id", "in", room_type_ids)] if room_type_ids else []
+            resa_type_domain = (
+                [("id", "in", reservation_type_ids)] if reservation_type_ids else []
+            )
+            room_types = self.env["hotel.room.type"].search_read(
+                room_type_domain, ["name"]
+            )
+            resa_types = self.env["hotel.reservation.type"].search_read(
+                resa_type_domain, ["name"]
+            )
+
+            table = self._get_pricing_table()
+            days = [date_from + timedelta(days=i) for i in range(nb_days)]
+            day_seasons = [table.seasons_for(day) for day in days]
+
+            cells = {
+                "room_type": [],
+                "reservation_type": [],
+                "currency": [],
+                "unit": [],
+                "rule_id": [],
+                "price": [],
+            }
+            for row, room_type in enumerate(room_types):
+                for col, resa_type in enumerate(resa_types):
+                    # Règle résolue une fois par ensemble de saisons distinct
+                    rules_by_seasons = {}
+                    rules = []
+                    for season_ids in day_seasons:
+                        if season_ids not in rules_by_seasons:
+                            rules_by_seasons[season_ids] = table.find_rule(
+                                room_type["id"], resa_type["id"], season_ids
+                            )
+                        rules.append(rules_by_seasons[season_ids])
+                    if not any(rules):
+                        continue
+
+                    cells["room_type"].append(row)
+                    cells["reservation_type"].append(col)
+                    cells["currency"].append(
+                        next(r.currency for r in rules if r) or "XOF"
+                    )
+                    cells["unit"].append([r and r.unit for r in rules])
+                    cells["rule_id"].append([r and r.id for r in rules])
+                    cells["price"].append([self._matrix_unit_price(r) for r in rules])
 
-        if not rule:
-            _logger.warning("⚠️ Aucune règle tarifaire trouvée pour: %s", ctx)
             return {
-                "base": None,
-                "adjustments": [],
-                "supplements": [],
-                "discounts": [],
-                "currency": "XOF",
-                "total": 0.0,
+                "success": True,
+                "message": _("Matrice de prix calculée avec succès."),
+                "data": {
+                    "dates": [day.isoformat() for day in days],
+                    "room_types": {
+                        "id": [rt["id"] for rt in room_types],
+                        "name": [rt["name"] for rt in room_types],
+                    },
+                    "reservation_types": {
+                        "id": [rt["id"] for rt in resa_types],
+                        "name": [rt["name"] for rt in resa_types],
+                    },
+                    "cells": cells,
+                },
             }
 
-        applied_rule_id = rule.id
+        except (ValidationError, UserError) as e:
+            return {"success": False, "message": str(e), "data": {}}
+        except Exception as e:
+            _logger.exception("[PRICING/MATRIX] Erreur calcul matrice")
+            return {
+                "success": False,
+                "message": _("Erreur interne : %s") % str(e),
+                "data": {},
+            }
+
+    @staticmethod
+    def _matrix_unit_price(rule):
+        """Prix affiché d'une cellule : première tranche horaire ou prix de la règle."""
+        if not rule:
+            return None
+        if rule.unit == "hour" and rule.lines:
+            return rule.lines[0].price
+        return rule.price or 0.0
+
+    @staticmethod
+    def _trace_decision(result):
+        return "priced" if result.get("base") else "no_rule"
+
+    @api.model
+    def _empty_price_result(self):
+        """Résultat renvoyé lorsqu'aucune règle tarifaire ne s'applique."""
+        return {
+            "base": None,
+            "adjustments": [],
+            "supplements": [],
+            "discounts": [],
+            "currency": "XOF",
+            "total": 0.0,
+        }
+
+    def _price_with_rule(
+        self,
+        table,
+        rule,
+        room_type_id,
+        reservation_type_id,
+        planned_checkin_date,
+        planned_checkout_date,
+        nb_persons=1,
+        pricing_mode=None,
+        requested_datetime=None,
+        ctx=None,
+        per_night_seasons=None,
+    ):
+        """
+        Couches 1 à 6 de compute_price pour une règle déjà résolue : prix de
+        base, ajustements, suppléments et structure de sortie. Partagé par
+        compute_price et compute_price_batch (règle résolue une fois par groupe).
+
+        :param per_night_seasons: None -> lu dans les paramètres système
+        """
+        ctx = ctx or {}
+        if per_night_seasons is None:
+            per_night_seasons = self._per_night_seasons_enabled()
+
+        # --- VARIABLES INTERNES  init---
+        adjustments = []  # Contiendra les ajustements auto (extra guest, taxes, etc.)
+        supplements = []
+        price_base = 0.0  # Montant du prix de base (couche 1)
+        applied_rule_id = rule.id  # ID de la règle tarifaire appliquée
+
         _logger.info(
             "📌 Règle appliquée: id=%s | unité=%s | prix=%s | devise=%s",
             rule.id,
             rule.unit,
             rule.price,
-            getattr(rule.currency_id, "name", None),
+            rule.currency,
         )
 
         # =========================================================
@@ -143,6 +633,7 @@ class HotelPricingService(models.AbstractModel):
         # =========================================================
         nb_nights = nb_hours = 1  # Défaut
         applied_unit_price = None
+        night_segments = []
 
         if rule.unit == "night":
             delta_days = (planned_checkout_date - planned_checkin_date).days
@@ -157,6 +648,23 @@ class HotelPricingService(models.AbstractModel):
                 price_base,
             )
 
+            if per_night_seasons:
+                night_segments = self._price_nights_by_season(
+                    table,
+                    rule,
+                    room_type_id,
+                    reservation_type_id,
+                    planned_checkin_date.date(),
+                    nb_nights,
+                )
+                price_base = sum(seg["amount"] for seg in night_segments)
+                applied_unit_price = price_base / nb_nights
+                _logger.debug(
+                    "[PRICING/SVC] NIGHT/SAISONS | segments=%s | amount=%s",
+                    night_segments,
+                    price_base,
+                )
+
         elif rule.unit == "hour":
             total_seconds = int(
                 (planned_checkout_date - planned_checkin_date).total_seconds()
@@ -164,32 +672,24 @@ class HotelPricingService(models.AbstractModel):
             nb_hours = int(total_seconds / 3600.0) or 1
             _logger_booking.debug(
                 "⏱️ [PRICING/HOUR] stay=%s | total_seconds=%s | nb_hours=%s",
+                ctx.get("stay_id", "new"),
                 total_seconds,
                 nb_hours,
             )
 
-            if nb_hours < min(rule.line_ids.mapped("min_duration")):
+            if rule.line_mins and nb_hours < rule.line_mins[0]:
                 _logger_booking.error(
                     "❌ [PRICING/HOUR] Durée trop courte (%s h) < min=%s | stay=%s",
                     nb_hours,
-                    min(rule.line_ids.mapped("min_duration")),
+                    rule.line_mins[0],
+                    ctx.get("stay_id", "new"),
                 )
                 raise ValidationError(
                     "La durée minimum est de 2h pour cette réservation."
                 )
 
             # Vérifier les lignes configurées
-            line = self.env["hotel.pricing.rule.line"].search(
-                [
-                    ("rule_id", "=", rule.id),
-                    ("min_duration", "<=", nb_hours),
-                    "|",
-                    ("max_duration", ">=", nb_hours),
-                    ("max_duration", "=", False),
-                ],
-                limit=1,
-                order="min_duration asc",
-            )
+            line = table.find_line(rule, nb_hours)
 
             if line:
                 price_base = line.price
@@ -203,6 +703,7 @@ class HotelPricingService(models.AbstractModel):
 
                 _logger_booking.info(
                     "✅ [PRICING/HOUR] stay=%s | line_id=%s | min_dur=%s | max_dur=%s | prix=%s",
+                    ctx.get("stay_id", "new"),
                     line.id,
                     line.min_duration,
                     line.max_duration,
@@ -212,21 +713,14 @@ class HotelPricingService(models.AbstractModel):
                 # Aucune ligne trouvée → déterminer le dernier max configuré (ignorer max_duration=False)
                 max_values = [
                     l.max_duration
-                    for l in rule.line_ids
+                    for l in rule.lines
                     if l.max_duration not in (False, None)
                 ]
                 last_max = max(max_values) if max_values else None
 
                 if last_max is not None and nb_hours > last_max:
                     # > last_max => bascule sur tarification nuitée (si présente)
-                    night_rule = self.env["hotel.pricing.rule"].search(
-                        [
-                            ("room_type_id", "=", room_type_id),
-                            ("unit", "=", "night"),
-                            ("active", "=", True),
-                        ],
-                        limit=1,
-                    )
+                    night_rule = table.night_rule(room_type_id)
 
                     _logger_booking.debug(
                         "🔍 [PRICING/HOUR->NIGHT] Recherche règle nuitée | room_type=%s | res_type=%s | trouvée=%s | ID=%s | prix=%s",
@@ -292,7 +786,7 @@ class HotelPricingService(models.AbstractModel):
         # 4) AJUSTEMENTS AUTOMATIQUES   (COUCHE 2)
         # =========================================================
         try:
-            capacity = getattr(rule.room_type_id, "capacity", None)
+            capacity = rule.capacity
             if capacity and nb_persons and nb_persons > capacity:
                 extra_count = nb_persons - capacity
                 unit_extra = 0.0  # TODO: paramétrer dans le modèle
@@ -325,22 +819,7 @@ class HotelPricingService(models.AbstractModel):
         supplements = []
 
         # Normaliser pricing_mode en liste
-        modes = []
-        if pricing_mode is None:
-            modes = []
-        elif isinstance(pricing_mode, list):
-            modes = pricing_mode
-        elif isinstance(pricing_mode, str):
-            modes = [pricing_mode]
-        elif isinstance(pricing_mode, dict):
-            # si on a un dict mode -> datetime, prendre les clés
-            modes = list(pricing_mode.keys())
-        else:
-            # fallback
-            try:
-                modes = list(pricing_mode)
-            except Exception:
-                modes = [str(pricing_mode)]
+        modes = self._normalize_pricing_modes(pricing_mode)
 
         # Normaliser requested_datetime (on accepte dict ou single datetime)
         requested_map = {}
@@ -354,7 +833,7 @@ class HotelPricingService(models.AbstractModel):
         for mode in list(dict.fromkeys(modes)):
             try:
                 if mode == "early_fee":
-                    amount = getattr(rule.room_type_id, "early_checkin_fee", 5000.0)
+                    amount = rule.early_checkin_fee
                     req_dt = requested_map.get("early_fee")
                     supplements.append(
                         {
@@ -362,7 +841,7 @@ class HotelPricingService(models.AbstractModel):
                             "label": "Supplément Early check-in",
                             "amount": float(amount or 0.0),
                             "currency": (
-                                rule.currency_id.name if rule.currency_id else "XOF"
+                                rule.currency or "XOF"
                             ),
                             "requested_datetime": (
                                 req_dt.isoformat()
@@ -378,7 +857,7 @@ class HotelPricingService(models.AbstractModel):
                     )
 
                 elif mode == "late_fee":
-                    amount = getattr(rule.room_type_id, "late_checkout_fee", 5000.0)
+                    amount = rule.late_checkout_fee
                     req_dt = requested_map.get("late_fee")
                     supplements.append(
                         {
@@ -386,7 +865,7 @@ class HotelPricingService(models.AbstractModel):
                             "label": "Supplément Late check-out",
                             "amount": float(amount or 0.0),
                             "currency": (
-                                rule.currency_id.name if rule.currency_id else "XOF"
+                                rule.currency or "XOF"
                             ),
                             "requested_datetime": (
                                 req_dt.isoformat()
@@ -406,9 +885,7 @@ class HotelPricingService(models.AbstractModel):
                     if rule.unit == "night" and rule.price:
                         extra_amount = float(rule.price)
                     else:
-                        extra_amount = getattr(
-                            rule.room_type_id, "extra_night_amount", 20000.0
-                        )
+                        extra_amount = rule.extra_night_amount
 
                     supplements.append(
                         {
@@ -416,7 +893,7 @@ class HotelPricingService(models.AbstractModel):
                             "label": "Nuit supplémentaire",
                             "amount": float(extra_amount),
                             "currency": (
-                                rule.currency_id.name if rule.currency_id else "XOF"
+                                rule.currency or "XOF"
                             ),
                         }
                     )
@@ -456,13 +933,14 @@ class HotelPricingService(models.AbstractModel):
         for sup in supplements:
             total += sup.get("amount", 0.0)
 
-        _logger.info(
-            "💰 Total calculé: base=%s + adj=%s + sup=%s = %s",
-            price_base,
-            sum(a.get("amount", 0.0) for a in adjustments),
-            sum(s.get("amount", 0.0) for s in supplements),
-            total,
-        )
+        if _logger.isEnabledFor(logging.INFO):
+            _logger.info(
+                "💰 Total calculé: base=%s + adj=%s + sup=%s = %s",
+                price_base,
+                sum(a.get("amount", 0.0) for a in adjustments),
+                sum(s.get("amount", 0.0) for s in supplements),
+                total,
+            )
 
         # =========================================================
         # 6) STRUCTURE DE SORTIE FINALE
@@ -482,9 +960,12 @@ class HotelPricingService(models.AbstractModel):
             "adjustments": adjustments,  #
             "supplements": supplements,  #
             "discounts": [],  #
-            "currency": rule.currency_id.name if rule.currency_id else "XOF",
+            "currency": rule.currency or "XOF",
             "total": float(total),
         }
 
+        if night_segments:
+            out["base"]["nights"] = night_segments
+
         _logger.info("[PRICING/SVC][OUT] %s", out)
         return out
@@ -3,6 +3,8 @@ from datetime import timedelta, datetime
 from odoo.exceptions import ValidationError, UserError
 import uuid
 
+from ..utils.perf import instrument
+
 
 class HotelRoom(models.Model):
     _inherit = "hotel.room"
@@ -119,24 +121,56 @@ class HotelRoom(models.Model):
     def _compute_available_count(self):
         """
         Calcule le nombre de chambres disponibles par type de chambre
+        (un seul regroupement pour tous les types concernés)
         """
-        for record in self:
-            if record.room_type_id:
-                # Compte les chambres du même type avec le statut 'available'
-                available_rooms = self.env["hotel.room"].search_count(
-                    [
-                        ("room_type_id", "=", record.room_type_id.id),
-                        ("status", "=", "available"),
-                    ]
+        room_types = self.room_type_id
+        counts = {}
+        if room_types:
+            counts = {
+                room_type.id: count
+                for room_type, count in self.env["hotel.room"]._read_group(
+                    [("room_type_id", "in", room_types.ids), ("status", "=", "available")],
+                    ["room_type_id"],
+                    ["__count"],
                 )
-                record.available_count = available_rooms
-            else:
-                record.available_count = 0
+            }
+        for record in self:
+            record.available_count = counts.get(record.room_type_id.id, 0)
 
     def _compute_dummy(self):
         for rec in self:
             rec.reservation_type_id = False
 
+    # Champs qui changent la liste des chambres candidates du moteur
+    AVAILABILITY_ROOM_FIELDS = ("room_type_id", "status", "active")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rooms = super().create(vals_list)
+        rooms._on_rooms_changed(rooms.room_type_id)
+        return rooms
+
+    def write(self, vals):
+        if not any(field in vals for field in self.AVAILABILITY_ROOM_FIELDS):
+            return super().write(vals)
+        room_types = self.room_type_id
+        res = super().write(vals)
+        self._on_rooms_changed(room_types | self.room_type_id)
+        return res
+
+    def unlink(self):
+        room_types = self.room_type_id
+        res = super().unlink()
+        self._on_rooms_changed(room_types.exists())
+        return res
+
+    def _on_rooms_changed(self, room_types):
+        """Liste des chambres vendables modifiée : caches et capacités des types."""
+        if not room_types:
+            return
+        room_types._bump_availability_generation()
+        self.env["hotel.room.type.capacity"]._refresh_room_types(room_types.ids)
+
     def get_checkin_checkout_time(self, type_code=None):
         """
         Retourne les horaires à appliquer selon le type demandé.
@@ -225,21 +259,40 @@ class HotelRoom(models.Model):
     def get_availability_summary(self):
         """
         Retourne un résumé de la disponibilité par type de chambre
+        (statuts regroupés en une requête, chambres libres du jour lues dans
+        la table de capacité)
         """
         room_types = self.env["hotel.room.type"].search([])
-        summary = []
-
-        for room_type in room_types:
-            available_count = self.search_count(
-                [("room_type_id", "=", room_type.id), ("status", "=", "available")]
+        totals = {}
+        available = {}
+        for room_type, status, count in self._read_group(
+            [("room_type_id", "in", room_types.ids)],
+            ["room_type_id", "status"],
+            ["__count"],
+        ):
+            totals[room_type.id] = totals.get(room_type.id, 0) + count
+            if status == "available":
+                available[room_type.id] = count
+
+        today = fields.Date.context_today(self)
+        self.env["hotel.room.type.capacity"]._fill_missing(room_types.ids, today, today)
+        free_today = {
+            capacity.room_type_id.id: capacity.rooms_free
+            for capacity in self.env["hotel.room.type.capacity"].search(
+                [("room_type_id", "in", room_types.ids), ("bucket_start", "=", today)]
             )
-            total_count = self.search_count([("room_type_id", "=", room_type.id)])
+        }
 
+        summary = []
+        for room_type in room_types:
+            available_count = available.get(room_type.id, 0)
+            total_count = totals.get(room_type.id, 0)
             summary.append(
                 {
                     "room_type": room_type.name,
                     "available": available_count,
                     "total": total_count,
+                    "free_today": free_today.get(room_type.id),
                     "occupancy_rate": (
                         ((total_count - available_count) / total_count * 100)
                         if total_count > 0
@@ -298,6 +351,7 @@ class HotelRoom(models.Model):
             rec.num_person = 0  # ou rien, selon le besoin
 
     @api.model
+    @instrument()
     def get_room_activities(self, room_id, start_date, end_date):
         """
         Retourne toutes les activités d'une chambre (séjours, nettoyages, etc.)
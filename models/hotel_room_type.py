@@ -1,7 +1,41 @@
 from odoo import models, api, _, fields
+from odoo.tools import SQL
 from datetime import datetime
+from functools import partial
 from odoo.exceptions import ValidationError, UserError
 
+from ..utils.occupancy_grid import GRIDS
+
+
+def _flush_availability_generations(registry, dbname, data):
+    """
+    Après commit : incrémente les générations des types modifiés dans une
+    transaction dédiée, puis abandonne leurs grilles d'occupation dans le
+    processus.
+
+    Les grilles ne sont pas mises à jour par différentiel : entre le commit
+    et l'incrémentation, un autre thread a pu reconstruire la grille depuis
+    la base, séjour compris, à l'ancienne génération ; la reconstruction à
+    la prochaine demande est toujours exacte. Si l'incrémentation n'a pas
+    lieu (processus interrompu), la durée de vie des grilles borne
+    l'obsolescence dans les autres processus.
+    """
+    room_type_ids = data.pop("hotel.availability.dirty_types", set())
+    if not room_type_ids:
+        return
+    try:
+        with registry.cursor() as cr:
+            cr.execute(SQL(
+                """
+                UPDATE hotel_room_type
+                   SET availability_generation = availability_generation + 1
+                 WHERE id IN %s
+                """,
+                tuple(sorted(room_type_ids)),
+            ))
+    finally:
+        GRIDS.drop(dbname, room_type_ids)
+
 
 class HotelRoomType(models.Model):
     _name = "hotel.room.type"
@@ -139,6 +173,15 @@ class HotelRoomType(models.Model):
         "amenity_id",
         string="Équipements",
     )
+    # Compteur incrémenté à chaque changement de disponibilité (séjours,
+    # chambres) : estampille des grilles d'occupation et caches du moteur
+    availability_generation = fields.Integer(
+        string="Génération de disponibilité",
+        default=0,
+        readonly=True,
+        copy=False,
+    )
+
     _sql_constraints = [
         (
             "code_unique",
@@ -161,7 +204,14 @@ class HotelRoomType(models.Model):
     def write(self, vals):
         if "code" in vals:
             vals["code"] = vals["code"].upper()
-        return super(HotelRoomType, self).write(vals)
+        res = super(HotelRoomType, self).write(vals)
+        if "capacity" in vals or "active" in vals:
+            # Capacité reprise dans la table tarifaire compilée (extra_guest)
+            self.env["hotel.pricing.service"]._invalidate_pricing_table()
+            # Chambres candidates du moteur (filtrées sur l'actif du type) :
+            # caches de résultats et grilles d'occupation à invalider
+            self._bump_availability_generation()
+        return res
 
     _sql_constraints = [
         (
@@ -171,6 +221,29 @@ class HotelRoomType(models.Model):
         ),
     ]
 
+    def _bump_availability_generation(self):
+        """
+        Marque les types dont la disponibilité change dans la transaction.
+
+        Le compteur n'est incrémenté qu'après commit, dans une transaction
+        courte (cf. _flush_availability_generations) : une transaction de
+        réservation ne garde jamais le verrou de ligne du type, les
+        réservations concurrentes d'un même type ne sont pas sérialisées.
+        """
+        if not self:
+            return
+        postcommit = self.env.cr.postcommit
+        # Types modifiés par la transaction : générations non encore incrémentées
+        dirty = postcommit.data.setdefault("hotel.availability.dirty_types", set())
+        if not dirty:
+            postcommit.add(partial(
+                _flush_availability_generations,
+                self.env.registry,
+                self.env.cr.dbname,
+                postcommit.data,
+            ))
+        dirty.update(self.ids)
+
     def get_checkin_checkout_time(self, type_code=None):
         """
         Retourne les horaires à appliquer selon le type de réservation demandé.
@@ -0,0 +1,432 @@
+from odoo import api, fields, models, _
+from odoo.tools import SQL
+from datetime import timedelta
+from functools import partial
+from psycopg2.errors import DeadlockDetected, SerializationFailure
+import logging
+
+from ..constants.booking_stays_state import ACTIVE_STAY_STATES
+
+_logger = logging.getLogger(__name__)
+
+# Horizon maintenu (jours à partir d'aujourd'hui) et historique conservé
+HORIZON_PARAM = "hotel_management_extension.capacity_horizon_days"
+DEFAULT_HORIZON_DAYS = 365
+HISTORY_DAYS = 30
+
+# Chambres exclues de la capacité vendable (cf. moteur de disponibilité)
+UNSELLABLE_ROOM_STATUSES = ("out_of_order", "maintenance")
+
+# Plages (type -> (du, au)) à recalculer après le commit de la transaction
+PENDING_RANGES_KEY = "hotel.room.type.capacity.pending"
+# Tentatives du recalcul après commit en cas de conflit avec un recalcul concurrent
+REFRESH_ATTEMPTS = 3
+
+
+def _flush_capacity_refresh(registry, uid, data):
+    """
+    Après commit : recalcule les plages touchées dans une transaction courte
+    et dédiée, qui ne retient donc jamais une transaction de réservation.
+    Deux recalculs concurrents des mêmes jours peuvent se heurter ; après
+    plusieurs échecs, la tâche de l'horizon (qui réconcilie toute la table)
+    est déclenchée.
+    """
+    ranges = data.pop(PENDING_RANGES_KEY, {})
+    if not ranges:
+        return
+    for attempt in range(1, REFRESH_ATTEMPTS + 1):
+        try:
+            with registry.cursor() as cr:
+                Capacity = api.Environment(cr, uid, {})["hotel.room.type.capacity"]
+                for room_type_id, (date_from, date_to) in sorted(ranges.items()):
+                    Capacity._refresh_buckets([room_type_id], date_from, date_to)
+            return
+        except (SerializationFailure, DeadlockDetected) as e:
+            _logger.info(
+                "[CAPACITY] Recalcul après commit en conflit (tentative %d/%d) : %s",
+                attempt, REFRESH_ATTEMPTS, e,
+            )
+    _logger.warning(
+        "[CAPACITY] Recalcul abandonné pour les types %s : réconciliation par la tâche planifiée",
+        sorted(ranges),
+    )
+    with registry.cursor() as cr:
+        api.Environment(cr, uid, {}).ref(
+            "hotel_management_extension.ir_cron_roll_room_type_capacity"
+        )._trigger()
+
+
+class HotelRoomTypeCapacity(models.Model):
+    """
+    Capacité journalière par type de chambre, maintenue incrémentalement.
+
+    Une chambre est comptée « réservée » un jour donné si un séjour actif
+    l'occupe à un moment quelconque de ce jour : ``rooms_free`` est donc le
+    nombre de chambres libres toute la journée.
+
+    Les jours touchés par une modification de séjours ou de chambres sont
+    recalculés après le commit, dans une transaction courte : les
+    réservations concurrentes d'un même type ne se disputent pas les lignes
+    de capacité. La tâche quotidienne réconcilie tout l'horizon.
+    """
+
+    _name = "hotel.room.type.capacity"
+    _description = "Capacité journalière par type de chambre"
+    _order = "bucket_start, room_type_id"
+
+    room_type_id = fields.Many2one(
+        "hotel.room.type",
+        string="Type de chambre",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+    bucket_start = fields.Date(string="Jour", required=True, index=True)
+    rooms_total = fields.Integer(string="Chambres vendables", readonly=True)
+    rooms_booked = fields.Integer(string="Chambres réservées", readonly=True)
+    rooms_free = fields.Integer(
+        string="Chambres libres", compute="_compute_rooms_free"
+    )
+
+    _sql_constraints = [
+        (
+            "room_type_bucket_unique",
+            "unique(room_type_id, bucket_start)",
+            "Une seule ligne de capacité par type de chambre et par jour !",
+        ),
+    ]
+
+    def init(self):
+        """Remplit tout l'horizon à l'installation (et complète les trous à la mise à jour)."""
+        horizon_start, horizon_end = self._horizon()
+        room_type_ids = self.env["hotel.room.type"].search([]).ids
+        self._fill_missing(room_type_ids, horizon_start, horizon_end)
+
+    @api.depends("rooms_total", "rooms_booked")
+    def _compute_rooms_free(self):
+        for rec in self:
+            rec.rooms_free = max(rec.rooms_total - rec.rooms_booked, 0)
+
+    # ==================== CALCUL SQL ====================
+
+    def _capacity_rows_sql(self, room_type_ids, date_from, date_to):
+        """
+        Requête (room_type_id, day, rooms_total, rooms_booked) calculée depuis
+        les chambres et séjours, pour chaque type et chaque jour de [date_from, date_to].
+        """
+        return SQL(
+            """
+            WITH days AS (
+                SELECT t.id AS room_type_id, d::date AS day
+                  FROM hotel_room_type t
+                 CROSS JOIN generate_series(%(date_from)s::date, %(date_to)s::date,
+                                            interval '1 day') d
+                 WHERE t.id IN %(type_ids)s
+            ),
+            rooms AS (
+                SELECT r.room_type_id, count(*) AS rooms_total
+                  FROM hotel_room r
+                 WHERE r.room_type_id IN %(type_ids)s
+                   AND r.status NOT IN %(unsellable)s
+                 GROUP BY r.room_type_id
+            ),
+            booked AS (
+                SELECT r.room_type_id, d::date AS day,
+                       count(DISTINCT s.room_id) AS rooms_booked
+                  FROM hotel_booking_stay s
+                  JOIN hotel_room r ON r.id = s.room_id
+                 CROSS JOIN LATERAL generate_series(
+                       greatest(s.actual_checkin_date::date, %(date_from)s::date),
+                       least((s.actual_checkout_date - interval '1 microsecond')::date,
+                             %(date_to)s::date),
+                       interval '1 day') d
+                 WHERE r.room_type_id IN %(type_ids)s
+                   AND r.status NOT IN %(unsellable)s
+                   AND s.state IN %(states)s
+                   AND s.actual_checkout_date > s.actual_checkin_date
+                   AND s.actual_checkin_date < %(date_to)s::date + 1
+                   AND s.actual_checkout_date > %(date_from)s::date
+                 GROUP BY r.room_type_id, d::date
+            )
+            SELECT days.room_type_id, days.day,
+                   coalesce(rooms.rooms_total, 0) AS rooms_total,
+                   coalesce(booked.rooms_booked, 0) AS rooms_booked
+              FROM days
+              LEFT JOIN rooms ON rooms.room_type_id = days.room_type_id
+              LEFT JOIN booked ON booked.room_type_id = days.room_type_id
+                              AND booked.day = days.day
+            """,
+            date_from=date_from,
+            date_to=date_to,
+            type_ids=tuple(room_type_ids),
+            unsellable=UNSELLABLE_ROOM_STATUSES,
+            states=tuple(ACTIVE_STAY_STATES),
+        )
+
+    def _refresh_buckets(self, room_type_ids, date_from, date_to):
+        """Recalcule (upsert) les jours [date_from, date_to] des types donnés."""
+        if not room_type_ids or date_to < date_from:
+            return 0
+        self.env["hotel.booking.stay"].flush_model(
+            ["room_id", "state", "actual_checkin_date", "actual_checkout_date"]
+        )
+        self.env["hotel.room"].flush_model(["room_type_id", "status"])
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO hotel_room_type_capacity
+                   (room_type_id, bucket_start, rooms_total, rooms_booked,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT c.room_type_id, c.day, c.rooms_total, c.rooms_booked,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM (%(rows)s) c
+            ON CONFLICT (room_type_id, bucket_start) DO UPDATE
+               SET rooms_total = EXCLUDED.rooms_total,
+                   rooms_booked = EXCLUDED.rooms_booked,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+             WHERE (hotel_room_type_capacity.rooms_total, hotel_room_type_capacity.rooms_booked)
+                   IS DISTINCT FROM (EXCLUDED.rooms_total, EXCLUDED.rooms_booked)
+            """,
+            uid=self.env.uid,
+            rows=self._capacity_rows_sql(room_type_ids, date_from, date_to),
+        ))
+        updated = self.env.cr.rowcount
+        self.invalidate_model(["rooms_total", "rooms_booked"])
+        return updated
+
+    def _fill_missing(self, room_type_ids, date_from, date_to):
+        """
+        Calcule les lignes absentes de [date_from, date_to] pour les types
+        donnés : une ligne manquante ne doit jamais se lire « 0 chambre libre ».
+        Chaque type n'est recalculé que sur l'étendue de ses jours manquants.
+        """
+        if not room_type_ids or date_to < date_from:
+            return 0
+        self.flush_model(["room_type_id", "bucket_start"])
+        self.env.cr.execute(SQL(
+            """
+            SELECT t.id, min(d::date), max(d::date)
+              FROM hotel_room_type t
+             CROSS JOIN generate_series(%(date_from)s::date, %(date_to)s::date,
+                                        interval '1 day') d
+             WHERE t.id IN %(type_ids)s
+               AND NOT EXISTS (
+                   SELECT 1 FROM hotel_room_type_capacity c
+                    WHERE c.room_type_id = t.id AND c.bucket_start = d::date)
+             GROUP BY t.id
+            """,
+            date_from=date_from,
+            date_to=date_to,
+            type_ids=tuple(room_type_ids),
+        ))
+        filled = 0
+        for room_type_id, first_missing, last_missing in self.env.cr.fetchall():
+            filled += self._refresh_buckets([room_type_id], first_missing, last_missing)
+        return filled
+
+    def _horizon(self):
+        today = fields.Date.context_today(self)
+        horizon_days = int(
+            self.env["ir.config_parameter"].sudo().get_param(HORIZON_PARAM, DEFAULT_HORIZON_DAYS)
+        )
+        return today - timedelta(days=HISTORY_DAYS), today + timedelta(days=horizon_days)
+
+    # ==================== MISE À JOUR INCRÉMENTALE ====================
+
+    @api.model
+    def _queue_refresh(self, ranges):
+        """
+        Ajoute des plages {type: (du, au)} à recalculer après le commit de la
+        transaction courante, fusionnées par type.
+        """
+        if not ranges:
+            return
+        postcommit = self.env.cr.postcommit
+        pending = postcommit.data.setdefault(PENDING_RANGES_KEY, {})
+        if not pending:
+            postcommit.add(partial(
+                _flush_capacity_refresh, self.env.registry, self.env.uid, postcommit.data
+            ))
+        for room_type_id, (date_from, date_to) in ranges.items():
+            current = pending.get(room_type_id)
+            pending[room_type_id] = (
+                (min(current[0], date_from), max(current[1], date_to))
+                if current else (date_from, date_to)
+            )
+
+    @api.model
+    def _refresh_for_footprints(self, footprints):
+        """
+        Appelé par le dispatcher des séjours : seuls les jours couverts par les
+        empreintes (avant et après changement), bornés à l'horizon, sont
+        recalculés, après commit.
+        """
+        horizon_start, horizon_end = self._horizon()
+        ranges = {}
+        for fp in footprints:
+            if not fp.room_type_id or not fp.checkin or not fp.checkout:
+                continue
+            first_day = max(fp.checkin.date(), horizon_start)
+            last_day = min((fp.checkout - timedelta(microseconds=1)).date(), horizon_end)
+            if last_day < first_day:
+                continue
+            current = ranges.get(fp.room_type_id)
+            ranges[fp.room_type_id] = (
+                (min(current[0], first_day), max(current[1], last_day))
+                if current else (first_day, last_day)
+            )
+        self._queue_refresh(ranges)
+
+    @api.model
+    def _refresh_room_types(self, room_type_ids):
+        """Changement de chambres (type, statut) : tout l'horizon des types concernés, après commit."""
+        horizon = self._horizon()
+        self._queue_refresh({room_type_id: horizon for room_type_id in room_type_ids})
+
+    # ==================== COMMANDES ====================
+
+    @api.model
+    def action_rebuild(self, date_from=None, date_to=None):
+        """
+        Reconstruit entièrement la table sur la période (horizon par défaut).
+
+        :return: dict {success, message, data: {'rows': nb lignes}}
+        """
+        horizon_start, horizon_end = self._horizon()
+        date_from = fields.Date.to_date(date_from) or horizon_start
+        date_to = fields.Date.to_date(date_to) or horizon_end
+        room_type_ids = self.env["hotel.room.type"].search([]).ids
+
+        self.env.cr.execute(SQL(
+            "DELETE FROM hotel_room_type_capacity WHERE bucket_start BETWEEN %s AND %s",
+            date_from, date_to,
+        ))
+        rows = self._refresh_buckets(room_type_ids, date_from, date_to)
+        _logger.info(
+            "[CAPACITY] Reconstruction %s → %s | %d type(s) | %d ligne(s)",
+            date_from, date_to, len(room_type_ids), rows,
+        )
+        return {
+            "success": True,
+            "message": _("Capacités reconstruites du %s au %s") % (date_from, date_to),
+            "data": {"rows": rows},
+        }
+
+    @api.model
+    def _cron_roll_horizon(self):
+        """
+        Tâche quotidienne (ou déclenchée après un recalcul abandonné) : purge
+        l'historique et réconcilie tout l'horizon avec les séjours. Les jours
+        absents sont créés, les jours périmés (recalcul après commit perdu)
+        corrigés ; les lignes déjà exactes ne sont pas réécrites.
+        """
+        horizon_start, horizon_end = self._horizon()
+        self.env.cr.execute(SQL(
+            "DELETE FROM hotel_room_type_capacity WHERE bucket_start < %s",
+            horizon_start,
+        ))
+        room_type_ids = self.env["hotel.room.type"].search([]).ids
+        return self._refresh_buckets(room_type_ids, horizon_start, horizon_end)
+
+    @api.model
+    def check_consistency(self, date_from=None, date_to=None):
+        """
+        Compare la table aux séjours (hotel.booking.stay) sur la période.
+
+        :return: dict {success, message, data: [écarts]} ; success=False si écart
+        """
+        horizon_start, horizon_end = self._horizon()
+        date_from = fields.Date.to_date(date_from) or horizon_start
+        date_to = fields.Date.to_date(date_to) or horizon_end
+        room_type_ids = self.env["hotel.room.type"].search([]).ids
+        if not room_type_ids:
+            return {"success": True, "message": _("Aucun type de chambre"), "data": []}
+
+        self.env["hotel.booking.stay"].flush_model()
+        self.env["hotel.room"].flush_model()
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT e.room_type_id, e.day,
+                   e.rooms_total, e.rooms_booked,
+                   c.rooms_total, c.rooms_booked
+              FROM (%(rows)s) e
+              LEFT JOIN hotel_room_type_capacity c
+                     ON c.room_type_id = e.room_type_id AND c.bucket_start = e.day
+             WHERE c.id IS NULL
+                OR (c.rooms_total, c.rooms_booked) IS DISTINCT FROM (e.rooms_total, e.rooms_booked)
+             ORDER BY e.day, e.room_type_id
+            """,
+            rows=self._capacity_rows_sql(room_type_ids, date_from, date_to),
+        ))
+        mismatches = [
+            {
+                "room_type_id": room_type_id,
+                "date": day,
+                "expected_total": expected_total,
+                "expected_booked": expected_booked,
+                "stored_total": stored_total,
+                "stored_booked": stored_booked,
+            }
+            for room_type_id, day, expected_total, expected_booked, stored_total, stored_booked
+            in self.env.cr.fetchall()
+        ]
+        if mismatches:
+            _logger.warning(
+                "[CAPACITY] %d écart(s) détecté(s) entre %s et %s",
+                len(mismatches), date_from, date_to,
+            )
+        return {
+            "success": not mismatches,
+            "message": (
+                _("%s écart(s) détecté(s)") % len(mismatches)
+                if mismatches else _("Capacités cohérentes avec les séjours")
+            ),
+            "data": mismatches,
+        }
+
+    # ==================== LECTURE ====================
+
+    @api.model
+    def get_capacity_grid(self, date_from, date_to, room_type_ids=None):
+        """
+        Grille « chambres libres par type et par jour » en une lecture.
+
+        :return: dict {success, message, data: {'dates': [...], 'room_types':
+                 [{'id', 'name', 'rooms_total': [...], 'rooms_free': [...]}]}}
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        self._fill_missing(
+            room_type_ids or self.env["hotel.room.type"].search([]).ids, date_from, date_to
+        )
+        domain = [("bucket_start", ">=", date_from), ("bucket_start", "<=", date_to)]
+        if room_type_ids:
+            domain.append(("room_type_id", "in", room_type_ids))
+        rows = self.search_read(
+            domain, ["room_type_id", "bucket_start", "rooms_total", "rooms_booked"]
+        )
+
+        dates = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+        position = {day: i for i, day in enumerate(dates)}
+        grid = {}
+        for row in rows:
+            type_id, type_name = row["room_type_id"]
+            entry = grid.setdefault(type_id, {
+                "id": type_id,
+                "name": type_name,
+                "rooms_total": [0] * len(dates),
+                "rooms_free": [0] * len(dates),
+            })
+            i = position[row["bucket_start"]]
+            entry["rooms_total"][i] = row["rooms_total"]
+            entry["rooms_free"][i] = max(row["rooms_total"] - row["rooms_booked"], 0)
+
+        return {
+            "success": True,
+            "message": _("Grille de capacité du %s au %s") % (date_from, date_to),
+            "data": {
+                "dates": [fields.Date.to_string(day) for day in dates],
+                "room_types": list(grid.values()),
+            },
+        }
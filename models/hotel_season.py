@@ -3,6 +3,7 @@ from odoo import models, fields, api
 
 class HotelSeason(models.Model):
     _name = "hotel.season"
+    _inherit = ["hotel.pricing.config.mixin"]
     _description = "Hotel Season"
     _order = "priority desc, date_start asc"
 
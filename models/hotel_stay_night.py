@@ -0,0 +1,245 @@
+from odoo import api, fields, models, _
+from odoo.tools import SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Clé des séjours à remettre à jour dans le registre en fin de transaction
+PENDING_STAYS_KEY = "hotel.stay.night.pending_stays"
+
+NIGHT_CATEGORIES = [
+    ("short", "Day Use"),
+    ("night", "Nuitée"),
+    ("long", "Long séjour"),
+]
+
+
+class HotelStayNight(models.Model):
+    """
+    Registre des nuitées vendues : une ligne par séjour et par nuit, avec le
+    montant réparti, la catégorie et la chambre.
+
+    Mêmes règles que les métriques journalières (dates prévues) :
+    - arrivée et départ le même jour : une ligne Day Use portant tout le montant ;
+    - sinon montant / nombre de nuits, une ligne par nuit [arrivée, départ) ;
+    - Nuitée si la durée est comprise dans [24h, 48h), Long séjour sinon.
+
+    Les lignes d'un séjour sont régénérées en fin de transaction (pré-commit)
+    lorsque ses dates, sa chambre ou son prix changent ; la suppression d'un
+    séjour supprime ses lignes (cascade). Occupation, ADR et RevPAR d'une
+    période deviennent un agrégat indexé sur night_date (cf. get_kpis).
+    """
+
+    _name = "hotel.stay.night"
+    _description = "Nuitée vendue (registre)"
+    _order = "night_date, room_id, id"
+
+    stay_id = fields.Many2one(
+        "hotel.booking.stay",
+        string="Séjour",
+        required=True,
+        index=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    night_date = fields.Date(string="Nuit", required=True, index=True, readonly=True)
+    room_id = fields.Many2one("hotel.room", string="Chambre", index=True, readonly=True)
+    room_type_id = fields.Many2one("hotel.room.type", string="Type de chambre", readonly=True)
+    reservation_type_id = fields.Many2one(
+        "hotel.reservation.type", string="Type de réservation", readonly=True
+    )
+    category = fields.Selection(NIGHT_CATEGORIES, string="Catégorie", readonly=True)
+    amount = fields.Float(string="Montant", readonly=True)
+
+    _sql_constraints = [
+        (
+            "stay_night_unique",
+            "unique(stay_id, night_date)",
+            "Une seule ligne par séjour et par nuit !",
+        ),
+    ]
+
+    def init(self):
+        """Remplit le registre à l'installation, depuis les séjours existants."""
+        self.env.cr.execute("SELECT 1 FROM hotel_stay_night LIMIT 1")
+        if not self.env.cr.fetchone():
+            self.env.cr.execute(self._insert_nights_sql())
+
+    # ==================== CALCUL SQL ====================
+
+    def _insert_nights_sql(self, stay_ids=None):
+        """INSERT des nuitées des séjours donnés (tous les séjours si None)."""
+        stay_filter = SQL("TRUE") if stay_ids is None else SQL("s.id IN %s", tuple(stay_ids))
+        return SQL(
+            """
+            INSERT INTO hotel_stay_night
+                   (stay_id, night_date, room_id, room_type_id, reservation_type_id,
+                    category, amount, create_uid, create_date, write_uid, write_date)
+            SELECT s.id,
+                   n::date,
+                   s.room_id,
+                   s.room_type_id,
+                   s.reservation_type_id,
+                   CASE
+                       WHEN s.day_in = s.day_out THEN 'short'
+                       WHEN s.duration >= interval '1 day'
+                            AND s.duration < interval '2 days' THEN 'night'
+                       ELSE 'long'
+                   END,
+                   s.total / greatest(s.day_out - s.day_in, 1),
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT s.id, s.room_id, s.room_type_id, s.reservation_type_id,
+                           s.planned_checkin_date::date AS day_in,
+                           s.planned_checkout_date::date AS day_out,
+                           s.planned_checkout_date - s.planned_checkin_date AS duration,
+                           COALESCE(s.room_price_total, 0)::float8 AS total
+                      FROM hotel_booking_stay s
+                     WHERE %(stay_filter)s
+                       AND s.planned_checkin_date IS NOT NULL
+                       AND s.planned_checkout_date IS NOT NULL
+                       AND s.planned_checkout_date::date >= s.planned_checkin_date::date
+                   ) s
+             CROSS JOIN LATERAL generate_series(
+                   s.day_in,
+                   greatest(s.day_out - 1, s.day_in),
+                   interval '1 day') n
+            """,
+            uid=self.env.uid,
+            stay_filter=stay_filter,
+        )
+
+    def _rebuild_for_stays(self, stay_ids):
+        """Régénère les nuitées des séjours donnés (séjours supprimés : aucune ligne)."""
+        stay_ids = sorted(set(stay_ids))
+        if not stay_ids:
+            return 0
+        self.env["hotel.booking.stay"].flush_model([
+            "room_id", "room_type_id", "reservation_type_id", "room_price_total",
+            "planned_checkin_date", "planned_checkout_date",
+        ])
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            "DELETE FROM hotel_stay_night WHERE stay_id IN %s", tuple(stay_ids)
+        ))
+        self.env.cr.execute(self._insert_nights_sql(stay_ids))
+        inserted = self.env.cr.rowcount
+        self.invalidate_model()
+        return inserted
+
+    # ==================== MISE À JOUR EN FIN DE TRANSACTION ====================
+
+    @api.model
+    def _mark_stays(self, stay_ids):
+        """
+        Séjours à régénérer, traités en une fois au pré-commit : après le
+        flush de l'ORM, donc sur les prix et dates finaux de la transaction.
+        """
+        stay_ids = {stay_id for stay_id in stay_ids if stay_id}
+        if not stay_ids:
+            return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.setdefault(PENDING_STAYS_KEY, set())
+        if not pending:
+            precommit.add(self._flush_pending_stays)
+        pending.update(stay_ids)
+
+    @api.model
+    def _flush_pending_stays(self):
+        stay_ids = self.env.cr.precommit.data.pop(PENDING_STAYS_KEY, set())
+        if stay_ids:
+            self._rebuild_for_stays(stay_ids)
+
+    # ==================== COMMANDES ====================
+
+    @api.model
+    def action_rebuild(self):
+        """
+        Reconstruit entièrement le registre depuis les séjours.
+
+        :return: dict {success, message, data: {'rows': nb lignes}}
+        """
+        self.env["hotel.booking.stay"].flush_model()
+        self.env.cr.execute(SQL("DELETE FROM hotel_stay_night"))
+        self.env.cr.execute(self._insert_nights_sql())
+        rows = self.env.cr.rowcount
+        self.invalidate_model()
+        _logger.info("[NIGHTS] Reconstruction du registre | %d ligne(s)", rows)
+        return {
+            "success": True,
+            "message": _("Registre des nuitées reconstruit (%s lignes)") % rows,
+            "data": {"rows": rows},
+        }
+
+    # ==================== LECTURE ====================
+
+    @api.model
+    def get_kpis(self, date_from, date_to, room_type_ids=None):
+        """
+        Occupation, ADR et RevPAR sur [date_from, date_to], agrégés sur le registre.
+
+        - nuitées vendues : couples (chambre, nuit) distincts ;
+        - nuitées disponibles : chambres actives × nombre de jours ;
+        - ADR : revenu / nuitées vendues ; RevPAR : revenu / nuitées disponibles.
+
+        Revenu, ADR et RevPAR ne portent que sur les nuitées avec chambre, comme
+        les nuitées vendues ; le montant des séjours sans chambre attribuée est
+        donné à part (``revenue_unassigned``).
+
+        :return: dict {success, message, data: {'room_nights_sold',
+                 'room_nights_available', 'occupancy_rate', 'revenue', 'adr',
+                 'revpar', 'revenue_unassigned',
+                 'categories': {catégorie: {'nights', 'revenue'}}}}
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        if not date_from or not date_to or date_to < date_from:
+            return {"success": False, "message": _("Période invalide"), "data": {}}
+
+        room_domain = [("active", "=", True)]
+        night_filter = SQL("TRUE")
+        if room_type_ids:
+            room_domain.append(("room_type_id", "in", room_type_ids))
+            night_filter = SQL("room_type_id IN %s", tuple(room_type_ids))
+        days = (date_to - date_from).days + 1
+        available = self.env["hotel.room"].search_count(room_domain) * days
+
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT category,
+                   COUNT(DISTINCT (room_id, night_date)) FILTER (WHERE room_id IS NOT NULL),
+                   COALESCE(SUM(amount) FILTER (WHERE room_id IS NOT NULL), 0),
+                   COALESCE(SUM(amount) FILTER (WHERE room_id IS NULL), 0)
+              FROM hotel_stay_night
+             WHERE night_date BETWEEN %(date_from)s AND %(date_to)s
+               AND %(night_filter)s
+             GROUP BY ROLLUP (category)
+            """,
+            date_from=date_from,
+            date_to=date_to,
+            night_filter=night_filter,
+        ))
+        sold, revenue, unassigned = 0, 0.0, 0.0
+        categories = {key: {"nights": 0, "revenue": 0.0} for key, _label in NIGHT_CATEGORIES}
+        for category, nights, amount, amount_unassigned in self.env.cr.fetchall():
+            if category is None:
+                # Ligne de total du ROLLUP (une chambre compte une fois par nuit)
+                sold, revenue, unassigned = nights, amount, amount_unassigned
+            else:
+                categories[category] = {"nights": nights, "revenue": amount}
+
+        return {
+            "success": True,
+            "message": _("Indicateurs du %s au %s") % (date_from, date_to),
+            "data": {
+                "room_nights_sold": sold,
+                "room_nights_available": available,
+                "occupancy_rate": (sold / available * 100) if available else 0.0,
+                "revenue": revenue,
+                "adr": revenue / sold if sold else 0.0,
+                "revpar": revenue / available if available else 0.0,
+                "revenue_unassigned": unassigned,
+                "categories": categories,
+            },
+        }
@@ -0,0 +1,50 @@
+from odoo import api, models
+from odoo.tools import ormcache
+
+from ..utils.lazy_log import LOG_LEVELS_PARAM, apply_log_levels
+from ..utils.trace_events import TRACE_SAMPLING_PARAM, configure_sampling
+
+
+class IrConfigParameter(models.Model):
+    _inherit = "ir.config_parameter"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._apply_hotel_instrumentation()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._apply_hotel_instrumentation()
+        return res
+
+    def _apply_hotel_instrumentation(self):
+        """
+        Niveaux des loggers hôteliers et échantillonnage des traces, appliqués
+        dès la modification du paramètre (processus courant).
+        """
+        for param in self:
+            if param.key == LOG_LEVELS_PARAM:
+                apply_log_levels(param.value)
+            elif param.key == TRACE_SAMPLING_PARAM:
+                configure_sampling(param.value)
+
+    @api.model
+    @ormcache()
+    def _sync_hotel_instrumentation(self):
+        """
+        Applique les paramètres d'instrumentation dans le processus courant.
+
+        Appelé à l'entrée des moteurs : en cache (coût d'une recherche de
+        dictionnaire) tant que les paramètres ne changent pas. Toute
+        modification d'un paramètre système vide les caches du registre, y
+        compris dans les autres workers (signalisation du registre) : le
+        premier appel suivant relit et réapplique les valeurs.
+        """
+        ICP = self.sudo()
+        log_levels = ICP.get_param(LOG_LEVELS_PARAM)
+        sampling = ICP.get_param(TRACE_SAMPLING_PARAM)
+        apply_log_levels(log_levels)
+        configure_sampling(sampling)
+        return log_levels, sampling
@@ -0,0 +1,63 @@
+from odoo import api, models
+
+# Champs lus par hotel.metric (nombre de ventes, revenu, top produits)
+METRIC_POS_FIELDS = {"date_order", "state", "amount_total", "lines"}
+
+
+class PosOrder(models.Model):
+    """Commandes POS : marque les jours de métriques touchés (mode incrémental)."""
+
+    _inherit = "pos.order"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        self.env["hotel.metric.dirty.day"]._mark_dirty(orders._metric_days())
+        return orders
+
+    def write(self, vals):
+        metric_days = self._metric_days() if METRIC_POS_FIELDS.intersection(vals) else None
+        res = super().write(vals)
+        if metric_days is not None:
+            self.env["hotel.metric.dirty.day"]._mark_dirty(metric_days | self._metric_days())
+        return res
+
+    def unlink(self):
+        metric_days = self._metric_days()
+        res = super().unlink()
+        self.env["hotel.metric.dirty.day"]._mark_dirty(metric_days)
+        return res
+
+    def _metric_days(self):
+        return {order.date_order.date() for order in self if order.date_order}
+
+
+# Champs des lignes lus par hotel.metric (top produits)
+METRIC_POS_LINE_FIELDS = {"order_id", "product_id", "qty"}
+
+
+class PosOrderLine(models.Model):
+    """Lignes POS : une ligne créée ou modifiée seule change le top produits du jour."""
+
+    _inherit = "pos.order.line"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env["hotel.metric.dirty.day"]._mark_dirty(lines.order_id._metric_days())
+        return lines
+
+    def write(self, vals):
+        metric_days = (
+            self.order_id._metric_days() if METRIC_POS_LINE_FIELDS.intersection(vals) else None
+        )
+        res = super().write(vals)
+        if metric_days is not None:
+            self.env["hotel.metric.dirty.day"]._mark_dirty(metric_days | self.order_id._metric_days())
+        return res
+
+    def unlink(self):
+        metric_days = self.order_id._metric_days()
+        res = super().unlink()
+        self.env["hotel.metric.dirty.day"]._mark_dirty(metric_days)
+        return res
@@ -4,13 +4,35 @@ Gère l'attribution automatique et la détection de conflits de réservation
 avec règles métier strictes pour les alternatives et indisponibilité partielle
 """
 
+import copy
 import logging
 from datetime import datetime, timedelta
 from odoo import models, api, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
+from ..constants.booking_stays_state import ACTIVE_STAY_STATES, CLEANING_BUFFER_HOURS
+from ..utils.gap_engine import GapEngine
+from ..utils.interval_index import RoomIntervalIndex, StayInterval
+from ..utils.lru_cache import BoundedLRU
+from ..utils.occupancy_grid import GRIDS, OccupancyGrid, horizon_start_for
+from ..utils.perf import instrument
+from ..utils.trace_events import trace_event
 
 _logger = logging.getLogger(__name__)
 
+# Fenêtre de recherche des alternatives après le check-out demandé (jours)
+ALTERNATIVES_WINDOW_DAYS = 30
+
+# Paramètres système du backend « grille d'occupation »
+BACKEND_PARAM = 'hotel_management_extension.availability_backend'
+GRID_GRANULARITY_PARAM = 'hotel_management_extension.occupancy_grid_granularity'
+GRID_HORIZON_PARAM = 'hotel_management_extension.occupancy_grid_horizon_days'
+
+# Résultats de check_availability, par processus. Les clés portent la génération
+# de disponibilité du type : toute modification de séjour/chambre les périme.
+# La durée de vie couvre ce qui dépend de l'heure courante (alternatives >= now).
+_RESULT_CACHE = BoundedLRU(maxsize=512, ttl=60)
+
 
 class HotelRoomAvailabilityEngine(models.AbstractModel):
     """
@@ -29,6 +51,7 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
     # ==================== MÉTHODES PUBLIQUES ====================
 
     @api.model
+    @instrument()
     def check_availability(self, room_type_id, checkin_date, checkout_date, 
                           exclude_stay_id=None, buffer_hours=None, reservation_type_id=None):
         """
@@ -44,6 +67,52 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         :param reservation_type_id: ID du type de réservation (pour validation horaires)
         :return: dict avec status, room_id, message, alternatives
         """
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+        with trace_event(
+            "availability.check", "availability", self.env.cr,
+            stay_id=exclude_stay_id, room_type_id=room_type_id,
+        ) as span:
+            cache_key = self._availability_cache_key(
+                room_type_id, checkin_date, checkout_date,
+                exclude_stay_id, buffer_hours, reservation_type_id
+            )
+            if cache_key:
+                cached = _RESULT_CACHE.get(cache_key)
+                if cached is not None:
+                    _logger.debug(
+                        "[AVAILABILITY] Résultat en cache | type=%s | in=%s | out=%s",
+                        room_type_id, checkin_date, checkout_date
+                    )
+                    span.set(decision=cached.get('status'), cache='hit')
+                    return copy.deepcopy(cached)
+
+            result = self._compute_availability(
+                room_type_id, checkin_date, checkout_date,
+                exclude_stay_id, buffer_hours, reservation_type_id
+            )
+            if cache_key:
+                _RESULT_CACHE.put(cache_key, copy.deepcopy(result))
+            span.set(
+                decision=result.get('status'),
+                cache='miss' if cache_key else 'bypass',
+                room_id=result.get('room_id'),
+            )
+            return result
+
+    @api.model
+    def get_cache_stats(self):
+        """Compteurs du cache de résultats (hits, misses, taille) du processus."""
+        return _RESULT_CACHE.stats()
+
+    @api.model
+    def clear_cache(self):
+        """Vide le cache de résultats du processus et remet les compteurs à zéro."""
+        _RESULT_CACHE.clear()
+        return True
+
+    def _compute_availability(self, room_type_id, checkin_date, checkout_date,
+                              exclude_stay_id=None, buffer_hours=None, reservation_type_id=None):
+        """Évaluation complète (sans cache) d'une demande de disponibilité."""
         _logger.info(
             "[AVAILABILITY] Début vérification | type=%s | in=%s | out=%s",
             room_type_id, checkin_date, checkout_date
@@ -56,8 +125,29 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         if not validation_result['valid']:
             return validation_result
 
-        # 2- Récupérer toutes les chambres du type demandé
-        rooms = self._get_rooms_by_type(room_type_id)
+        # Calculer le buffer
+        buffer_duration = timedelta(hours=buffer_hours) if buffer_hours else timedelta(0)
+        _logger.debug("[AVAILABILITY] Buffer appliqué : %s", buffer_duration)
+
+        # 2- Backend grille (optionnel) : réponse positive sans requête sur les séjours
+        room = self._grid_find_free_room(
+            room_type_id, checkin_date, checkout_date, buffer_duration, exclude_stay_id
+        )
+        if room:
+            _logger.info(
+                "[AVAILABILITY] ✅ Chambre trouvée (grille) | room_id=%s | num=%s",
+                room.id, room.name
+            )
+            return self._build_available_response(room)
+
+        # 3- Chambres candidates, chambres libres, séjours de la fenêtre
+        #    et libérations : un seul aller-retour SQL
+        snapshot = self._fetch_availability_snapshot(
+            room_type_id, checkin_date, checkout_date,
+            buffer_duration, exclude_stay_id
+        )
+        rooms = snapshot['rooms']
+        index = snapshot['index']
         
         if not rooms:
             return self._build_unavailable_response(
@@ -66,27 +156,24 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
                 reason='no_rooms'
             )
 
-        # Calculer le buffer
-        buffer_duration = timedelta(hours=buffer_hours) if buffer_hours else timedelta(0)
-        _logger.debug("[AVAILABILITY] Buffer appliqué : %s", buffer_duration)
+        # Première chambre libre (dans l'ordre du moteur)
+        free_rooms = rooms.filtered(lambda r: r.id in snapshot['free_room_ids'])
+        if free_rooms:
+            room = free_rooms[0]
+            _logger.info(
+                "[AVAILABILITY] ✅ Chambre trouvée | room_id=%s | num=%s",
+                room.id, room.name
+            )
+            return self._build_available_response(room)
 
-        # Parcourir les chambres pour trouver une disponible
+        # Aucune chambre libre : détail des conflits depuis l'index déjà chargé
         conflict_details = []
         for room in rooms:
             is_available, conflicts = self._check_room_availability(
                 room, checkin_date, checkout_date, 
-                buffer_duration, exclude_stay_id
+                buffer_duration, exclude_stay_id, index=index
             )
-            
-            if is_available:
-                _logger.info(
-                    "[AVAILABILITY] ✅ Chambre trouvée | room_id=%s | num=%s",
-                    room.id, room.name
-                )
-                return self._build_available_response(room)
-            else:
-                # Enregistrer les conflits pour analyse
-                conflict_details.extend(conflicts)
+            conflict_details.extend(conflicts)
 
         # Aucune chambre disponible : analyser les conflits et chercher alternatives
         _logger.warning(
@@ -96,14 +183,15 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         
         # Trouver la chambre qui se libère le plus tôt
         earliest_liberation = self._find_earliest_liberation(
-            rooms, checkin_date, checkout_date, buffer_duration, exclude_stay_id
+            rooms, checkin_date, checkout_date, buffer_duration, exclude_stay_id,
+            index=index, releases=snapshot['releases']
         )
         
         # Générer des alternatives basées sur les libérations
         alternatives = self._generate_smart_alternatives(
             rooms, checkin_date, checkout_date, 
             buffer_duration, reservation_type_id,
-            earliest_liberation
+            earliest_liberation, index=index
         )
         
         return self._build_unavailable_response(
@@ -119,6 +207,218 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         )
 
 
+    @api.model
+    @instrument()
+    def check_availability_batch(self, requests):
+        """
+        Vérifie la disponibilité de plusieurs demandes en un seul appel
+        (réservations de groupe, application de réception).
+
+        Les chambres et séjours de tous les types concernés sont chargés une
+        seule fois ; chaque chambre attribuée est réservée provisoirement dans
+        l'index, de sorte qu'une même chambre n'est jamais donnée à deux
+        demandes qui se chevauchent.
+
+        :param requests: liste de dicts avec les clés de check_availability
+            (room_type_id, checkin_date, checkout_date, et optionnellement
+            exclude_stay_id, buffer_hours, reservation_type_id) ; ``room_id``
+            optionnel impose la chambre à vérifier. ``exclude_stay_id`` ne
+            s'applique qu'à sa propre demande.
+        :return: liste de résultats (même format que check_availability),
+                 dans l'ordre des demandes
+        """
+        self.env["ir.config_parameter"]._sync_hotel_instrumentation()
+        _logger.info("[AVAILABILITY/BATCH] Début vérification | %d demande(s)", len(requests))
+
+        results = [None] * len(requests)
+        pending = []
+        now = datetime.now()
+        for position, request in enumerate(requests):
+            validation_result = self._validate_inputs(
+                request.get('room_type_id'),
+                request.get('checkin_date'),
+                request.get('checkout_date'),
+            )
+            if not validation_result['valid']:
+                results[position] = validation_result
+                continue
+            buffer_hours = request.get('buffer_hours')
+            buffer_duration = timedelta(hours=buffer_hours) if buffer_hours else timedelta(0)
+            pending.append((position, request, buffer_duration))
+
+        if not pending:
+            return results
+
+        # Fenêtre commune : conflits et alternatives de toutes les demandes
+        window_start = min(
+            min(req['checkin_date'] - 2 * buf, max(req['checkin_date'], now))
+            for _pos, req, buf in pending
+        )
+        window_end = max(
+            max(req['checkout_date'] + 2 * buf,
+                req['checkout_date'] + timedelta(days=ALTERNATIVES_WINDOW_DAYS))
+            for _pos, req, buf in pending
+        )
+        rooms_by_type, index = self._fetch_rooms_and_stays(
+            {req['room_type_id'] for _pos, req, _buf in pending},
+            window_start, window_end
+        )
+
+        for position, request, buffer_duration in pending:
+            # Séjour modifié : retiré de l'index le temps de sa seule demande
+            excluded = index.remove(request['exclude_stay_id']) \
+                if request.get('exclude_stay_id') else None
+            try:
+                results[position] = self._batch_request_result(
+                    position, request, buffer_duration, rooms_by_type, index
+                )
+            finally:
+                if excluded:
+                    index.add(excluded)
+
+        _logger.info(
+            "[AVAILABILITY/BATCH] Fin | %d/%d demande(s) satisfaite(s)",
+            sum(1 for r in results if r.get('status') == 'available'), len(requests)
+        )
+        return results
+
+    def _batch_request_result(self, position, request, buffer_duration, rooms_by_type, index):
+        """Résultat d'une demande du lot, sur l'index partagé par le lot."""
+        Room = self.env['hotel.room']
+        room_type_id = request['room_type_id']
+        checkin_date = request['checkin_date']
+        checkout_date = request['checkout_date']
+        room_ids = rooms_by_type.get(room_type_id, [])
+
+        if request.get('room_id'):
+            # Chambre imposée : seule elle est vérifiée
+            if request['room_id'] not in room_ids:
+                return self._build_unavailable_response(
+                    message=_("La chambre demandée n'est pas disponible à la vente "
+                             "pour ce type de chambre."),
+                    alternatives=[],
+                    reason='room_unavailable'
+                )
+            room_ids = [request['room_id']]
+        rooms = Room.browse(room_ids)
+
+        if not rooms:
+            return self._build_unavailable_response(
+                message=_("Aucune chambre de ce type n'existe dans le système."),
+                alternatives=[],
+                reason='no_rooms'
+            )
+
+        room_id = index.first_free(
+            rooms.ids,
+            checkin_date - 2 * buffer_duration,
+            checkout_date + 2 * buffer_duration,
+        )
+        if room_id:
+            # Réservation provisoire : la chambre n'est plus libre pour la suite du lot
+            index.add(StayInterval(-(position + 1), room_id, checkin_date, checkout_date, None))
+            return self._build_available_response(Room.browse(room_id))
+
+        conflict_details = []
+        for room in rooms:
+            conflict_details.extend(self._check_room_availability(
+                room, checkin_date, checkout_date,
+                buffer_duration, index=index
+            )[1])
+
+        earliest_liberation = self._find_earliest_liberation(
+            rooms, checkin_date, checkout_date, buffer_duration, index=index
+        )
+        alternatives = self._generate_smart_alternatives(
+            rooms, checkin_date, checkout_date,
+            buffer_duration, request.get('reservation_type_id'),
+            earliest_liberation, index=index
+        )
+        return self._build_unavailable_response(
+            message=_("Toutes les chambres de type '%s' sont occupées du %s au %s. "
+                     "Chevauchement détecté avec des réservations existantes.") % (
+                self.env['hotel.room.type'].browse(room_type_id).name,
+                checkin_date.strftime('%d/%m/%Y %H:%M'),
+                checkout_date.strftime('%d/%m/%Y %H:%M')
+            ),
+            alternatives=alternatives,
+            reason='overlap_conflict',
+            conflict_details=conflict_details
+        )
+
+    @api.model
+    def rebuild_occupancy_grid(self, room_type_ids=None):
+        """
+        Reconstruit depuis la base les grilles d'occupation du processus.
+
+        :param room_type_ids: types à reconstruire (tous les types actifs si vide)
+        :return: dict {success, message, data: {room_type_id: nb chambres}}
+        """
+        if not room_type_ids:
+            room_type_ids = self.env['hotel.room.type'].search([]).ids
+        GRIDS.drop(self.env.cr.dbname, set(room_type_ids))
+        built = {}
+        for room_type_id in room_type_ids:
+            grid = self._build_occupancy_grid(room_type_id)
+            built[room_type_id] = len(grid.room_ids)
+        _logger.info("[GRID] %d grille(s) reconstruite(s)", len(built))
+        return {
+            'success': True,
+            'message': _("%s grille(s) d'occupation reconstruite(s)") % len(built),
+            'data': built,
+        }
+
+    @api.model
+    def get_free_room_counts(self, room_type_id, start, end):
+        """
+        Nombre de chambres libres du type à chaque créneau de la grille sur
+        [start, end) (buffer de nettoyage compris).
+
+        :return: liste de dicts {'slot_start', 'free_rooms'} ; vide si la période
+                 sort de l'horizon de la grille
+        """
+        grid = self._get_occupancy_grid(
+            room_type_id, timedelta(hours=CLEANING_BUFFER_HOURS), force=True
+        )
+        if not grid or not grid.covers(start, end):
+            return []
+        return [
+            {'slot_start': slot_start, 'free_rooms': free_rooms}
+            for slot_start, free_rooms in grid.free_counts(start, end)
+        ]
+
+    def _has_pending_availability_change(self, room_type_id):
+        """True si la transaction courante a modifié la disponibilité du type."""
+        dirty = self.env.cr.postcommit.data.get('hotel.availability.dirty_types', ())
+        return room_type_id in dirty
+
+    def _availability_cache_key(self, room_type_id, checkin_date, checkout_date,
+                                exclude_stay_id, buffer_hours, reservation_type_id):
+        """
+        Clé du cache de résultats, ou None si la demande ne doit pas être mise
+        en cache : entrées non normalisables, ou type dont des séjours ont été
+        modifiés dans la transaction courante (génération non encore commitée).
+        """
+        if not isinstance(room_type_id, int) or not isinstance(checkin_date, datetime) \
+                or not isinstance(checkout_date, datetime):
+            return None
+        if self._has_pending_availability_change(room_type_id):
+            return None
+        room_type = self.env['hotel.room.type'].browse(room_type_id).exists()
+        if not room_type:
+            return None
+        return (
+            self.env.cr.dbname,
+            room_type_id,
+            checkin_date,
+            checkout_date,
+            exclude_stay_id or None,
+            float(buffer_hours or 0.0),
+            reservation_type_id or None,
+            self.env.lang,
+            room_type.availability_generation,
+        )
+
     # ==================== MÉTHODES PRIVÉES - VALIDATION ====================
 
    
@@ -220,14 +520,251 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
             ('status', 'not in', ['out_of_order', 'maintenance'])
         ], order='name')
 
+    def _load_room_index(self, rooms, exclude_stay_id=None):
+        """
+        Construit l'index d'intervalles des séjours actifs des chambres données,
+        à partir d'une seule requête groupée (au lieu d'une recherche par chambre).
+
+        L'index est reconstruit à chaque appel du moteur : il reflète donc
+        toujours les séjours créés, modifiés ou annulés dans la transaction.
+
+        :return: RoomIntervalIndex
+        """
+        if not rooms:
+            return RoomIntervalIndex()
+
+        domain = [
+            ('room_id', 'in', rooms.ids),
+            ('state', 'in', ACTIVE_STAY_STATES),
+            ('actual_checkin_date', '!=', False),
+            ('actual_checkout_date', '!=', False),
+        ]
+        if exclude_stay_id:
+            domain.append(('id', '!=', exclude_stay_id))
+
+        rows = self.env['hotel.booking.stay'].search_read(
+            domain,
+            ['room_id', 'actual_checkin_date', 'actual_checkout_date', 'booking_id'],
+        )
+        index = RoomIntervalIndex(
+            StayInterval(
+                id=row['id'],
+                room_id=row['room_id'][0],
+                actual_checkin_date=row['actual_checkin_date'],
+                actual_checkout_date=row['actual_checkout_date'],
+                booking_ref=row['booking_id'][1] if row['booking_id'] else None,
+            )
+            for row in rows
+        )
+        _logger.debug(
+            "[INDEX] %d séjour(s) indexé(s) pour %d chambre(s)", len(rows), len(rooms)
+        )
+        return index
+
+    def _fetch_availability_snapshot(self, room_type_id, checkin_date, checkout_date,
+                                     buffer_duration, exclude_stay_id=None):
+        """
+        Récupère en UN SEUL aller-retour SQL tout ce dont le moteur a besoin :
+        - les chambres candidates du type, dans l'ordre de _get_rooms_by_type
+        - pour chacune, si elle est libre (NOT EXISTS sur l'intervalle bufferisé)
+        - les séjours actifs de la fenêtre d'alternatives (pour l'index)
+        - le séjour qui libère chaque chambre le plus tôt après le check-in
+
+        :return: dict avec rooms (recordset ordonné), free_room_ids (set),
+                 index (RoomIntervalIndex) et releases ({room_id: StayInterval})
+        """
+        rooms_query = self.env['hotel.room']._search([
+            ('room_type_id', '=', room_type_id),
+            ('active', '=', True),
+            ('status', 'not in', ['out_of_order', 'maintenance'])
+        ], order='name')
+
+        # Demande et séjours sont élargis du buffer : un séjour brut est en
+        # conflit s'il chevauche la demande élargie de 2 buffers.
+        conflict_start = checkin_date - 2 * buffer_duration
+        conflict_end = checkout_date + 2 * buffer_duration
+        # Fenêtre couvrant à la fois les conflits et la recherche d'alternatives
+        window_start = min(conflict_start, max(checkin_date, datetime.now()))
+        window_end = max(conflict_end, checkout_date + timedelta(days=ALTERNATIVES_WINDOW_DAYS))
+
+        states = tuple(ACTIVE_STAY_STATES)
+        exclude_id = exclude_stay_id or 0
+
+        self.env['hotel.booking.stay'].flush_model([
+            'room_id', 'state', 'actual_checkin_date', 'actual_checkout_date', 'booking_id'
+        ])
+        self.env.cr.execute(SQL(
+            """
+            WITH candidate AS (
+                SELECT c.room_id, c.seq
+                  FROM unnest(ARRAY(%(rooms)s)) WITH ORDINALITY AS c(room_id, seq)
+            )
+            SELECT c.room_id,
+                   NOT EXISTS (
+                       SELECT 1
+                         FROM hotel_booking_stay b
+                        WHERE b.room_id = c.room_id
+                          AND b.state IN %(states)s
+                          AND b.id != %(exclude_id)s
+                          AND %(overlap)s
+                   ) AS is_free,
+                   rel.id AS release_id,
+                   rel.actual_checkin_date AS release_checkin,
+                   rel.actual_checkout_date AS release_checkout,
+                   s.id AS stay_id,
+                   s.actual_checkin_date,
+                   s.actual_checkout_date,
+                   bk.name AS booking_ref
+              FROM candidate c
+              LEFT JOIN LATERAL (
+                   SELECT b.id, b.actual_checkin_date, b.actual_checkout_date
+                     FROM hotel_booking_stay b
+                    WHERE b.room_id = c.room_id
+                      AND b.state IN %(states)s
+                      AND b.id != %(exclude_id)s
+                      AND b.actual_checkin_date IS NOT NULL
+                      AND b.actual_checkout_date > %(checkin)s
+                    ORDER BY b.actual_checkout_date
+                    LIMIT 1
+              ) rel ON TRUE
+              LEFT JOIN hotel_booking_stay s
+                     ON s.room_id = c.room_id
+                    AND s.state IN %(states)s
+                    AND s.id != %(exclude_id)s
+                    AND s.actual_checkin_date < %(window_end)s
+                    AND s.actual_checkout_date > %(window_start)s
+              LEFT JOIN room_booking bk ON bk.id = s.booking_id
+             ORDER BY c.seq, s.actual_checkin_date, s.id
+            """,
+            rooms=rooms_query.select(),
+            states=states,
+            exclude_id=exclude_id,
+            overlap=self._stay_overlap_sql('b', checkin_date, checkout_date, buffer_duration),
+            checkin=checkin_date,
+            window_start=window_start,
+            window_end=window_end,
+        ))
+
+        room_ids = []
+        free_room_ids = set()
+        releases = {}
+        stays = []
+        for (room_id, is_free, release_id, release_in, release_out,
+             stay_id, stay_in, stay_out, booking_ref) in self.env.cr.fetchall():
+            if room_id not in releases:
+                room_ids.append(room_id)
+                releases[room_id] = release_id and StayInterval(
+                    release_id, room_id, release_in, release_out, None
+                )
+                if is_free:
+                    free_room_ids.add(room_id)
+            if stay_id:
+                stays.append(StayInterval(stay_id, room_id, stay_in, stay_out, booking_ref))
+
+        _logger.debug(
+            "[SNAPSHOT] type=%s | %d chambre(s) | %d libre(s) | %d séjour(s) dans la fenêtre",
+            room_type_id, len(room_ids), len(free_room_ids), len(stays)
+        )
+        return {
+            'rooms': self.env['hotel.room'].browse(room_ids),
+            'free_room_ids': free_room_ids,
+            'index': RoomIntervalIndex(stays),
+            'releases': releases,
+        }
+
+    def _fetch_rooms_and_stays(self, room_type_ids, window_start, window_end,
+                               exclude_stay_ids=()):
+        """
+        Charge en un aller-retour SQL les chambres candidates de plusieurs types
+        et leurs séjours actifs sur la fenêtre donnée.
+
+        :return: tuple ({room_type_id: [room_id, ...] dans l'ordre du moteur},
+                        RoomIntervalIndex des séjours de la fenêtre)
+        """
+        rooms_query = self.env['hotel.room']._search([
+            ('room_type_id', 'in', list(room_type_ids)),
+            ('active', '=', True),
+            ('status', 'not in', ['out_of_order', 'maintenance'])
+        ], order='name')
+
+        self.env['hotel.booking.stay'].flush_model([
+            'room_id', 'state', 'actual_checkin_date', 'actual_checkout_date', 'booking_id'
+        ])
+        self.env.cr.execute(SQL(
+            """
+            WITH candidate AS (
+                SELECT c.room_id, c.seq
+                  FROM unnest(ARRAY(%(rooms)s)) WITH ORDINALITY AS c(room_id, seq)
+            )
+            SELECT c.room_id,
+                   r.room_type_id,
+                   s.id AS stay_id,
+                   s.actual_checkin_date,
+                   s.actual_checkout_date,
+                   bk.name AS booking_ref
+              FROM candidate c
+              JOIN hotel_room r ON r.id = c.room_id
+              LEFT JOIN hotel_booking_stay s
+                     ON s.room_id = c.room_id
+                    AND s.state IN %(states)s
+                    AND s.id != ALL(%(exclude_ids)s)
+                    AND s.actual_checkin_date < %(window_end)s
+                    AND s.actual_checkout_date > %(window_start)s
+              LEFT JOIN room_booking bk ON bk.id = s.booking_id
+             ORDER BY c.seq, s.actual_checkin_date, s.id
+            """,
+            rooms=rooms_query.select(),
+            states=tuple(ACTIVE_STAY_STATES),
+            exclude_ids=list(exclude_stay_ids) or [0],
+            window_start=window_start,
+            window_end=window_end,
+        ))
+
+        rooms_by_type = {}
+        seen = set()
+        stays = []
+        for room_id, room_type_id, stay_id, stay_in, stay_out, booking_ref in self.env.cr.fetchall():
+            if room_id not in seen:
+                seen.add(room_id)
+                rooms_by_type.setdefault(room_type_id, []).append(room_id)
+            if stay_id:
+                stays.append(StayInterval(stay_id, room_id, stay_in, stay_out, booking_ref))
+
+        _logger.debug(
+            "[SNAPSHOT/BATCH] %d type(s) | %d chambre(s) | %d séjour(s) dans la fenêtre",
+            len(rooms_by_type), len(seen), len(stays)
+        )
+        return rooms_by_type, RoomIntervalIndex(stays)
+
+    def _stay_overlap_sql(self, alias, checkin_date, checkout_date, buffer_duration):
+        """
+        Prédicat SQL : le séjour ``alias`` chevauche la demande bufferisée.
+
+        Avec le buffer de nettoyage standard, on compare directement la colonne
+        tsrange occupancy_period (déjà élargie du buffer) : la recherche devient
+        un parcours de l'index GiST. Sinon, comparaison classique des dates.
+        """
+        table = SQL.identifier(alias)
+        if buffer_duration == timedelta(hours=CLEANING_BUFFER_HOURS):
+            return SQL(
+                "%s.occupancy_period && tsrange(%s, %s, '[)')",
+                table, checkin_date - buffer_duration, checkout_date + buffer_duration,
+            )
+        return SQL(
+            "(%s.actual_checkin_date < %s AND %s.actual_checkout_date > %s)",
+            table, checkout_date + 2 * buffer_duration,
+            table, checkin_date - 2 * buffer_duration,
+        )
+
     # ==================== MÉTHODES PRIVÉES - LOGIQUE DISPONIBILITÉ ====================
 
     def _check_room_availability(self, room, checkin_date, checkout_date, 
-                                 buffer_duration, exclude_stay_id=None):
+                                 buffer_duration, exclude_stay_id=None, index=None):
         """
         Vérifie si une chambre est disponible pour la période demandée.
         RÈGLE: Refus en cas de chevauchement partiel ou total
         
+        :param index: RoomIntervalIndex pré-chargé (sinon chargé pour cette chambre)
         :return: tuple (is_available, conflicts_list)
         """
         _logger.debug(
@@ -235,58 +772,40 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
             room.name, checkin_date, checkout_date, buffer_duration
         )
 
-        domain = [
-            ('room_id', '=', room.id),
-            ('state', 'in', ['pending', 'ongoing']),
-        ]
-        if exclude_stay_id:
-            domain.append(('id', '!=', exclude_stay_id))
-        
-        existing_stays = self.env['hotel.booking.stay'].search(domain, order='actual_checkin_date')
+        if index is None:
+            index = self._load_room_index(room, exclude_stay_id)
 
-        requested_start_buffered = checkin_date - buffer_duration
-        requested_end_buffered = checkout_date + buffer_duration
+        # Demande et séjours sont tous deux élargis du buffer : un séjour brut
+        # [in, out) est en conflit s'il chevauche la demande élargie de 2 buffers.
+        overlapping_stays = index.overlapping(
+            room.id,
+            checkin_date - 2 * buffer_duration,
+            checkout_date + 2 * buffer_duration,
+        )
 
         conflicts = []
-        for stay in existing_stays:
+        for stay in overlapping_stays:
             stay_start = stay.actual_checkin_date
             stay_end = stay.actual_checkout_date
+            overlap_type = self._determine_overlap_type(
+                checkin_date, checkout_date,
+                stay_start, stay_end
+            )
             
-            # ⚠️ Ignore les séjours sans dates définies
-            if not stay_start or not stay_end:
-                _logger.debug("[CHECK] ⚠️ Stay %s ignoré : dates incomplètes (start=%s, end=%s)", stay.id, stay_start, stay_end)
-                continue
-
-
-            stay_start_buffered = stay_start - buffer_duration
-            stay_end_buffered = stay_end + buffer_duration
-
-            # Vérification stricte du chevauchement (partiel ou total)
-            has_overlap = self._check_overlap(
-                requested_start_buffered, requested_end_buffered,
-                stay_start_buffered, stay_end_buffered
+            _logger.debug(
+                "[CHECK] ❌ CONFLIT %s | stay_id=%s | période=%s → %s",
+                overlap_type, stay.id, stay_start, stay_end
             )
-
-            if has_overlap:
-                overlap_type = self._determine_overlap_type(
-                    checkin_date, checkout_date,
-                    stay_start, stay_end
-                )
-                
-                _logger.debug(
-                    "[CHECK] ❌ CONFLIT %s | stay_id=%s | période=%s → %s",
-                    overlap_type, stay.id, stay_start, stay_end
-                )
-                
-                conflicts.append({
-                    'room_id': room.id,
-                    'room_name': room.name,
-                    'stay_id': stay.id,
-                    'checkin': stay_start,
-                    'checkout': stay_end,
-                    'overlap_type': overlap_type,
-                    'booking_ref': stay.booking_id.name if stay.booking_id else None
-                })
+            
+            conflicts.append({
+                'room_id': room.id,
+                'room_name': room.name,
+                'stay_id': stay.id,
+                'checkin': stay_start,
+                'checkout': stay_end,
+                'overlap_type': overlap_type,
+                'booking_ref': stay.booking_ref
+            })
 
         if conflicts:
             _logger.debug("[CHECK] ❌ Chambre %s INDISPONIBLE - %d conflit(s)", room.name, len(conflicts))
@@ -320,40 +839,37 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
     # ==================== MÉTHODES PRIVÉES - ANALYSE CONFLITS ====================
 
     def _find_earliest_liberation(self, rooms, requested_checkin, requested_checkout, 
-                                   buffer_duration, exclude_stay_id=None):
+                                   buffer_duration, exclude_stay_id=None, index=None,
+                                   releases=None):
         """
         Trouve la chambre qui se libère le plus tôt après le checkin demandé.
         Utile pour proposer des alternatives intelligentes.
         
+        :param index: RoomIntervalIndex pré-chargé (sinon chargé pour ces chambres)
+        :param releases: {room_id: séjour bloquant} déjà calculé par le snapshot SQL
         :return: dict avec room_id, liberation_date, next_available_start
         """
         earliest = None
+
+        if releases is None and index is None:
+            index = self._load_room_index(rooms, exclude_stay_id)
         
         for room in rooms:
-            domain = [
-                ('room_id', '=', room.id),
-                ('state', 'in', ['pending', 'ongoing']),
-                ('actual_checkout_date', '>', requested_checkin)
-            ]
-            if exclude_stay_id:
-                domain.append(('id', '!=', exclude_stay_id))
-            
-            # Trouver les séjours qui bloquent la période demandée
-            blocking_stays = self.env['hotel.booking.stay'].search(
-                domain, 
-                order='actual_checkout_date',
-                limit=1
-            )
+            # Trouver le séjour qui bloque la période demandée
+            if releases is not None:
+                blocking_stay = releases.get(room.id)
+            else:
+                blocking_stay = index.next_release(room.id, requested_checkin)
             
-            if blocking_stays:
-                liberation_date = blocking_stays[0].actual_checkout_date + buffer_duration
+            if blocking_stay:
+                liberation_date = blocking_stay.actual_checkout_date + buffer_duration
                 
                 if not earliest or liberation_date < earliest['liberation_date']:
                     earliest = {
                         'room_id': room.id,
                         'room_name': room.name,
                         'liberation_date': liberation_date,
-                        'blocking_stay_id': blocking_stays[0].id
+                        'blocking_stay_id': blocking_stay.id
                     }
         
         if earliest:
@@ -369,7 +885,7 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
     
     def _generate_smart_alternatives(self, rooms, requested_checkin, requested_checkout,
                                  buffer_duration, reservation_type_id, 
-                                 earliest_liberation, max_alternatives=3):
+                                 earliest_liberation, max_alternatives=3, index=None):
         """
         Génère des alternatives STRICTES basées sur:
         1. Créneaux COMPLÈTEMENT libres (aucun chevauchement)
@@ -382,9 +898,13 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         - Vérifie que TOUT le créneau est libre (pas de chevauchement partiel)
         - Respecte OBLIGATOIREMENT les horaires autorisés
         
+        :param index: RoomIntervalIndex pré-chargé (sinon chargé pour ces chambres)
         :return: liste limitée à max_alternatives (3 par défaut)
         """
         _logger.info("[ALTERNATIVES] Génération de %d alternatives STRICTES", max_alternatives)
+
+        if index is None:
+            index = self._load_room_index(rooms)
         
         now = datetime.now()
         requested_duration = requested_checkout - requested_checkin
@@ -403,29 +923,21 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         
         # Fenêtre de recherche élargie
         search_start = max(requested_checkin, now)
-        search_end = requested_checkout + timedelta(days=30)  # 30 jours de recherche
-        
+        search_end = requested_checkout + timedelta(days=ALTERNATIVES_WINDOW_DAYS)
+        
+        # Créneaux libres de toutes les chambres du type, calculés en bloc
+        slots_by_room = GapEngine.from_index(
+            index, rooms.ids, search_start, search_end
+        ).free_slots(
+            rooms.ids, max(search_start, now), search_end,
+            requested_duration, buffer_duration, valid_time_slots
+        )
+
         for room in rooms:
             if len(alternatives) >= max_alternatives:
                 break
-            
-            _logger.debug("[ALTERNATIVES] Analyse chambre %s", room.name)
-            
-            # Récupérer TOUS les séjours pour cette chambre dans la fenêtre
-            stays = self.env['hotel.booking.stay'].search([
-                ('room_id', '=', room.id),
-                ('state', 'in', ['pending', 'ongoing']),
-                ('actual_checkin_date', '<', search_end),
-                ('actual_checkout_date', '>', search_start)
-            ], order='actual_checkin_date')
-            
-            # Extraire les créneaux STRICTEMENT libres
-            free_slots = self._extract_complete_free_slots_strict(
-                room, stays, search_start, search_end,
-                requested_duration, buffer_duration,
-                valid_time_slots, now
-            )
-            
+
+            free_slots = slots_by_room[room.id]
             _logger.debug("[ALTERNATIVES] %d créneaux libres trouvés pour chambre %s", 
                         len(free_slots), room.name)
             
@@ -456,237 +968,6 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         return alternatives[:max_alternatives]
     
 
-    def _extract_complete_free_slots_strict(self, room, stays, window_start, window_end,
-                                        requested_duration, buffer_duration,
-                                        valid_time_slots, now):
-        """
-        Extrait UNIQUEMENT les créneaux STRICTEMENT libres:
-        - Aucun chevauchement avec aucune réservation
-        - Durée ÉGALE à la demande (tolérance 1h)
-        - Respecte les créneaux horaires si définis
-        - Date de début >= aujourd'hui
-        
-        NOUVELLE LOGIQUE:
-        1. Trouve tous les gaps entre réservations
-        2. Pour chaque gap, génère des créneaux possibles selon les horaires valides
-        3. Vérifie que TOUT le créneau est libre (réservations + buffer)
-        4. Ne retourne que les créneaux de durée appropriée
-        
-        :return: liste de dicts {'start', 'end', 'gap_size', 'matches_duration'}
-        """
-        free_slots = []
-        
-        # Ajuster le début de fenêtre si nécessaire
-        window_start = max(window_start, now)
-        
-        if not stays:
-            # Pas de réservation : toute la fenêtre est disponible
-            _logger.debug("[FREE SLOTS] Aucune réservation, fenêtre entière disponible")
-            slots = self._generate_slots_in_gap(
-                window_start, window_end, requested_duration, 
-                valid_time_slots, buffer_duration
-            )
-            return slots
-        
-        # Analyser les gaps entre réservations
-        gaps = []
-        
-        # Gap avant la première réservation
-        first_stay = stays[0]
-        first_start_buffered = first_stay.actual_checkin_date - buffer_duration
-        
-        if window_start < first_start_buffered:
-            gap_duration = first_start_buffered - window_start
-            if gap_duration >= requested_duration:
-                gaps.append({
-                    'start': window_start,
-                    'end': first_start_buffered,
-                    'duration': gap_duration
-                })
-                _logger.debug(
-                    "[FREE SLOTS] Gap avant 1ère résa: %s → %s (%.1fh)",
-                    window_start.strftime('%d/%m %H:%M'),
-                    first_start_buffered.strftime('%d/%m %H:%M'),
-                    gap_duration.total_seconds() / 3600
-                )
-        
-        # Gaps entre les réservations
-        for i in range(len(stays) - 1):
-            current_stay = stays[i]
-            next_stay = stays[i + 1]
-            
-            gap_start = current_stay.actual_checkout_date + buffer_duration
-            gap_end = next_stay.actual_checkin_date - buffer_duration
-            
-            if gap_end > gap_start:
-                gap_duration = gap_end - gap_start
-                if gap_duration >= requested_duration:
-                    gaps.append({
-                        'start': gap_start,
-                        'end': gap_end,
-                        'duration': gap_duration
-                    })
-                    _logger.debug(
-                        "[FREE SLOTS] Gap entre résas: %s → %s (%.1fh)",
-                        gap_start.strftime('%d/%m %H:%M'),
-                        gap_end.strftime('%d/%m %H:%M'),
-                        gap_duration.total_seconds() / 3600
-                    )
-        
-        # Gap après la dernière réservation
-        last_stay = stays[-1]
-        last_end_buffered = last_stay.actual_checkout_date + buffer_duration
-        
-        if window_end > last_end_buffered:
-            gap_duration = window_end - last_end_buffered
-            if gap_duration >= requested_duration:
-                gaps.append({
-                    'start': last_end_buffered,
-                    'end': window_end,
-                    'duration': gap_duration
-                })
-                _logger.debug(
-                    "[FREE SLOTS] Gap après dernière résa: %s → %s (%.1fh)",
-                    last_end_buffered.strftime('%d/%m %H:%M'),
-                    window_end.strftime('%d/%m %H:%M'),
-                    gap_duration.total_seconds() / 3600
-                )
-        
-        # Pour chaque gap, générer des créneaux respectant les horaires
-        for gap in gaps:
-            slots = self._generate_slots_in_gap(
-                gap['start'], gap['end'], requested_duration,
-                valid_time_slots, buffer_duration
-            )
-            
-            # Vérifier que chaque slot généré ne chevauche AUCUNE réservation
-            for slot in slots:
-                if self._verify_slot_is_completely_free(
-                    room, slot['start'], slot['end'], 
-                    buffer_duration, stays
-                ):
-                    free_slots.append(slot)
-                    _logger.debug(
-                        "[FREE SLOTS] ✅ Slot validé: %s → %s",
-                        slot['start'].strftime('%d/%m %H:%M'),
-                        slot['end'].strftime('%d/%m %H:%M')
-                    )
-                else:
-                    _logger.debug(
-                        "[FREE SLOTS] ❌ Slot rejeté (chevauchement): %s → %s",
-                        slot['start'].strftime('%d/%m %H:%M'),
-                        slot['end'].strftime('%d/%m %H:%M')
-                    )
-        
-        return free_slots
-
-    
-
-    def _generate_slots_in_gap(self, gap_start, gap_end, requested_duration,
-                           valid_time_slots, buffer_duration):
-        """
-        Génère tous les créneaux possibles dans un gap en respectant:
-        - Les horaires valides (si définis)
-        - La durée demandée
-        - Aucun dépassement du gap
-        
-        :return: liste de créneaux possibles
-        """
-        slots = []
-        
-        if not valid_time_slots:
-            # Pas de contrainte horaire : créneau simple au début du gap
-            slot_end = gap_start + requested_duration
-            if slot_end <= gap_end:
-                slots.append({
-                    'start': gap_start,
-                    'end': slot_end,
-                    'gap_size': gap_end - gap_start,
-                    'matches_duration': True
-                })
-            return slots
-        
-        # Avec contraintes horaires : générer un créneau par jour du gap
-        current_date = gap_start.date()
-        gap_end_date = gap_end.date()
-        
-        while current_date <= gap_end_date:
-            for time_slot in valid_time_slots:
-                # Créer le début du créneau avec l'horaire valide
-                slot_start = datetime.combine(current_date, time_slot['checkin_time'])
-                
-                # S'assurer que le début est dans le gap
-                if slot_start < gap_start:
-                    slot_start = gap_start
-                
-                # Calculer la fin
-                slot_end = slot_start + requested_duration
-                
-                # Vérifier que le créneau tient dans le gap
-                if slot_end <= gap_end and slot_start >= gap_start:
-                    # Vérifier que l'horaire de fin respecte aussi les contraintes
-                    if self._is_valid_checkout_time(slot_end, time_slot['checkout_time']):
-                        slots.append({
-                            'start': slot_start,
-                            'end': slot_end,
-                            'gap_size': gap_end - gap_start,
-                            'matches_duration': True
-                        })
-            
-            current_date += timedelta(days=1)
-        
-        return slots
-
-
-    def _is_valid_checkout_time(self, checkout_datetime, valid_checkout_time):
-        """
-        Vérifie si l'heure de checkout est valide.
-        Autorise un checkout à n'importe quelle heure si elle est avant ou égale à l'heure valide.
-        """
-        checkout_time = checkout_datetime.time()
-        
-        # Convertir en minutes pour comparaison
-        checkout_minutes = checkout_time.hour * 60 + checkout_time.minute
-        valid_minutes = valid_checkout_time.hour * 60 + valid_checkout_time.minute
-        
-        # Tolérance de 1 heure
-        return abs(checkout_minutes - valid_minutes) <= 60
-
-
-    def _verify_slot_is_completely_free(self, room, slot_start, slot_end,
-                                        buffer_duration, stays):
-        """
-        Vérifie qu'un créneau est COMPLÈTEMENT libre (aucun chevauchement).
-        
-        VÉRIFICATION STRICTE:
-        - Le créneau + buffer ne doit chevaucher AUCUNE réservation + buffer
-        
-        :return: True si complètement libre, False sinon
-        """
-        slot_start_buffered = slot_start - buffer_duration
-        slot_end_buffered = slot_end + buffer_duration
-        
-        for stay in stays:
-            stay_start_buffered = stay.actual_checkin_date - buffer_duration
-            stay_end_buffered = stay.actual_checkout_date + buffer_duration
-            
-            # Vérifier le chevauchement
-            if self._check_overlap(
-                slot_start_buffered, slot_end_buffered,
-                stay_start_buffered, stay_end_buffered
-            ):
-                _logger.debug(
-                    "[VERIFY] ❌ Chevauchement détecté avec stay_id=%s (%s → %s)",
-                    stay.id,
-                    stay.actual_checkin_date.strftime('%d/%m %H:%M'),
-                    stay.actual_checkout_date.strftime('%d/%m %H:%M')
-                )
-                return False
-        
-        return True
-
-
-
     def _create_alternative_slot_strict(self, room, start, end, requested_duration,
                                     valid_time_slots, now):
         """
@@ -855,6 +1136,80 @@ class HotelRoomAvailabilityEngine(models.AbstractModel):
         # Aucun créneau horaire valide ne convient
         return None, None
 
+    # ==================== MÉTHODES PRIVÉES - GRILLE D'OCCUPATION ====================
+
+    def _grid_enabled(self):
+        return self.env['ir.config_parameter'].sudo().get_param(BACKEND_PARAM, 'sql') == 'grid'
+
+    def _get_occupancy_grid(self, room_type_id, buffer_duration, force=False):
+        """
+        Grille du type, reconstruite si sa génération ou son horizon est périmé.
+
+        Retourne None (repli sur le SQL) si le backend n'est pas activé, si le
+        buffer demandé n'est pas celui de la grille, ou si la transaction
+        courante a déjà modifié des séjours de ce type (non encore commités).
+        """
+        if not force and not self._grid_enabled():
+            return None
+        if buffer_duration != timedelta(hours=CLEANING_BUFFER_HOURS):
+            return None
+        if self._has_pending_availability_change(room_type_id):
+            return None
+
+        grid = GRIDS.get(self.env.cr.dbname, room_type_id)
+        generation = self.env['hotel.room.type'].browse(room_type_id).availability_generation
+        if (grid is None or grid.generation != generation
+                or grid.horizon_start != horizon_start_for()):
+            grid = self._build_occupancy_grid(room_type_id)
+        return grid
+
+    def _build_occupancy_grid(self, room_type_id):
+        """Construit (et enregistre) la grille d'un type depuis la base."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        granularity = int(ICP.get_param(GRID_GRANULARITY_PARAM, 15))
+        horizon_days = int(ICP.get_param(GRID_HORIZON_PARAM, 90))
+        buffer_duration = timedelta(hours=CLEANING_BUFFER_HOURS)
+        horizon_start = horizon_start_for()
+        generation = self.env['hotel.room.type'].browse(room_type_id).availability_generation
+
+        rooms_by_type, index = self._fetch_rooms_and_stays(
+            {room_type_id},
+            horizon_start - buffer_duration,
+            horizon_start + timedelta(days=horizon_days) + buffer_duration,
+        )
+        room_ids = rooms_by_type.get(room_type_id, [])
+        grid = OccupancyGrid(
+            room_ids, horizon_start, horizon_days, granularity, buffer_duration, generation
+        )
+        for room_id in room_ids:
+            for stay in index.stays_for(room_id):
+                grid.add(room_id, stay.actual_checkin_date, stay.actual_checkout_date)
+
+        GRIDS.put(self.env.cr.dbname, room_type_id, grid)
+        _logger.debug(
+            "[GRID] Grille construite | type=%s | génération=%s | %d chambre(s) | %d créneaux",
+            room_type_id, generation, len(room_ids), grid.size
+        )
+        return grid
+
+    def _grid_find_free_room(self, room_type_id, checkin_date, checkout_date,
+                             buffer_duration, exclude_stay_id=None):
+        """
+        Chambre libre d'après la grille, ou vide si la grille n'est pas
+        utilisable ou ne trouve rien (le moteur SQL prend alors le relais pour
+        l'analyse des conflits et les alternatives).
+        """
+        grid = self._get_occupancy_grid(room_type_id, buffer_duration)
+        if not grid or not grid.covers(checkin_date - buffer_duration,
+                                       checkout_date + buffer_duration):
+            return self.env['hotel.room']
+
+        exclude = None
+        if exclude_stay_id:
+            exclude = self.env['hotel.booking.stay'].browse(exclude_stay_id)._availability_footprints()[0]
+        room_id = grid.first_free(grid.room_ids, checkin_date, checkout_date, exclude=exclude)
+        return self.env['hotel.room'].browse(room_id) if room_id else self.env['hotel.room']
+
     # ==================== MÉTHODES PRIVÉES - CONSTRUCTION RÉPONSES ====================
 
     def _build_available_response(self, room):
@@ -0,0 +1,219 @@
+"""
+Moteur de créneaux libres pour les alternatives de disponibilité.
+
+Les séjours de toutes les chambres sont stockés dans des tableaux triés
+(arrivées, maximum cumulé des départs) découpés par chambre. Les gaps sont
+calculés par différence entre départs et arrivées successives, puis les
+créneaux candidats (horaires valides, durée demandée) sont générés et filtrés
+en bloc, sans parcourir tous les séjours pour chaque créneau.
+
+NumPy est utilisé s'il est disponible ; sinon un calcul Python équivalent
+(par dichotomie) prend le relais.
+"""
+
+import bisect
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    np = None
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_DAY_US = 86400 * 1000000
+_MINUTE_US = 60 * 1000000
+# Tolérance sur l'heure de départ proposée par rapport à l'horaire valide
+_CHECKOUT_TOLERANCE_MINUTES = 60
+
+
+def _to_us(value):
+    """datetime naïf -> microsecondes depuis l'epoch (entier exact)."""
+    return (value - _EPOCH) // _US
+
+
+def _from_us(value):
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def _time_us(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
+
+
+class GapEngine:
+    """
+    Séjours de plusieurs chambres, en tableaux contigus (format CSR) :
+
+    - ``_starts``   : arrivées, triées par chambre
+    - ``_max_ends`` : maximum cumulé des départs, par chambre
+    - ``_bounds``   : room_id -> (début, fin) de la tranche de la chambre
+    """
+
+    def __init__(self, stays_by_room):
+        """
+        :param stays_by_room: {room_id: [(arrivée, départ), ...]} (datetimes naïfs)
+        """
+        self._bounds = {}
+        starts = []
+        max_ends = []
+        for room_id, intervals in stays_by_room.items():
+            offset = len(starts)
+            running = None
+            for stay_start, stay_end in sorted(intervals):
+                end_us = _to_us(stay_end)
+                running = end_us if running is None or end_us > running else running
+                starts.append(_to_us(stay_start))
+                max_ends.append(running)
+            self._bounds[room_id] = (offset, len(starts))
+
+        if np is not None:
+            self._starts = np.asarray(starts, dtype=np.int64)
+            self._max_ends = np.asarray(max_ends, dtype=np.int64)
+        else:
+            self._starts = starts
+            self._max_ends = max_ends
+
+    @classmethod
+    def from_index(cls, index, room_ids, window_start, window_end):
+        """Construit le moteur depuis un RoomIntervalIndex, limité à une fenêtre."""
+        return cls({
+            room_id: [
+                (stay.actual_checkin_date, stay.actual_checkout_date)
+                for stay in index.overlapping(room_id, window_start, window_end)
+            ]
+            for room_id in room_ids
+        })
+
+    # ==================== API ====================
+
+    def free_slots(self, room_ids, window_start, window_end, duration,
+                   buffer_duration, valid_time_slots=None):
+        """
+        Créneaux strictement libres de chaque chambre sur la fenêtre.
+
+        Un gap est l'espace entre deux séjours consécutifs, réduit du buffer de
+        chaque côté. Dans chaque gap, un créneau est proposé au début du gap
+        (sans contrainte horaire) ou à chaque horaire valide de chaque jour ;
+        il est retenu s'il tient dans le gap, si son heure de départ respecte
+        l'horaire (tolérance 1h) et si, buffers compris, il ne chevauche aucun
+        séjour.
+
+        :param valid_time_slots: liste de dicts {'checkin_time', 'checkout_time'}
+        :return: {room_id: [{'start', 'end', 'gap_size', 'matches_duration'}, ...]}
+                 dans l'ordre chronologique des gaps
+        """
+        window = (_to_us(window_start), _to_us(window_end))
+        duration_us = duration // _US
+        buffer_us = buffer_duration // _US
+        slot_times = [
+            (_time_us(slot['checkin_time']),
+             slot['checkout_time'].hour * 60 + slot['checkout_time'].minute)
+            for slot in valid_time_slots or []
+        ]
+        compute = self._free_slots_numpy if np is not None else self._free_slots_python
+
+        result = {}
+        for room_id in room_ids:
+            lo, hi = self._bounds.get(room_id, (0, 0))
+            result[room_id] = [
+                {
+                    'start': _from_us(start),
+                    'end': _from_us(end),
+                    'gap_size': timedelta(microseconds=int(gap_size)),
+                    'matches_duration': True,
+                }
+                for start, end, gap_size in compute(
+                    lo, hi, window, duration_us, buffer_us, slot_times
+                )
+            ]
+        return result
+
+    # ==================== CALCUL NUMPY ====================
+
+    def _free_slots_numpy(self, lo, hi, window, duration_us, buffer_us, slot_times):
+        window_start, window_end = window
+        starts = self._starts[lo:hi]
+        max_ends = self._max_ends[lo:hi]
+
+        # Gaps : [fin précédente + buffer, arrivée suivante - buffer]
+        gap_starts = np.concatenate(([window_start], max_ends + buffer_us))
+        gap_ends = np.concatenate((starts - buffer_us, [window_end]))
+        gap_sizes = gap_ends - gap_starts
+        keep = gap_sizes >= duration_us
+        gap_starts, gap_ends, gap_sizes = gap_starts[keep], gap_ends[keep], gap_sizes[keep]
+        if not gap_starts.size:
+            return []
+
+        if not slot_times:
+            slot_starts = gap_starts
+            slot_gap = np.arange(gap_starts.size)
+        else:
+            # Un candidat par (gap, jour du gap, horaire valide)
+            first_days = gap_starts // _DAY_US
+            day_counts = gap_ends // _DAY_US - first_days + 1
+            slot_gap = np.repeat(np.arange(gap_starts.size), day_counts)
+            day_offsets = np.arange(slot_gap.size) - np.repeat(
+                np.cumsum(day_counts) - day_counts, day_counts
+            )
+            days_us = (first_days[slot_gap] + day_offsets) * _DAY_US
+
+            checkin_us = np.array([checkin for checkin, _checkout in slot_times], dtype=np.int64)
+            checkout_minutes = np.array([checkout for _checkin, checkout in slot_times], dtype=np.int64)
+            candidates = np.maximum(days_us[:, None] + checkin_us[None, :],
+                                    gap_starts[slot_gap][:, None])
+            candidate_ends = candidates + duration_us
+            end_minutes = (candidate_ends % _DAY_US) // _MINUTE_US
+            fits = (candidate_ends <= gap_ends[slot_gap][:, None]) & (
+                np.abs(end_minutes - checkout_minutes[None, :]) <= _CHECKOUT_TOLERANCE_MINUTES
+            )
+            slot_starts = candidates[fits]
+            slot_gap = np.broadcast_to(slot_gap[:, None], fits.shape)[fits]
+
+        slot_ends = slot_starts + duration_us
+
+        # Vérification stricte : créneau ± buffer contre séjour ± buffer
+        if starts.size:
+            before = np.searchsorted(starts, slot_ends + 2 * buffer_us, side='left')
+            blocking = np.where(before > 0, max_ends[np.maximum(before - 1, 0)], np.iinfo(np.int64).min)
+            free = blocking <= slot_starts - 2 * buffer_us
+            slot_starts, slot_ends, slot_gap = slot_starts[free], slot_ends[free], slot_gap[free]
+
+        return list(zip(slot_starts.tolist(), slot_ends.tolist(), gap_sizes[slot_gap].tolist()))
+
+    # ==================== CALCUL PYTHON (SANS NUMPY) ====================
+
+    def _free_slots_python(self, lo, hi, window, duration_us, buffer_us, slot_times):
+        window_start, window_end = window
+        starts = self._starts[lo:hi]
+        max_ends = self._max_ends[lo:hi]
+
+        gaps = [
+            (gap_start, gap_end)
+            for gap_start, gap_end in zip(
+                [window_start] + [end + buffer_us for end in max_ends],
+                [start - buffer_us for start in starts] + [window_end],
+            )
+            if gap_end - gap_start >= duration_us
+        ]
+
+        found = []
+        for gap_start, gap_end in gaps:
+            if not slot_times:
+                candidates = [gap_start]
+            else:
+                candidates = []
+                for day in range(gap_start // _DAY_US, gap_end // _DAY_US + 1):
+                    for checkin, checkout_minutes in slot_times:
+                        start = max(day * _DAY_US + checkin, gap_start)
+                        end = start + duration_us
+                        end_minutes = (end % _DAY_US) // _MINUTE_US
+                        if end <= gap_end and abs(end_minutes - checkout_minutes) <= _CHECKOUT_TOLERANCE_MINUTES:
+                            candidates.append(start)
+
+            for start in candidates:
+                end = start + duration_us
+                before = bisect.bisect_left(starts, end + 2 * buffer_us)
+                if before and max_ends[before - 1] > start - 2 * buffer_us:
+                    continue
+                found.append((start, end, gap_end - gap_start))
+        return found
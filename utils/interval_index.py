@@ -0,0 +1,147 @@
+"""
+Index d'intervalles en mémoire, par chambre, pour le moteur de disponibilité.
+
+Les séjours de chaque chambre sont conservés triés par date d'arrivée, avec le
+maximum cumulé des dates de départ. Une recherche de chevauchement se fait
+ainsi par dichotomie (O(log n)) au lieu d'une requête par chambre.
+"""
+
+import bisect
+from collections import namedtuple
+
+# Vue légère d'un séjour : mêmes noms d'attributs que hotel.booking.stay
+# pour rester compatible avec les helpers du moteur (gaps, vérification...).
+StayInterval = namedtuple(
+    "StayInterval",
+    ["id", "room_id", "actual_checkin_date", "actual_checkout_date", "booking_ref"],
+)
+
+
+class RoomIntervalIndex:
+    """
+    Index des séjours actifs par chambre (room_id -> intervalles [in, out)).
+
+    - ``_stays[room_id]``    : séjours triés par date d'arrivée
+    - ``_keys[room_id]``     : clés (arrivée, id) de ces séjours, même ordre
+    - ``_starts[room_id]``   : dates d'arrivée (clés de dichotomie)
+    - ``_max_ends[room_id]`` : maximum cumulé des dates de départ
+    - ``_ends[room_id]``     : (départ, id) triés, pour next_release
+    - ``_by_id[stay_id]``    : séjour indexé, pour remove et next_release
+    """
+
+    def __init__(self, stays=None):
+        self._stays = {}
+        self._keys = {}
+        self._starts = {}
+        self._max_ends = {}
+        self._ends = {}
+        self._by_id = {}
+        for stay in stays or []:
+            self._stays.setdefault(stay.room_id, []).append(stay)
+            self._by_id[stay.id] = stay
+        for room_id, room_stays in self._stays.items():
+            room_stays.sort(key=lambda s: (s.actual_checkin_date, s.id))
+            self._keys[room_id] = [(s.actual_checkin_date, s.id) for s in room_stays]
+            self._ends[room_id] = sorted((s.actual_checkout_date, s.id) for s in room_stays)
+            self._reindex(room_id)
+
+    # ==================== CONSTRUCTION / MISE À JOUR ====================
+
+    def _reindex(self, room_id, from_pos=0):
+        """Recalcule les clés et le maximum cumulé à partir d'une position."""
+        room_stays = self._stays.get(room_id, [])
+        if not room_stays:
+            for mapping in (self._stays, self._keys, self._starts, self._max_ends, self._ends):
+                mapping.pop(room_id, None)
+            return
+        starts = self._starts.setdefault(room_id, [])
+        max_ends = self._max_ends.setdefault(room_id, [])
+        del starts[from_pos:]
+        del max_ends[from_pos:]
+        running = max_ends[-1] if max_ends else None
+        for stay in room_stays[from_pos:]:
+            starts.append(stay.actual_checkin_date)
+            end = stay.actual_checkout_date
+            running = end if running is None or end > running else running
+            max_ends.append(running)
+
+    def add(self, stay):
+        """Ajoute un séjour (création ou réservation provisoire d'un lot)."""
+        room_id = stay.room_id
+        key = (stay.actual_checkin_date, stay.id)
+        keys = self._keys.setdefault(room_id, [])
+        pos = bisect.bisect_right(keys, key)
+        keys.insert(pos, key)
+        self._stays.setdefault(room_id, []).insert(pos, stay)
+        bisect.insort(self._ends.setdefault(room_id, []), (stay.actual_checkout_date, stay.id))
+        self._by_id[stay.id] = stay
+        self._reindex(room_id, pos)
+
+    def remove(self, stay_id):
+        """Retire un séjour (annulation, suppression ou modification)."""
+        stay = self._by_id.pop(stay_id, None)
+        if stay is None:
+            return None
+        room_id = stay.room_id
+        keys = self._keys[room_id]
+        # Position exacte par dichotomie sur (arrivée, id)
+        pos = bisect.bisect_left(keys, (stay.actual_checkin_date, stay_id))
+        del keys[pos]
+        del self._stays[room_id][pos]
+        ends = self._ends[room_id]
+        del ends[bisect.bisect_left(ends, (stay.actual_checkout_date, stay_id))]
+        self._reindex(room_id, pos)
+        return stay
+
+    # ==================== REQUÊTES ====================
+
+    def room_ids(self):
+        return list(self._stays)
+
+    def stays_for(self, room_id):
+        """Séjours d'une chambre, triés par date d'arrivée."""
+        return list(self._stays.get(room_id, []))
+
+    def has_overlap(self, room_id, start, end):
+        """True si un séjour de la chambre chevauche [start, end)."""
+        starts = self._starts.get(room_id)
+        if not starts:
+            return False
+        pos = bisect.bisect_left(starts, end)
+        return pos > 0 and self._max_ends[room_id][pos - 1] > start
+
+    def overlapping(self, room_id, start, end):
+        """Séjours de la chambre qui chevauchent [start, end), triés par arrivée."""
+        starts = self._starts.get(room_id)
+        if not starts:
+            return []
+        room_stays = self._stays[room_id]
+        max_ends = self._max_ends[room_id]
+        pos = bisect.bisect_left(starts, end) - 1
+        found = []
+        # Le maximum cumulé est croissant : dès qu'il est <= start,
+        # aucun séjour antérieur ne peut plus chevaucher.
+        while pos >= 0 and max_ends[pos] > start:
+            stay = room_stays[pos]
+            if stay.actual_checkout_date > start:
+                found.append(stay)
+            pos -= 1
+        found.reverse()
+        return found
+
+    def first_free(self, room_ids, start, end):
+        """Première chambre (dans l'ordre donné) libre sur [start, end)."""
+        for room_id in room_ids:
+            if not self.has_overlap(room_id, start, end):
+                return room_id
+        return None
+
+    def next_release(self, room_id, after):
+        """Séjour de la chambre qui se termine le plus tôt après ``after`` (O(log n))."""
+        ends = self._ends.get(room_id)
+        if not ends:
+            return None
+        pos = bisect.bisect_right(ends, (after, float("inf")))
+        if pos == len(ends):
+            return None
+        return self._by_id[ends[pos][1]]
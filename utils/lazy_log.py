@@ -0,0 +1,85 @@
+"""
+Instrumentation paresseuse des journaux (tarification, séjours).
+
+Les charges utiles coûteuses (JSON indenté, contextes de debug) sont passées
+aux loggers sous forme d'objets dont la sérialisation n'a lieu que si
+l'enregistrement est réellement émis : ``logger.debug("%s", LazyJson(obj))``
+ne coûte rien lorsque le niveau DEBUG est désactivé.
+
+Les loggers du module n'ont pas de niveau propre : ils suivent la
+configuration d'Odoo (INFO par défaut, ``--log-handler``). Les niveaux par
+logger se règlent par paramètre système, au format
+``hotel.eclc:DEBUG,hotel.booking:INFO`` (cf. apply_log_levels) : c'est la
+seule façon d'activer le DEBUG et ses charges utiles.
+"""
+
+import json
+import logging
+
+LOG_LEVELS_PARAM = "hotel_management_extension.log_levels"
+
+_logger = logging.getLogger(__name__)
+
+# Loggers dont le niveau vient du paramètre système (appliqué en dernier)
+_param_loggers = set()
+
+
+class LazyJson:
+    """Sérialise ``value`` en JSON au moment du formatage du message."""
+
+    __slots__ = ("value", "indent")
+
+    def __init__(self, value, indent=None):
+        self.value = value
+        self.indent = indent
+
+    def __str__(self):
+        return json.dumps(self.value, ensure_ascii=False, indent=self.indent, default=str)
+
+
+class LazyCall:
+    """Évalue ``func(*args)`` au moment du formatage du message."""
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+def parse_log_levels(spec):
+    """
+    ``"hotel.eclc:WARNING, hotel.booking:info"`` -> {"hotel.eclc": 30, "hotel.booking": 20}.
+    Les entrées invalides sont ignorées.
+    """
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition(":")
+        name, level = name.strip(), level.strip().upper()
+        if not sep or not name:
+            continue
+        value = logging.getLevelName(level)
+        if isinstance(value, int):
+            levels[name] = value
+        else:
+            _logger.warning("Niveau de log inconnu ignoré : %s", item.strip())
+    return levels
+
+
+def apply_log_levels(spec):
+    """
+    Applique les niveaux du paramètre système aux loggers concernés. Un
+    logger retiré du paramètre revient à son niveau hérité (configuration
+    d'Odoo) : le DEBUG ne reste pas actif une fois le paramètre vidé.
+    """
+    levels = parse_log_levels(spec)
+    for name in _param_loggers - set(levels):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    _param_loggers.clear()
+    _param_loggers.update(levels)
+    return levels
@@ -1,24 +1,188 @@
+import atexit
 import logging
 import os
+import queue
+import re
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def setup_logger(name: str, log_file: str, level=logging.DEBUG, log_dir="."):
-    """Crée un logger avec un FileHandler."""
-    os.makedirs(log_dir, exist_ok=True)
-    log_path = os.path.join(log_dir, log_file)
-    
+# Répertoire des journaux : argument log_dir, sinon variable d'environnement,
+# sinon option hotel_log_dir du fichier de configuration Odoo, sinon ".".
+LOG_DIR_ENV = "HOTEL_LOG_DIR"
+LOG_DIR_OPTION = "hotel_log_dir"
+LOG_MAX_BYTES = int(os.environ.get("HOTEL_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get("HOTEL_LOG_BACKUP_COUNT", 5))
+# Fichiers des processus terminés (workers recyclés) : conservés au plus
+# LOG_RETENTION_DAYS jours, et au plus LOG_MAX_STALE_FILES par journal.
+LOG_RETENTION_DAYS = float(os.environ.get("HOTEL_LOG_RETENTION_DAYS", 7))
+LOG_MAX_STALE_FILES = int(os.environ.get("HOTEL_LOG_MAX_STALE_FILES", 20))
+
+_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+# Un QueueListener (thread d'écriture) par fichier et par processus
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+def resolve_log_dir(log_dir=None):
+    if log_dir:
+        return log_dir
+    if os.environ.get(LOG_DIR_ENV):
+        return os.environ[LOG_DIR_ENV]
+    try:
+        from odoo.tools import config
+        return config.get(LOG_DIR_OPTION) or "."
+    except ImportError:
+        return "."
+
+
+def _process_log_path(log_dir, log_file):
+    """booking.log -> <log_dir>/booking.<pid>.log : un fichier par processus."""
+    stem, ext = os.path.splitext(log_file)
+    return os.path.join(log_dir, "%s.%s%s" % (stem, os.getpid(), ext or ".log"))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Processus existant mais d'un autre utilisateur
+        return True
+    return True
+
+
+def cleanup_stale_logs(log_dir, log_file):
+    """
+    Supprime les fichiers ``<stem>.<pid><ext>`` (et leurs rotations) des
+    processus terminés : au-delà de LOG_RETENTION_DAYS jours, ou au-delà des
+    LOG_MAX_STALE_FILES plus récents. Appelé à l'ouverture de chaque journal,
+    le répertoire ne grossit donc pas avec le recyclage des workers.
+    """
+    stem, ext = os.path.splitext(log_file)
+    pattern = re.compile(
+        r"^%s\.(\d+)%s(\.\d+)?$" % (re.escape(stem), re.escape(ext or ".log"))
+    )
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return 0
+    stale = []
+    for name in names:
+        match = pattern.match(name)
+        if not match:
+            continue
+        pid = int(match.group(1))
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        path = os.path.join(log_dir, name)
+        try:
+            stale.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+
+    stale.sort(reverse=True)
+    expiry = time.time() - LOG_RETENTION_DAYS * 86400
+    removed = 0
+    for rank, (mtime, path) in enumerate(stale):
+        if rank >= LOG_MAX_STALE_FILES or mtime < expiry:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _file_handler(log_dir, log_file, level, formatter):
+    cleanup_stale_logs(log_dir, log_file)
+    fh = RotatingFileHandler(
+        _process_log_path(log_dir, log_file),
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        delay=True,
+    )
+    fh.setLevel(level)
+    fh.setFormatter(formatter)
+    return fh
+
+
+def _get_queue_handler(log_dir, log_file, level, fmt=_FORMAT):
+    """QueueHandler partagé par les loggers d'un même fichier, listener démarré."""
+    key = (os.path.abspath(log_dir), log_file)
+    with _listeners_lock:
+        if key not in _listeners:
+            os.makedirs(log_dir, exist_ok=True)
+            fh = _file_handler(key[0], log_file, level, logging.Formatter(fmt))
+            handler = QueueHandler(queue.SimpleQueue())
+            listener = QueueListener(handler.queue, fh, respect_handler_level=True)
+            listener.start()
+            _listeners[key] = (handler, listener)
+        return _listeners[key][0]
+
+
+def stop_listeners():
+    """Vide les files et ferme les fichiers (arrêt du processus)."""
+    with _listeners_lock:
+        for _handler, listener in _listeners.values():
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        _listeners.clear()
+
+
+def _restart_listeners_in_child():
+    """
+    Après un fork (workers Odoo), les threads d'écriture du parent n'existent
+    plus et ses files ne sont pas réutilisables : chaque processus rebranche
+    ses QueueHandlers sur des files neuves, vidées par ses propres threads
+    vers ses propres fichiers. Les enregistrements encore en file au moment
+    du fork appartiennent au parent, qui les écrit.
+    """
+    global _listeners_lock
+    _listeners_lock = threading.Lock()
+    for key, (handler, old_listener) in list(_listeners.items()):
+        log_dir, log_file = key
+        old_fh = old_listener.handlers[0]
+        fh = _file_handler(log_dir, log_file, old_fh.level, old_fh.formatter)
+        handler.queue = queue.SimpleQueue()
+        listener = QueueListener(handler.queue, fh, respect_handler_level=True)
+        listener.start()
+        _listeners[key] = (handler, listener)
+
+
+atexit.register(stop_listeners)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners_in_child)
+
+
+def setup_logger(name: str, log_file: str, level=None, log_dir=None,
+                 fmt=_FORMAT, propagate=True):
+    """
+    Crée un logger dont les enregistrements passent par une file en mémoire
+    (QueueHandler) : l'écriture disque se fait dans un thread dédié
+    (QueueListener), vers un fichier tournant propre au processus. Les
+    chemins critiques (disponibilité, tarification, EC/LC) ne bloquent
+    jamais sur les entrées/sorties du journal.
+
+    :param level: niveau du logger ; None (défaut) : non fixé, hérité de la
+        configuration d'Odoo (``--log-handler``), et ajustable par le
+        paramètre système ``hotel_management_extension.log_levels``
+    :param fmt: format des lignes du fichier
+    :param propagate: False pour ne pas relayer vers les journaux d'Odoo
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
+    if level is not None:
+        logger.setLevel(level)
+    logger.propagate = propagate
+
     if not logger.handlers:
-        fh = logging.FileHandler(log_path)
-        fh.setLevel(level)
-        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
-        fh.setFormatter(formatter)
-        logger.addHandler(fh)
-    
-    return logger
-#log_dir="/opt/odoo-sandbox/log/"
-#from logger_utils import setup_logger
+        logger.addHandler(
+            _get_queue_handler(
+                resolve_log_dir(log_dir), log_file, level or logging.NOTSET, fmt
+            )
+        )
 
-#eclc_logger = setup_logger("hotel.eclc", "eclc_pricing.log")
-#booking_logger = setup_logger("hotel.booking", "booking.log")
+    return logger
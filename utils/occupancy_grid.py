@@ -0,0 +1,178 @@
+"""
+Grille d'occupation par créneaux (backend optionnel du moteur de disponibilité).
+
+Chaque chambre est représentée par un ``bytearray`` : un octet par créneau de
+``granularity`` minutes sur un horizon glissant, contenant le nombre de séjours
+(buffer de nettoyage compris) qui occupent ce créneau. Le masque d'occupation
+d'une chambre est l'entier dont l'octet ``i`` vaut 1 si le créneau ``i`` est
+occupé : tester une période revient à un ET binaire avec le masque de la
+période, et le nombre de chambres occupées par créneau s'obtient en additionnant
+les masques (un octet par créneau, pas de retenue tant qu'il y a moins de 256
+chambres).
+
+Les bornes des séjours et des demandes sont arrondies vers l'extérieur : la
+grille peut refuser une chambre libre à un créneau près, jamais accepter une
+chambre occupée.
+
+Les grilles sont conservées par processus (``GRIDS``), par base et par type de
+chambre, et estampillées avec le compteur ``availability_generation`` du type :
+une grille dont la génération ne correspond plus à la base est reconstruite.
+Elles expirent en outre après ``GRID_TTL_SECONDS``, au cas où une
+incrémentation de génération se serait perdue.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Empreinte d'un séjour sur la disponibilité (avant/après modification)
+StayFootprint = namedtuple(
+    "StayFootprint",
+    ["stay_id", "room_type_id", "room_id", "checkin", "checkout", "active"],
+)
+
+# Durée de vie d'une grille dans le processus
+GRID_TTL_SECONDS = 300
+
+# Octet non nul -> 1 (utilisé pour dériver le masque des compteurs)
+_OCCUPIED = bytes([0] + [1] * 255)
+
+
+class OccupancyGrid:
+    """Occupation des chambres d'un type, par créneau, sur un horizon donné."""
+
+    def __init__(self, room_ids, horizon_start, horizon_days, granularity_minutes,
+                 buffer_duration, generation):
+        self.room_ids = list(room_ids)
+        self.horizon_start = horizon_start
+        self.granularity = timedelta(minutes=granularity_minutes)
+        self.size = int(timedelta(days=horizon_days) / self.granularity)
+        self.horizon_end = horizon_start + self.size * self.granularity
+        self.buffer = buffer_duration
+        self.generation = generation
+        self._counts = {room_id: bytearray(self.size) for room_id in self.room_ids}
+        self._masks = {}
+
+    # ==================== CRÉNEAUX ====================
+
+    def _slot_range(self, start, end):
+        """Indices [lo, hi) des créneaux touchés par [start, end), bornés à l'horizon."""
+        lo = (start - self.horizon_start) // self.granularity
+        hi = -((self.horizon_start - end) // self.granularity)
+        return max(lo, 0), min(hi, self.size)
+
+    def covers(self, start, end):
+        return self.horizon_start <= start and end <= self.horizon_end
+
+    def _period_mask(self, lo, hi):
+        if hi <= lo:
+            return 0
+        return int.from_bytes(b"\x01" * (hi - lo), "little") << (8 * lo)
+
+    # ==================== MISE À JOUR ====================
+
+    def _apply(self, room_id, checkin, checkout, delta):
+        counts = self._counts.get(room_id)
+        if counts is None or not checkin or not checkout:
+            return
+        lo, hi = self._slot_range(checkin - self.buffer, checkout + self.buffer)
+        for slot in range(lo, hi):
+            counts[slot] = min(max(counts[slot] + delta, 0), 255)
+        self._masks.pop(room_id, None)
+
+    def add(self, room_id, checkin, checkout):
+        self._apply(room_id, checkin, checkout, 1)
+
+    def remove(self, room_id, checkin, checkout):
+        self._apply(room_id, checkin, checkout, -1)
+
+    # ==================== REQUÊTES ====================
+
+    def room_mask(self, room_id):
+        mask = self._masks.get(room_id)
+        if mask is None:
+            mask = int.from_bytes(self._counts[room_id].translate(_OCCUPIED), "little")
+            self._masks[room_id] = mask
+        return mask
+
+    def first_free(self, room_ids, checkin, checkout, exclude=None):
+        """
+        Première chambre (dans l'ordre donné) sans aucun créneau occupé sur la demande.
+
+        :param exclude: StayFootprint du séjour en cours de modification, ignoré
+        """
+        period = self._period_mask(*self._slot_range(checkin - self.buffer, checkout + self.buffer))
+        for room_id in room_ids:
+            if room_id not in self._counts:
+                continue
+            if exclude and exclude.active and exclude.room_id == room_id:
+                mask = self._mask_without(exclude)
+            else:
+                mask = self.room_mask(room_id)
+            if not mask & period:
+                return room_id
+        return None
+
+    def _mask_without(self, footprint):
+        counts = bytearray(self._counts[footprint.room_id])
+        lo, hi = self._slot_range(footprint.checkin - self.buffer, footprint.checkout + self.buffer)
+        for slot in range(lo, hi):
+            counts[slot] = max(counts[slot] - 1, 0)
+        return int.from_bytes(counts.translate(_OCCUPIED), "little")
+
+    def free_counts(self, start, end):
+        """
+        Nombre de chambres libres par créneau sur [start, end).
+
+        :return: liste de (début du créneau, nombre de chambres libres)
+        """
+        lo, hi = self._slot_range(start, end)
+        if hi <= lo:
+            return []
+        occupied = sum(self.room_mask(room_id) for room_id in self.room_ids)
+        per_slot = (occupied >> (8 * lo)).to_bytes(self.size, "little")[: hi - lo]
+        total = len(self.room_ids)
+        return [
+            (self.horizon_start + (lo + i) * self.granularity, total - booked)
+            for i, booked in enumerate(per_slot)
+        ]
+
+
+class GridRegistry:
+    """Grilles du processus, par (base, type de chambre), avec durée de vie."""
+
+    def __init__(self, ttl=GRID_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._grids = {}
+
+    def get(self, dbname, room_type_id):
+        with self._lock:
+            entry = self._grids.get((dbname, room_type_id))
+            if entry is None:
+                return None
+            grid, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._grids[(dbname, room_type_id)]
+                return None
+            return grid
+
+    def put(self, dbname, room_type_id, grid):
+        with self._lock:
+            self._grids[(dbname, room_type_id)] = (grid, time.monotonic() + self.ttl)
+
+    def drop(self, dbname, room_type_ids=None):
+        with self._lock:
+            for key in list(self._grids):
+                if key[0] == dbname and (room_type_ids is None or key[1] in room_type_ids):
+                    del self._grids[key]
+
+
+GRIDS = GridRegistry()
+
+
+def horizon_start_for(now=None):
+    """Début d'horizon glissant : minuit de la veille."""
+    now = now or datetime.now()
+    return datetime.combine(now.date(), datetime.min.time()) - timedelta(days=1)
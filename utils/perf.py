@@ -0,0 +1,135 @@
+"""
+Instrumentation des points d'entrée des moteurs : durée, nombre et durée des
+requêtes SQL, enregistrements traités.
+
+Les mesures alimentent des agrégats glissants par processus (les N derniers
+appels par point d'entrée), exposés par le modèle hotel.perf.stat. Une
+régression N+1 se voit directement sur la moyenne / le maximum de requêtes.
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+
+# Nombre d'appels conservés par point d'entrée
+PERF_WINDOW = 500
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _count_records(self, result):
+    """
+    Enregistrements traités : résultat recordset ou liste, liste data d'une
+    réponse RPC, sinon self.
+    """
+    if hasattr(result, "_ids") or isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and isinstance(result.get("data"), list):
+        return len(result["data"])
+    return len(self)
+
+
+class PerfRegistry:
+    """Fenêtres glissantes de mesures, par nom de point d'entrée."""
+
+    def __init__(self, window=PERF_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, wall_ms, queries, sql_ms, records):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append((wall_ms, queries, sql_ms, records))
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+
+    def snapshot(self):
+        """Agrégats par point d'entrée, triés par temps cumulé décroissant."""
+        with self._lock:
+            items = [(name, list(samples), self._calls[name]) for name, samples in self._samples.items()]
+        stats = []
+        for name, samples, calls in items:
+            n = len(samples)
+            walls = sorted(s[0] for s in samples)
+            queries = [s[1] for s in samples]
+            sql_times = [s[2] for s in samples]
+            records = [s[3] for s in samples]
+            stats.append({
+                "name": name,
+                "calls": calls,
+                "window": n,
+                "wall_ms_avg": round(sum(walls) / n, 3),
+                "wall_ms_p50": round(_percentile(walls, 50), 3),
+                "wall_ms_p95": round(_percentile(walls, 95), 3),
+                "wall_ms_max": round(walls[-1], 3),
+                "queries_avg": round(sum(queries) / n, 2),
+                "queries_max": max(queries),
+                "sql_ms_avg": round(sum(sql_times) / n, 3),
+                "records_avg": round(sum(records) / n, 2),
+                "queries_per_record": round(sum(queries) / max(sum(records), 1), 3),
+            })
+        stats.sort(key=lambda s: s["wall_ms_avg"] * s["window"], reverse=True)
+        return stats
+
+
+PERF = PerfRegistry()
+
+
+def _sql_counters(cr):
+    """
+    (requêtes, secondes SQL) cumulées : compteurs du thread courant tenus par
+    le curseur Odoo, à défaut le compteur de requêtes du curseur.
+    """
+    thread = threading.current_thread()
+    count = getattr(thread, "query_count", None)
+    if count is None:
+        count = getattr(cr, "sql_log_count", 0)
+    return count, getattr(thread, "query_time", 0.0)
+
+
+def instrument(name=None, records=_count_records):
+    """
+    Décorateur pour les méthodes de modèle : mesure chaque appel et l'ajoute
+    aux agrégats PERF sous ``name`` (défaut : <modèle>.<méthode>).
+
+    :param records: fonction (self, résultat) -> nombre d'enregistrements traités
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cr = self.env.cr
+            queries_before, sql_before = _sql_counters(cr)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = method(self, *args, **kwargs)
+                return result
+            finally:
+                wall_ms = (time.perf_counter() - start) * 1000.0
+                queries_after, sql_after = _sql_counters(cr)
+                PERF.record(
+                    name or "%s.%s" % (self._name, method.__name__),
+                    wall_ms,
+                    queries_after - queries_before,
+                    (sql_after - sql_before) * 1000.0,
+                    records(self, result),
+                )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,95 @@
+"""
+Table tarifaire compilée (données Python pures) pour hotel.pricing.service.
+
+Construite une fois par base à partir des saisons, règles et lignes actives,
+elle permet de tarifer un séjour sans aucune requête : règles indexées par
+(type de chambre, type de réservation) dans l'ordre de recherche de l'ORM,
+lignes horaires triées par durée minimale pour une recherche par dichotomie.
+"""
+
+import bisect
+from collections import namedtuple
+
+from .season_index import SeasonIndex
+
+CompiledSeason = namedtuple(
+    "CompiledSeason", ["id", "date_start", "date_end", "priority"]
+)
+
+CompiledLine = namedtuple(
+    "CompiledLine", ["id", "min_duration", "max_duration", "price"]
+)
+
+CompiledRule = namedtuple(
+    "CompiledRule",
+    [
+        "id",
+        "room_type_id",
+        "reservation_type_id",
+        "season_id",
+        "unit",
+        "price",
+        "currency",
+        "capacity",
+        "early_checkin_fee",
+        "late_checkout_fee",
+        "extra_night_amount",
+        "lines",
+        "line_mins",
+    ],
+)
+
+
+class PricingTable:
+    """
+    - ``seasons`` : saisons actives, dans l'ordre du modèle (priorité décroissante)
+    - ``rules``   : règles actives, dans l'ordre du modèle (type, réservation, saison)
+    """
+
+    def __init__(self, seasons, rules):
+        self.seasons = tuple(seasons)
+        self.season_index = SeasonIndex(self.seasons)
+        self._rules_by_key = {}
+        self._night_rule_by_type = {}
+        for rule in rules:
+            self._rules_by_key.setdefault(
+                (rule.room_type_id, rule.reservation_type_id), []
+            ).append(rule)
+            if rule.unit == "night":
+                self._night_rule_by_type.setdefault(rule.room_type_id, rule)
+
+    def seasons_for(self, day):
+        """Saisons couvrant le jour, par priorité décroissante."""
+        return self.season_index.seasons_for(day)
+
+    def find_rule(self, room_type_id, reservation_type_id, season_ids):
+        """
+        Première règle du couple (type, réservation) : parmi les saisons données
+        si la date est en saison, sinon la règle sans saison.
+        """
+        candidates = self._rules_by_key.get((room_type_id, reservation_type_id), ())
+        if season_ids:
+            season_ids = set(season_ids)
+            for rule in candidates:
+                if rule.season_id in season_ids:
+                    return rule
+            return None
+        for rule in candidates:
+            if not rule.season_id:
+                return rule
+        return None
+
+    def night_rule(self, room_type_id):
+        """Règle « nuitée » du type, utilisée pour la bascule heure -> nuit."""
+        return self._night_rule_by_type.get(room_type_id)
+
+    @staticmethod
+    def find_line(rule, nb_hours):
+        """
+        Ligne horaire applicable : plus petite durée minimale <= nb_hours dont
+        la durée maximale couvre nb_hours (ou est illimitée).
+        """
+        for line in rule.lines[: bisect.bisect_right(rule.line_mins, nb_hours)]:
+            if not line.max_duration or line.max_duration >= nb_hours:
+                return line
+        return None
@@ -0,0 +1,63 @@
+"""
+Index d'intervalles des saisons tarifaires.
+
+Les bornes de toutes les saisons (début, lendemain de la fin) découpent le
+calendrier en segments sur lesquels l'ensemble des saisons actives est
+constant. Chaque segment conserve ses saisons déjà triées par priorité :
+la saison effective d'un jour s'obtient par dichotomie (O(log n)), et un
+séjour se découpe en segments de nuits sans requête.
+"""
+
+import bisect
+from datetime import timedelta
+
+
+class SeasonIndex:
+    """
+    :param seasons: saisons (attributs id, date_start, date_end) dans l'ordre
+                    de priorité du modèle hotel.season
+    """
+
+    def __init__(self, seasons):
+        seasons = list(seasons)
+        bounds = set()
+        for season in seasons:
+            bounds.add(season.date_start)
+            bounds.add(season.date_end + timedelta(days=1))
+        self._breakpoints = sorted(bounds)
+        # _segments[i] : saisons couvrant [breakpoints[i], breakpoints[i+1])
+        self._segments = [
+            tuple(
+                season.id for season in seasons
+                if season.date_start <= start <= season.date_end
+            )
+            for start in self._breakpoints
+        ]
+
+    def seasons_for(self, day):
+        """Saisons couvrant le jour, par priorité décroissante (vide hors saison)."""
+        pos = bisect.bisect_right(self._breakpoints, day) - 1
+        return self._segments[pos] if pos >= 0 else ()
+
+    def effective_season(self, day):
+        """Saison prioritaire du jour, ou None."""
+        seasons = self.seasons_for(day)
+        return seasons[0] if seasons else None
+
+    def split_nights(self, first_night, nb_nights):
+        """
+        Découpe les nuits [first_night, first_night + nb_nights) en segments de
+        saisons identiques.
+
+        :return: liste de (première nuit, nombre de nuits, saisons du segment)
+        """
+        end = first_night + timedelta(days=nb_nights)
+        segments = []
+        day = first_night
+        while day < end:
+            pos = bisect.bisect_right(self._breakpoints, day)
+            next_break = self._breakpoints[pos] if pos < len(self._breakpoints) else end
+            segment_end = min(next_break, end)
+            segments.append((day, (segment_end - day).days, self.seasons_for(day)))
+            day = segment_end
+        return segments
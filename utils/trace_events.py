@@ -0,0 +1,142 @@
+"""
+Événements de trace structurés (NDJSON) pour les moteurs de disponibilité,
+de tarification et EC/LC.
+
+Chaque décision échantillonnée produit une ligne JSON au schéma stable :
+
+    {"ts", "event", "engine", "db", "pid", "stay_id", "room_type_id",
+     "duration_ms", "queries", "decision", "attrs"}
+
+``queries`` est le nombre de requêtes SQL exécutées par le curseur pendant
+l'événement. L'échantillonnage se règle par moteur via le paramètre système
+``hotel_management_extension.trace_sampling`` (ex. ``availability:0.1,
+pricing:0.05,eclc:1,*:0``) ; un événement non retenu ne coûte qu'un tirage.
+Fichier : trace.<pid>.ndjson dans le répertoire des journaux.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+from .logger_utils import setup_logger
+
+TRACE_SAMPLING_PARAM = "hotel_management_extension.trace_sampling"
+
+_trace_logger = setup_logger(
+    "hotel.trace", "trace.ndjson", level=logging.INFO, fmt="%(message)s",
+    propagate=False,
+)
+
+# Taux d'échantillonnage par moteur ("*" : défaut), désactivé par défaut
+_sampling = {}
+
+
+def parse_sampling(spec):
+    """``"availability:0.1, *:0"`` -> {"availability": 0.1, "*": 0.0}."""
+    rates = {}
+    for item in (spec or "").split(","):
+        engine, sep, rate = item.partition(":")
+        engine = engine.strip()
+        if not sep or not engine:
+            continue
+        try:
+            rates[engine] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+def configure_sampling(spec):
+    """Remplace les taux d'échantillonnage du processus."""
+    global _sampling
+    _sampling = parse_sampling(spec)
+    return _sampling
+
+
+def sample_rate(engine):
+    return _sampling.get(engine, _sampling.get("*", 0.0))
+
+
+class _NullSpan:
+    """Événement non échantillonné : aucune mesure, aucune écriture."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class TraceSpan:
+    """Mesure durée et requêtes d'une décision, écrit l'événement à la sortie."""
+
+    __slots__ = ("event", "engine", "cr", "fields", "attrs", "_start", "_queries")
+
+    def __init__(self, event, engine, cr=None, stay_id=None, room_type_id=None, **attrs):
+        self.event = event
+        self.engine = engine
+        self.cr = cr
+        self.fields = {"stay_id": stay_id, "room_type_id": room_type_id, "decision": None}
+        self.attrs = attrs
+
+    def __enter__(self):
+        self._queries = getattr(self.cr, "sql_log_count", None)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000.0
+        if exc_type is not None:
+            self.fields["decision"] = self.fields["decision"] or "error"
+            self.attrs["error"] = exc_type.__name__
+        queries = None
+        if self._queries is not None:
+            queries = getattr(self.cr, "sql_log_count", self._queries) - self._queries
+        _trace_logger.info("%s", json.dumps({
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "event": self.event,
+            "engine": self.engine,
+            "db": getattr(self.cr, "dbname", None),
+            "pid": os.getpid(),
+            "stay_id": self.fields["stay_id"],
+            "room_type_id": self.fields["room_type_id"],
+            "duration_ms": round(duration_ms, 3),
+            "queries": queries,
+            "decision": self.fields["decision"],
+            "attrs": self.attrs,
+        }, ensure_ascii=False, default=str))
+        return False
+
+    def set(self, **fields):
+        """decision / stay_id / room_type_id vont au schéma, le reste dans attrs."""
+        for key, value in fields.items():
+            if key in self.fields:
+                self.fields[key] = value
+            else:
+                self.attrs[key] = value
+
+
+def trace_event(event, engine, cr=None, **fields):
+    """
+    Ouvre un événement de trace (context manager), échantillonné par moteur ::
+
+        with trace_event("pricing.quote", "pricing", self.env.cr,
+                         room_type_id=room_type_id) as span:
+            ...
+            span.set(decision="priced", total=total)
+    """
+    rate = sample_rate(engine)
+    if rate <= 0.0 or (rate < 1.0 and random.random() >= rate):
+        return NULL_SPAN
+    return TraceSpan(event, engine, cr, **fields)